@@ -20,6 +20,8 @@ from db_models import (
 from auth_oauth import OAuthManager
 from utils import AuthUtils
 from auth_utils import get_current_user
+from redis_pool import get_redis
+from visit_retention import redis_memory_report
 
 
 
@@ -422,6 +424,14 @@ async def get_system_overview(
         }
     )
 
+@router.get("/metrics/redis-memory", response_model=StandardResponse)
+async def get_redis_memory_report(
+    admin: User = Depends(verify_admin)
+):
+    """Get Redis bytes used per brand and by the recent visit windows against their budget, and spill bytes on disk"""
+    report = await redis_memory_report(get_redis())
+    return StandardResponse(success=True, data=report)
+
 @router.get("/metrics/api-usage", response_model=StandardResponse)
 async def get_api_usage_metrics(
     admin: User = Depends(verify_admin),
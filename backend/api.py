@@ -22,6 +22,7 @@ import uvicorn
 try:
     from database import get_db, check_database_health
     from optimization_engine import AIOptimizationEngine
+    from model_registry import warm_up_models
     from db_models import Brand, User, Analysis, UserRole
     from utils import CacheUtils
     from models import StandardResponse, ErrorResponse
@@ -30,6 +31,11 @@ try:
     # Import route modules
     from admin_routes import router as admin_router
     from log_analysis_route import router as log_analysis_router
+    from tracking_route import router as tracking_router
+    from tracking_ingest import tracking_ingestor
+    from log_jobs import log_job_runner
+    from partition_manager import partition_manager
+    from redis_pool import close_redis_pools
     
     # Import service modules
     from user_management import UserManager, UserService
@@ -196,6 +202,8 @@ app.add_middleware(
 # Include all route modules
 app.include_router(admin_router, prefix="/api/v2")
 app.include_router(log_analysis_router, prefix="/api/v2")
+# Beacon ingest keeps the path llm-tracker.js posts to
+app.include_router(tracking_router)
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -746,6 +754,22 @@ async def startup_event():
         cache_utils = CacheUtils()
         logger.info("Cache initialized")
         
+        # Load the shared embedding model before the first request needs it
+        try:
+            load_stats = await asyncio.get_event_loop().run_in_executor(None, warm_up_models)
+            logger.info("Embedding models warmed up", models=load_stats)
+        except Exception as e:
+            logger.warning(f"Embedding model warm-up failed: {e}")
+        
+        # Keep monthly bot_visits / tracking_events partitions ahead of time and retire old ones
+        partition_manager.start()
+        
+        # Drain tracking beacons to Redis and Postgres in the background
+        tracking_ingestor.start()
+        
+        # Heartbeat log jobs and pick up uploads whose worker shut down or crashed
+        log_job_runner.start()
+        
         logger.info("AI Optimization Engine API started successfully")
         
     except Exception as e:
@@ -762,8 +786,14 @@ async def shutdown_event():
         # Close database connections
         logger.info("Database connections closed")
         
-        # Clear cache
-        logger.info("Cache cleared")
+        # Write out buffered tracking events before the Redis pool goes away
+        await tracking_ingestor.stop()
+        await partition_manager.stop()
+        await log_job_runner.stop()
+        
+        # Release the shared Redis connection pool
+        await close_redis_pools()
+        logger.info("Redis connections closed")
         
         logger.info("AI Optimization Engine API shutdown complete")
         
@@ -0,0 +1,128 @@
+"""
+Beacon Protocol
+Compact batched format sent by llm-tracker.js (v2): one request per session flush, optionally
+gzipped, with session-level fields sent once and repeated strings replaced by indexes into a
+per-batch string table. `expand_beacon` turns a batch back into the plain event dicts that
+ClientSideBotTracker and the ingest endpoint already understand.
+
+    {"v": 2, "sid": "llm_...", "t0": 1696946136000,
+     "c": {"bn": "GPTBot", "p": "openai", "ua": "...", "b": "<brand uuid>"},
+     "k": ["https://example.com/a", "Page A", ...],
+     "e": [[0, 0, {"u": 0, "ti": 1, "lt": 850}], [1, 30000, {"top": 30, "sd": 75}], ...]}
+"""
+
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+BEACON_VERSION = 2
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_DECOMPRESSED_BYTES = 2 * 1024 * 1024
+MAX_EVENTS_PER_BATCH = 100
+
+# Event type codes, in the order llm-tracker.js numbers them
+EVENT_TYPES = ('pageview', 'engagement', 'session_end', 'custom')
+
+# Session-level fields ("c") and per-event fields, short key -> event field
+CONTEXT_FIELDS = {'bn': 'bot_name', 'p': 'platform', 'ua': 'user_agent', 'b': 'brand_id'}
+EVENT_FIELDS = {
+    'u': 'page_url', 'ti': 'page_title', 'r': 'referrer', 'md': 'meta_description',
+    'lt': 'page_load_time', 'cl': 'content_length', 'wc': 'word_count',
+    'top': 'time_on_page', 'sd': 'max_scroll_depth', 'pv': 'page_views',
+    'n': 'event_name', 'ed': 'event_data',
+}
+# Fields sent as indexes into the batch string table
+TABLE_FIELDS = {'u', 'ti', 'r', 'md', 'n'}
+
+class BeaconError(ValueError):
+    """Malformed beacon body"""
+
+class BeaconTooLarge(BeaconError):
+    """Beacon body over the decompressed size or event count limits"""
+
+def decompress_body(body: bytes, max_bytes: int = MAX_DECOMPRESSED_BYTES) -> bytes:
+    """Gunzip a beacon body if it is gzipped (sendBeacon can't set Content-Encoding), bounded"""
+    if not body.startswith(GZIP_MAGIC):
+        return body
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_bytes + 1)
+    except zlib.error as e:
+        raise BeaconError(f"Invalid gzip body: {e}")
+    if len(data) > max_bytes or decompressor.unconsumed_tail:
+        raise BeaconTooLarge("Decompressed beacon too large")
+    return data
+
+def is_compact_batch(payload: Any) -> bool:
+    return isinstance(payload, dict) and payload.get('v') == BEACON_VERSION
+
+def _lookup(table: List[Any], value: Any) -> Any:
+    if isinstance(value, int) and not isinstance(value, bool):
+        if 0 <= value < len(table):
+            return table[value]
+        raise BeaconError(f"String table index {value} out of range")
+    return value
+
+def expand_beacon(payload: Dict[str, Any], max_events: int = MAX_EVENTS_PER_BATCH) -> List[Dict[str, Any]]:
+    """Plain event dicts (llm-tracker.js v1 field names) for a compact batch"""
+    session_id = payload.get('sid')
+    t0 = payload.get('t0')
+    table = payload.get('k') or []
+    events = payload.get('e')
+    context = payload.get('c') or {}
+    if not isinstance(events, list) or not isinstance(table, list) or not isinstance(context, dict):
+        raise BeaconError("Malformed beacon batch")
+    if not isinstance(t0, (int, float)):
+        raise BeaconError("Beacon batch needs a numeric t0")
+    if len(events) > max_events:
+        raise BeaconTooLarge(f"At most {max_events} events per request")
+
+    shared = {'session_id': session_id}
+    for short, name in CONTEXT_FIELDS.items():
+        if short in context:
+            shared[name] = context[short]
+
+    expanded = []
+    for item in events:
+        if not isinstance(item, list) or len(item) < 2 or not isinstance(item[1], (int, float)):
+            raise BeaconError("Malformed beacon event")
+        type_code, offset_ms = item[0], item[1]
+        fields = item[2] if len(item) > 2 and isinstance(item[2], dict) else {}
+        if not isinstance(type_code, int) or not 0 <= type_code < len(EVENT_TYPES):
+            raise BeaconError(f"Unknown event type {type_code!r}")
+
+        event = dict(shared)
+        event['event_type'] = EVENT_TYPES[type_code]
+        timestamp = datetime.fromtimestamp((t0 + offset_ms) / 1000, tz=timezone.utc)
+        event['timestamp'] = timestamp.isoformat().replace('+00:00', 'Z')
+        for short, value in fields.items():
+            name = EVENT_FIELDS.get(short)
+            if name is not None:
+                event[name] = _lookup(table, value) if short in TABLE_FIELDS else value
+        # Brands are sent instead of whole JSON-LD blocks; keep the shape the trackers read
+        brands = fields.get('br')
+        if isinstance(brands, list):
+            event['structured_data'] = [{'brand': _lookup(table, brand)} for brand in brands]
+        expanded.append(event)
+    return expanded
+
+def decode_beacon(body: bytes, max_events: int = MAX_EVENTS_PER_BATCH) -> List[Any]:
+    """Raw events from a request body: v1 JSON (one event, a list, or {"events": [...]}) or a v2 batch"""
+    body = decompress_body(body)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise BeaconError("Body must be JSON")
+
+    if is_compact_batch(payload):
+        return expand_beacon(payload, max_events)
+    if isinstance(payload, dict) and isinstance(payload.get('events'), list):
+        raw_events = payload['events']
+    elif isinstance(payload, list):
+        raw_events = payload
+    else:
+        raw_events = [payload]
+    if len(raw_events) > max_events:
+        raise BeaconTooLarge(f"At most {max_events} events per request")
+    return raw_events
@@ -0,0 +1,70 @@
+"""
+Bot Activity Aggregates
+Grouped SQL over bot_visits for /logs/bot-activity: per-platform stats, hour-of-day
+distribution and top paths. Exact for any number of visits, and the rows returned scale with
+the number of groups rather than visits. The bare timestamp bound keeps partition pruning.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, distinct, extract, func, select
+
+from db_models import BotVisit
+
+# Core table rather than the ORM class: aggregates don't need mapper configuration
+BOT_VISITS = BotVisit.__table__
+
+TOP_PATHS_LIMIT = 20
+
+def bot_activity_summary(db, brand_id, since: datetime, platform: Optional[str] = None,
+                         top_paths: int = TOP_PATHS_LIMIT) -> Dict[str, Any]:
+    """Totals, platform_breakdown, hourly_distribution and top_paths for a brand's visits since `since`"""
+    columns = BOT_VISITS.c
+    if not isinstance(brand_id, uuid.UUID):
+        brand_id = uuid.UUID(str(brand_id))  # route path parameters arrive as strings
+    filters = [columns.brand_id == brand_id, columns.timestamp >= since]
+    if platform:
+        filters.append(columns.platform == platform)
+
+    visits = func.count()
+    brand_mentions = func.sum(case((columns.brand_mentioned.is_(True), 1), else_=0))
+    successes = func.sum(case((columns.status_code < 400, 1), else_=0))
+    hour = extract('hour', columns.timestamp)
+
+    platform_rows = db.execute(
+        select(columns.platform, visits, brand_mentions, func.count(distinct(columns.path)), successes)
+        .where(*filters).group_by(columns.platform)
+    ).all()
+    hourly_rows = db.execute(select(hour, visits).where(*filters).group_by(hour)).all()
+    path_rows = db.execute(
+        select(columns.path, visits, brand_mentions).where(*filters).group_by(columns.path)
+        .order_by(visits.desc(), columns.path).limit(top_paths)
+    ).all()
+
+    platform_breakdown = {}
+    for platform_name, total_visits, mentions, unique_paths, success_count in platform_rows:
+        mentions, success_count = mentions or 0, success_count or 0
+        platform_breakdown[platform_name] = {
+            "total_visits": total_visits,
+            "brand_mentions": mentions,
+            "citation_rate": (mentions / total_visits * 100) if total_visits > 0 else 0,
+            "unique_paths": unique_paths,
+            "success_rate": (success_count / total_visits * 100) if total_visits > 0 else 0
+        }
+
+    return {
+        "total_bot_visits": sum(stats["total_visits"] for stats in platform_breakdown.values()),
+        "platform_breakdown": platform_breakdown,
+        "hourly_distribution": {int(hour_of_day): count for hour_of_day, count in hourly_rows},
+        "top_paths": [
+            {
+                "path": path,
+                "visits": count,
+                "brand_mentions": mentions or 0,
+                "citation_rate": ((mentions or 0) / count * 100) if count > 0 else 0
+            }
+            for path, count, mentions in path_rows
+        ]
+    }
@@ -0,0 +1,201 @@
+"""
+Bot Signature Matching
+Single-pass LLM bot detection shared by the log analyzer, tracking utilities and the
+standalone log script. Stdlib only so scripts can import it without the backend stack.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class LLMBotPattern:
+    """Pattern to identify LLM bots"""
+    name: str
+    patterns: List[str]
+    type: str  # 'crawler', 'api', 'browser'
+    platform: str  # 'openai', 'anthropic', 'google', etc.
+
+# Comprehensive LLM bot patterns based on real user agents, in priority order
+DEFAULT_LLM_BOT_PATTERNS = [
+    # OpenAI/ChatGPT Bots
+    LLMBotPattern(
+        name="GPTBot",
+        patterns=[
+            "GPTBot/1.0", "GPTBot/1.1", "GPTBot/1.2", "GPTBot",
+            "ChatGPT-User", "OpenAI-GPT", "OpenAI-Bot", "OpenAI"
+        ],
+        type="crawler",
+        platform="openai"
+    ),
+    
+    # Anthropic/Claude Bots
+    LLMBotPattern(
+        name="Claude-Web",
+        patterns=[
+            "Claude-Web/1.0", "anthropic-ai", "ClaudeBot",
+            "Claude-Web-Crawler", "Anthropic-AI-Bot"
+        ],
+        type="crawler",
+        platform="anthropic"
+    ),
+    
+    # Google Bard/Gemini Bots
+    LLMBotPattern(
+        name="Google-Extended",
+        patterns=[
+            "Google-Extended", "Bard-Google", "Gemini-Google",
+            "GoogleOther", "Google-InspectionTool", "Gemini"
+        ],
+        type="crawler",
+        platform="google"
+    ),
+    
+    # Perplexity Bots
+    LLMBotPattern(
+        name="PerplexityBot",
+        patterns=[
+            "PerplexityBot", "Perplexity-UA", "PerplexityAI"
+        ],
+        type="crawler",
+        platform="perplexity"
+    ),
+    
+    # Bing Chat/Copilot Bots
+    LLMBotPattern(
+        name="BingChat",
+        patterns=[
+            "BingChat/1.0", "BingChat", "BingPreview", "msnbot-UDiscovery",
+            "BingCopilot", "Microsoft-Copilot"
+        ],
+        type="crawler",
+        platform="microsoft"
+    ),
+    
+    # You.com Bot
+    LLMBotPattern(
+        name="YouBot",
+        patterns=["YouBot/1.0", "YouBot", "You.com"],
+        type="crawler",
+        platform="you"
+    ),
+    
+    # Cohere Bots
+    LLMBotPattern(
+        name="CohereBot",
+        patterns=["CohereBot", "Cohere-AI"],
+        type="crawler",
+        platform="cohere"
+    ),
+    
+    # Common Crawl (used by many AI companies)
+    LLMBotPattern(
+        name="CCBot",
+        patterns=["CCBot/2.0", "CCBot/3.0", "CCBot/3.1", "CCBot"],
+        type="crawler",
+        platform="commoncrawl"
+    )
+]
+
+# Generic patterns that might be LLM bots (lower confidence)
+SUSPICIOUS_BOT_PATTERNS = ['bot', 'crawler', 'spider', 'scraper', 'ai', 'llm']
+
+GENERIC_BOT_NAME = "Unknown-AI-Bot"
+
+DEFAULT_MEMO_SIZE = 65536
+
+class BotSignatureMatcher:
+    """
+    Matches user agents against all bot signatures with one compiled regex.
+    The highest-priority bot with any signature in the user agent wins; confidence is 1.0 when
+    the whole user agent is one of its signatures, 0.8 otherwise, and 0.5 for generic matches.
+    Results are memoized per user agent since logs repeat the same few thousand strings.
+    """
+
+    def __init__(self, bot_patterns: List[LLMBotPattern], memo_size: int = DEFAULT_MEMO_SIZE):
+        self.bot_patterns = list(bot_patterns)
+
+        # Signature -> priority; the first bot listing a signature owns it
+        self._priority: Dict[str, int] = {}
+        for index, bot_pattern in enumerate(self.bot_patterns):
+            for pattern in bot_pattern.patterns:
+                self._priority.setdefault(pattern.lower(), index)
+
+        # Lookahead alternation reports a match at every position, including overlapping ones;
+        # alternatives are in priority order so ties at one position resolve to the winning bot
+        alternation = '|'.join(
+            re.escape(signature)
+            for signature in sorted(self._priority, key=lambda sig: (self._priority[sig], -len(sig)))
+        )
+        self._signature_re = re.compile(f'(?=({alternation}))') if alternation else None
+        self._generic_re = re.compile('|'.join(re.escape(p) for p in SUSPICIOUS_BOT_PATTERNS))
+
+        # Lowercase byte strings, one of which occurs in any user agent a signature matches
+        # (signatures containing another are redundant); used to prefilter raw log bytes
+        signatures = sorted(self._priority, key=len)
+        self.prefilter_anchors: List[bytes] = [
+            signature.encode() for signature in signatures
+            if not any(other != signature and other in signature for other in signatures)
+        ]
+
+        self.match = lru_cache(maxsize=memo_size)(self._match)
+
+    def _match(self, user_agent: str, allow_generic: bool = True) -> Optional[Tuple[LLMBotPattern, float]]:
+        """
+        Identify if a user agent belongs to an LLM bot
+        Returns the bot pattern and confidence score if matched
+        """
+        if not user_agent:
+            return None
+
+        user_agent_lower = user_agent.lower()
+
+        if self._signature_re is not None:
+            best = None
+            for found in self._signature_re.finditer(user_agent_lower):
+                priority = self._priority[found.group(1)]
+                if best is None or priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+            if best is not None:
+                bot_pattern = self.bot_patterns[best]
+                exact = self._priority.get(user_agent_lower) == best
+                return (bot_pattern, 1.0 if exact else 0.8)
+
+        if allow_generic and 'googlebot' not in user_agent_lower and self._generic_re.search(user_agent_lower):
+            # Lower confidence for generic patterns
+            return (LLMBotPattern(
+                name=GENERIC_BOT_NAME,
+                patterns=[user_agent],
+                type="crawler",
+                platform="unknown"
+            ), 0.5)
+
+        return None
+
+    def cache_info(self):
+        """Memo hit/miss statistics"""
+        return self.match.cache_info()
+
+_matchers: Dict[tuple, BotSignatureMatcher] = {}
+_matchers_lock = threading.Lock()
+
+def get_signature_matcher(bot_patterns: Optional[List[LLMBotPattern]] = None) -> BotSignatureMatcher:
+    """Shared matcher for a pattern list (one compiled regex and memo per distinct list)"""
+    bot_patterns = DEFAULT_LLM_BOT_PATTERNS if bot_patterns is None else bot_patterns
+    key = tuple((p.name, tuple(p.patterns), p.type, p.platform) for p in bot_patterns)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = BotSignatureMatcher(bot_patterns)
+                _matchers[key] = matcher
+    return matcher
+
+def identify_bot(user_agent: str, allow_generic: bool = True) -> Optional[Tuple[LLMBotPattern, float]]:
+    """Match a user agent against the default bot signatures"""
+    return get_signature_matcher().match(user_agent, allow_generic)
@@ -1,6 +1,8 @@
 """
 Real-time Bot Tracking Module
 Handles client-side tracking data and provides real-time analytics
+Redis writes for an event (or a batch of them) go out as one pipelined round trip on the shared async pool
+Redis keeps a capped window of recent events per day; full event detail is spilled to segment files
 """
 
 import json
@@ -8,12 +10,18 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
-import redis
+import redis.asyncio as aioredis
 from dataclasses import dataclass, asdict
 import hashlib
 
+from session_index import queue_session_counts, queue_session_touch, session_counts
+from visit_retention import RECENT_WINDOW_SIZE, SegmentSpill, visit_spill
+
 logger = logging.getLogger(__name__)
 
+HOURLY_STATS_TTL = 8 * 86400  # a day's hash must outlive its last hour by 7 days
+TRACKING_SPILL_STREAM = 'bot_tracking'
+
 @dataclass
 class BotTrackingEvent:
     """Represents a bot tracking event from client-side script"""
@@ -39,85 +47,57 @@ class ClientSideBotTracker:
     Provides real-time analytics and insights
     """
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        spill: Optional[SegmentSpill] = visit_spill,
+        recent_window: int = RECENT_WINDOW_SIZE
+    ):
         self.redis_client = redis_client
+        self.spill = spill
+        self.recent_window = max(1, recent_window)
         
     async def track_bot_visit(self, tracking_data: Dict) -> Dict:
         """
         Process and store bot visit from client-side tracking
         """
+        return (await self.track_bot_visits([tracking_data]))[0]
+    
+    async def track_bot_visits(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Process and store a batch of bot visits; all Redis writes go out in one pipeline
+        """
         try:
-            # Create session ID if not provided
-            session_id = tracking_data.get('session_id') or self._generate_session_id(tracking_data)
-            
-            # Create tracking event
-            event = BotTrackingEvent(
-                timestamp=datetime.fromisoformat(tracking_data['timestamp']),
-                bot_name=tracking_data['bot_name'],
-                platform=tracking_data['platform'],
-                user_agent=tracking_data['user_agent'],
-                page_url=tracking_data['page_url'],
-                page_title=tracking_data.get('page_title', ''),
-                referrer=tracking_data.get('referrer', ''),
-                session_id=session_id,
-                event_type='pageview',
-                event_data={
-                    'page_load_time': tracking_data.get('page_load_time', 0),
-                    'content_length': tracking_data.get('content_length', 0),
-                    'structured_data': tracking_data.get('structured_data', [])
-                }
-            )
-            
-            # Store in Redis
-            await self._store_tracking_event(event)
-            
-            # Update real-time metrics
-            await self._update_real_time_metrics(event)
-            
-            # Check for brand mentions in URL
-            brand_mentions = await self._extract_brand_mentions(tracking_data)
-            
-            return {
-                'status': 'tracked',
-                'session_id': session_id,
-                'brand_mentions': brand_mentions
-            }
+            pipe = self.redis_client.pipeline(transaction=False)
+            spill_records: List[Dict] = []
+            results = [await self._queue_bot_visit(pipe, tracking_data, spill_records) for tracking_data in batch]
+            queue_session_touch(pipe, [result['session_id'] for result in results])
+            await pipe.execute()
+            await self._spill_events(spill_records)
+            return results
             
         except Exception as e:
-            logger.error(f"Error tracking bot visit: {e}")
+            logger.error(f"Error tracking bot visits: {e}")
             raise
     
     async def track_engagement(self, engagement_data: Dict) -> Dict:
         """
         Track bot engagement metrics (time on page, scroll depth, etc.)
         """
+        return (await self.track_engagements([engagement_data]))[0]
+    
+    async def track_engagements(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Track a batch of engagement updates; platforms missing from the payloads are read
+        from the sessions in one pipeline, then all writes go out in another
+        """
         try:
-            session_id = engagement_data.get('session_id')
-            if not session_id:
-                return {'status': 'error', 'message': 'Session ID required'}
-            
-            # Store engagement data
-            key = f"bot_engagement:{session_id}"
-            self.redis_client.hset(key, mapping={
-                'time_on_page': engagement_data.get('time_on_page', 0),
-                'max_scroll_depth': engagement_data.get('max_scroll_depth', 0),
-                'links_clicked': engagement_data.get('links_clicked', 0),
-                'timestamp': datetime.now().isoformat()
-            })
-            self.redis_client.expire(key, 86400)  # 24 hour expiration
-            
-            # Update engagement metrics
-            platform = await self._get_session_platform(session_id)
-            if platform:
-                engagement_key = f"engagement_metrics:{platform}:{datetime.now().strftime('%Y%m%d')}"
-                
-                # Increment engagement counters
-                self.redis_client.hincrby(engagement_key, 'total_sessions', 1)
-                self.redis_client.hincrby(engagement_key, 'total_time', int(engagement_data.get('time_on_page', 0)))
-                self.redis_client.hincrby(engagement_key, 'total_scroll', int(engagement_data.get('max_scroll_depth', 0)))
-                self.redis_client.expire(engagement_key, 90 * 86400)
-            
-            return {'status': 'tracked', 'session_id': session_id}
+            platforms = await self._session_platforms(batch)
+            pipe = self.redis_client.pipeline(transaction=False)
+            results = [self._queue_engagement(pipe, data, platforms) for data in batch]
+            queue_session_touch(pipe, [result['session_id'] for result in results if 'session_id' in result])
+            await pipe.execute()
+            return results
             
         except Exception as e:
             logger.error(f"Error tracking engagement: {e}")
@@ -127,74 +107,180 @@ class ClientSideBotTracker:
         """
         Track custom events (errors, interactions, etc.)
         """
+        return (await self.track_custom_events([event_data]))[0]
+    
+    async def track_custom_events(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Track a batch of custom events in one pipeline
+        """
         try:
-            event_type = event_data.get('event_type', 'custom')
-            platform = event_data.get('platform', 'unknown')
-            
-            # Store custom event
-            key = f"bot_custom_events:{platform}:{datetime.now().strftime('%Y%m%d')}"
-            self.redis_client.lpush(key, json.dumps({
-                'timestamp': datetime.now().isoformat(),
-                'event_type': event_type,
-                'event_data': event_data.get('data', {}),
-                'page_url': event_data.get('page_url', '')
-            }))
-            self.redis_client.ltrim(key, 0, 999)  # Keep last 1000 events
-            self.redis_client.expire(key, 30 * 86400)
-            
-            return {'status': 'tracked', 'event_type': event_type}
+            pipe = self.redis_client.pipeline(transaction=False)
+            results = [self._queue_custom_event(pipe, event_data) for event_data in batch]
+            await pipe.execute()
+            return results
             
         except Exception as e:
             logger.error(f"Error tracking custom event: {e}")
             raise
     
+    async def _spill_events(self, records: List[Dict]):
+        """Append full event detail to the spill segments (off the event loop)"""
+        if records and self.spill is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.spill.write, TRACKING_SPILL_STREAM, records
+            )
+    
+    async def _queue_bot_visit(self, pipe, tracking_data: Dict, spill_records: List[Dict]) -> Dict:
+        """Queue the writes for one page view on a pipeline; its full detail goes on spill_records"""
+        # Create session ID if not provided
+        session_id = tracking_data.get('session_id') or self._generate_session_id(tracking_data)
+        
+        # Create tracking event
+        event = BotTrackingEvent(
+            timestamp=datetime.fromisoformat(tracking_data['timestamp']),
+            bot_name=tracking_data['bot_name'],
+            platform=tracking_data['platform'],
+            user_agent=tracking_data['user_agent'],
+            page_url=tracking_data['page_url'],
+            page_title=tracking_data.get('page_title', ''),
+            referrer=tracking_data.get('referrer', ''),
+            session_id=session_id,
+            event_type='pageview',
+            event_data={
+                'page_load_time': tracking_data.get('page_load_time', 0),
+                'content_length': tracking_data.get('content_length', 0),
+                'structured_data': tracking_data.get('structured_data', [])
+            }
+        )
+        
+        # Store the event and update real-time metrics
+        self._store_tracking_event(pipe, event)
+        self._update_real_time_metrics(pipe, event)
+        spill_records.append(event.to_dict())
+        
+        # Check for brand mentions in URL
+        brand_mentions = await self._extract_brand_mentions(tracking_data)
+        
+        return {
+            'status': 'tracked',
+            'session_id': session_id,
+            'brand_mentions': brand_mentions
+        }
+    
+    async def _session_platforms(self, batch: List[Dict]) -> Dict[str, str]:
+        """Platforms of the sessions in `batch` whose payloads don't carry one (one pipelined read)"""
+        session_ids = list(dict.fromkeys(
+            data['session_id'] for data in batch
+            if data.get('session_id') and not data.get('platform')
+        ))
+        if not session_ids:
+            return {}
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hget(f"bot_session:{session_id}", 'platform')
+        platforms = {}
+        for session_id, platform in zip(session_ids, await pipe.execute()):
+            if platform:
+                platforms[session_id] = platform.decode() if isinstance(platform, bytes) else platform
+        return platforms
+    
+    def _queue_engagement(self, pipe, engagement_data: Dict, platforms: Dict[str, str]) -> Dict:
+        """Queue the writes for one engagement update on a pipeline"""
+        session_id = engagement_data.get('session_id')
+        if not session_id:
+            return {'status': 'error', 'message': 'Session ID required'}
+        
+        # Store engagement data
+        key = f"bot_engagement:{session_id}"
+        pipe.hset(key, mapping={
+            'time_on_page': engagement_data.get('time_on_page', 0),
+            'max_scroll_depth': engagement_data.get('max_scroll_depth', 0),
+            'links_clicked': engagement_data.get('links_clicked', 0),
+            'timestamp': datetime.now().isoformat()
+        })
+        pipe.expire(key, 86400)  # 24 hour expiration
+        
+        # Update engagement metrics
+        platform = engagement_data.get('platform') or platforms.get(session_id)
+        if platform:
+            engagement_key = f"engagement_metrics:{platform}:{datetime.now().strftime('%Y%m%d')}"
+            
+            # Increment engagement counters
+            pipe.hincrby(engagement_key, 'total_sessions', 1)
+            pipe.hincrby(engagement_key, 'total_time', int(engagement_data.get('time_on_page', 0)))
+            pipe.hincrby(engagement_key, 'total_scroll', int(engagement_data.get('max_scroll_depth', 0)))
+            pipe.expire(engagement_key, 90 * 86400)
+        
+        return {'status': 'tracked', 'session_id': session_id}
+    
+    def _queue_custom_event(self, pipe, event_data: Dict) -> Dict:
+        """Queue the writes for one custom event on a pipeline"""
+        event_type = event_data.get('event_type', 'custom')
+        platform = event_data.get('platform', 'unknown')
+        
+        # Store custom event
+        key = f"bot_custom_events:{platform}:{datetime.now().strftime('%Y%m%d')}"
+        pipe.lpush(key, json.dumps({
+            'timestamp': datetime.now().isoformat(),
+            'event_type': event_type,
+            'event_name': event_data.get('event_name', ''),
+            'event_data': event_data.get('data', event_data.get('event_data', {})),
+            'page_url': event_data.get('page_url', '')
+        }))
+        pipe.ltrim(key, 0, 999)  # Keep last 1000 events
+        pipe.expire(key, 30 * 86400)
+        
+        return {'status': 'tracked', 'event_type': event_type}
+    
     def _generate_session_id(self, tracking_data: Dict) -> str:
         """Generate unique session ID"""
         unique_string = f"{tracking_data['user_agent']}:{tracking_data['timestamp']}:{tracking_data.get('ip', '')}"
         return hashlib.md5(unique_string.encode()).hexdigest()
     
-    async def _store_tracking_event(self, event: BotTrackingEvent):
-        """Store tracking event in Redis"""
+    def _store_tracking_event(self, pipe, event: BotTrackingEvent):
+        """Queue the Redis writes that store a tracking event on a pipeline"""
         # Store in time series
         key = f"bot_tracking:{event.platform}:{event.timestamp.strftime('%Y%m%d')}"
-        self.redis_client.zadd(
+        pipe.zadd(
             key,
             {json.dumps(event.to_dict()): event.timestamp.timestamp()}
         )
-        self.redis_client.expire(key, 90 * 86400)
+        pipe.zremrangebyrank(key, 0, -(self.recent_window + 1))  # recent window only
+        pipe.expire(key, 90 * 86400)
         
         # Update session data
         session_key = f"bot_session:{event.session_id}"
-        self.redis_client.hset(session_key, mapping={
+        pipe.hset(session_key, mapping={
             'platform': event.platform,
             'bot_name': event.bot_name,
             'start_time': event.timestamp.isoformat(),
             'last_seen': event.timestamp.isoformat(),
             'page_count': 1
         })
-        self.redis_client.expire(session_key, 86400)
+        pipe.expire(session_key, 86400)
         
         # Update daily counters
         counter_key = f"realtime_bot_counter:{event.platform}:{event.timestamp.strftime('%Y%m%d')}"
-        self.redis_client.hincrby(counter_key, event.bot_name, 1)
-        self.redis_client.expire(counter_key, 90 * 86400)
+        pipe.hincrby(counter_key, event.bot_name, 1)
+        pipe.expire(counter_key, 90 * 86400)
     
-    async def _update_real_time_metrics(self, event: BotTrackingEvent):
-        """Update real-time metrics dashboards"""
+    def _update_real_time_metrics(self, pipe, event: BotTrackingEvent):
+        """Queue real-time dashboard updates on a pipeline"""
         # Update platform activity
         activity_key = f"realtime_activity:{event.platform}"
-        self.redis_client.lpush(activity_key, json.dumps({
+        pipe.lpush(activity_key, json.dumps({
             'timestamp': event.timestamp.isoformat(),
             'bot_name': event.bot_name,
             'page_url': event.page_url,
             'page_title': event.page_title
         }))
-        self.redis_client.ltrim(activity_key, 0, 99)  # Keep last 100 activities
+        pipe.ltrim(activity_key, 0, 99)  # Keep last 100 activities
         
-        # Update hourly stats
-        hour_key = f"hourly_stats:{event.platform}:{event.timestamp.strftime('%Y%m%d%H')}"
-        self.redis_client.incr(hour_key)
-        self.redis_client.expire(hour_key, 7 * 86400)
+        # Update hourly stats (one hash per platform per day, a field per hour)
+        day_key = f"hourly_stats:{event.platform}:{event.timestamp.strftime('%Y%m%d')}"
+        pipe.hincrby(day_key, event.timestamp.strftime('%H'), 1)
+        pipe.expire(day_key, HOURLY_STATS_TTL)
     
     async def _extract_brand_mentions(self, tracking_data: Dict) -> List[str]:
         """Extract brand mentions from page content and metadata"""
@@ -220,12 +306,6 @@ class ClientSideBotTracker:
         
         return list(set(mentions))
     
-    async def _get_session_platform(self, session_id: str) -> Optional[str]:
-        """Get platform from session data"""
-        session_key = f"bot_session:{session_id}"
-        platform = self.redis_client.hget(session_key, 'platform')
-        return platform.decode() if platform else None
-    
     async def get_real_time_dashboard_data(self, platforms: List[str] = None) -> Dict:
         """
         Get real-time dashboard data for monitoring
@@ -238,25 +318,44 @@ class ClientSideBotTracker:
             'hourly_trends': {},
             'engagement_metrics': {},
             'top_pages': {},
-            'active_sessions': 0
+            'active_sessions': 0,
+            'active_session_windows': {},
+            'unique_sessions': {}
         }
         
         now = datetime.now()
+        hours = [now - timedelta(hours=i) for i in range(24)]
+        # The last 24 hours span at most two daily hashes
+        day_fields: Dict[str, List[str]] = {}
+        for hour in hours:
+            day_fields.setdefault(hour.strftime('%Y%m%d'), []).append(hour.strftime('%H'))
+        
+        # Every read in one round trip: recent activity, the 24-hour trend and engagement per
+        # platform, then the session index windows
+        pipe = self.redis_client.pipeline(transaction=False)
+        for platform in platforms:
+            pipe.lrange(f"realtime_activity:{platform}", 0, 19)
+            for day, fields in day_fields.items():
+                pipe.hmget(f"hourly_stats:{platform}:{day}", fields)
+            pipe.hgetall(f"engagement_metrics:{platform}:{now.strftime('%Y%m%d')}")
+        queue_session_counts(pipe)
+        replies = iter(await pipe.execute())
         
         for platform in platforms:
             # Get recent activity
-            activity_key = f"realtime_activity:{platform}"
-            recent_activity = self.redis_client.lrange(activity_key, 0, 19)
+            recent_activity = next(replies)
             dashboard_data['current_activity'][platform] = [
                 json.loads(activity) for activity in recent_activity
             ]
             
             # Get hourly trends for last 24 hours
+            counts = {}
+            for day, fields in day_fields.items():
+                for field, count in zip(fields, next(replies)):
+                    counts[(day, field)] = count
             hourly_data = []
-            for i in range(24):
-                hour = now - timedelta(hours=i)
-                hour_key = f"hourly_stats:{platform}:{hour.strftime('%Y%m%d%H')}"
-                count = self.redis_client.get(hour_key)
+            for hour in hours:
+                count = counts[(hour.strftime('%Y%m%d'), hour.strftime('%H'))]
                 hourly_data.append({
                     'hour': hour.strftime('%H:00'),
                     'count': int(count) if count else 0
@@ -264,8 +363,7 @@ class ClientSideBotTracker:
             dashboard_data['hourly_trends'][platform] = hourly_data
             
             # Get engagement metrics
-            engagement_key = f"engagement_metrics:{platform}:{now.strftime('%Y%m%d')}"
-            engagement_data = self.redis_client.hgetall(engagement_key)
+            engagement_data = next(replies)
             if engagement_data:
                 total_sessions = int(engagement_data.get(b'total_sessions', 0))
                 total_time = int(engagement_data.get(b'total_time', 0))
@@ -277,9 +375,10 @@ class ClientSideBotTracker:
                     'total_sessions': total_sessions
                 }
         
-        # Count active sessions
-        session_pattern = "bot_session:*"
-        active_sessions = len(list(self.redis_client.scan_iter(match=session_pattern)))
-        dashboard_data['active_sessions'] = active_sessions
+        # Active sessions from the session index (bot_session:* hashes live for 24 hours)
+        sessions = session_counts(list(replies))
+        dashboard_data['active_sessions'] = sessions['active']['24h']
+        dashboard_data['active_session_windows'] = sessions['active']
+        dashboard_data['unique_sessions'] = sessions['unique']
         
         return dashboard_data
@@ -0,0 +1,177 @@
+"""
+Bot Visit Loader
+Bulk persistence of parsed bot visits into bot_visits with COPY FROM STDIN, streamed in batches
+straight from the columnar visit buffers. Loads are idempotent per upload: rows carry their
+(upload_id, upload_segment) and loading a segment first deletes that segment's rows, and any
+later ones, in the same transaction, so a resumed or re-run job never duplicates visits.
+"""
+
+import io
+import os
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+import structlog
+from sqlalchemy import delete, insert
+
+from db_models import BotVisit
+from partition_manager import PartitionManager, partition_manager
+from visit_columns import EPOCH, BotVisitColumns
+
+logger = structlog.get_logger()
+
+# Core table rather than the ORM class: bulk loads don't need mapper configuration
+BOT_VISITS = BotVisit.__table__
+
+COPY_BATCH_ROWS = int(os.getenv('BOT_VISIT_COPY_BATCH_ROWS', 100_000))
+
+COPY_COLUMNS = (
+    'id', 'brand_id', 'upload_id', 'upload_segment', 'bot_name', 'platform', 'user_agent', 'timestamp',
+    'ip_address', 'path', 'status_code', 'response_time', 'brand_mentioned', 'content_type'
+)
+COPY_SQL = f"COPY bot_visits ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+
+# bot_visits column limits for the string columns that have one
+COLUMN_LIMITS = {'bot_name': 100, 'platform': 50, 'ip_address': 45, 'path': 500, 'content_type': 50}
+NULL = '\\N'
+
+def _escape(value: str) -> str:
+    """COPY text-format escaping; NUL is dropped since Postgres text cannot hold it"""
+    return value.replace('\x00', '').replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _encoded_table(visits: BotVisitColumns, name: str) -> List[str]:
+    """A string column's dictionary, truncated and escaped once; the last slot is MISSING (NULL)"""
+    limit = COLUMN_LIMITS.get(name)
+    return [_escape(value[:limit] if limit else value) for value in visits.tables[name].values] + [NULL]
+
+def copy_lines(visits: BotVisitColumns, brand_id, upload_id, segment: int) -> Iterator[str]:
+    """bot_visits rows in COPY text format, one line per visit"""
+    count = len(visits)
+    if not count:
+        return
+    # Values shared by every row, and per-column encodings done once per distinct value
+    prefix = f"{brand_id}\t{upload_id if upload_id is not None else NULL}\t{segment}\t"
+    tables = {name: _encoded_table(visits, name) for name in ('bot_name', 'platform', 'user_agent',
+                                                              'ip_address', 'path', 'content_type')}
+    codes = {name: visits.array(name).tolist() for name in tables}
+    # The timestamp column is microseconds since the Unix epoch, i.e. datetime64[us]
+    timestamps = np.datetime_as_string(visits.array('timestamp').astype('datetime64[us]')).tolist()
+    status_codes = visits.array('status_code').tolist()
+    response_times = visits.array('response_time').tolist()
+    mentioned = visits.array('brand_mentioned').tolist()
+
+    bot_names, platforms, user_agents = tables['bot_name'], tables['platform'], tables['user_agent']
+    ips, paths, content_types = tables['ip_address'], tables['path'], tables['content_type']
+    for index in range(count):
+        yield (
+            f"{uuid.uuid4()}\t{prefix}"
+            f"{bot_names[codes['bot_name'][index]]}\t{platforms[codes['platform'][index]]}\t"
+            f"{user_agents[codes['user_agent'][index]]}\t{timestamps[index]}\t"
+            f"{ips[codes['ip_address'][index]]}\t{paths[codes['path'][index]]}\t"
+            f"{status_codes[index]}\t{response_times[index]:.4f}\t{'t' if mentioned[index] else 'f'}\t"
+            f"{content_types[codes['content_type'][index]]}\n"
+        )
+
+class BotVisitLoader:
+    """Loads a segment's visits into bot_visits (COPY on Postgres, multi-row INSERT elsewhere)"""
+
+    def __init__(self, session_factory: Optional[Callable] = None, batch_rows: int = COPY_BATCH_ROWS,
+                 partitions: Optional[PartitionManager] = None):
+        self._session_factory = session_factory
+        # Partitions are created through the same database the rows go to
+        self.partitions = partitions or (PartitionManager(session_factory) if session_factory else partition_manager)
+        self.batch_rows = max(1, batch_rows)
+        self.stats = {'rows': 0, 'segments': 0, 'seconds': 0.0}
+
+    def load_segment(self, visits: BotVisitColumns, brand_id, upload_id, segment: int) -> int:
+        """
+        Replace the rows of `upload_id` from `segment` onwards with `visits`; blocking, so run it
+        in an executor. Returns the number of rows loaded.
+        """
+        started = time.perf_counter()
+        if len(visits):
+            # Historical logs can predate the partitions maintenance keeps ahead of time
+            timestamps = visits.array('timestamp')
+            self.partitions.ensure_range(
+                BOT_VISITS.name,
+                EPOCH + timedelta(microseconds=int(timestamps.min())),
+                EPOCH + timedelta(microseconds=int(timestamps.max()))
+            )
+        db = self._session()
+        try:
+            db.execute(delete(BOT_VISITS).where(
+                BOT_VISITS.c.upload_id == upload_id, BOT_VISITS.c.upload_segment >= segment
+            ))
+            if db.get_bind().dialect.name == 'postgresql':
+                self._copy(db, copy_lines(visits, brand_id, upload_id, segment))
+            else:
+                self._insert(db, visits, brand_id, upload_id, segment)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - started
+        self.stats['rows'] += len(visits)
+        self.stats['segments'] += 1
+        self.stats['seconds'] += elapsed
+        logger.info("Bot visits loaded", upload_id=str(upload_id), segment=segment, rows=len(visits),
+                    rows_per_second=int(len(visits) / elapsed) if elapsed else None)
+        return len(visits)
+
+    def _session(self):
+        session_factory = self._session_factory
+        if session_factory is None:
+            # Imported on first load so parsing and tests don't need a database driver
+            from database import SessionLocal
+            session_factory = SessionLocal
+        return session_factory()
+
+    def _copy(self, db, lines: Iterator[str]):
+        """Stream lines through COPY in batches of batch_rows on the session's connection"""
+        cursor = db.connection().connection.cursor()
+        try:
+            batch = io.StringIO()
+            rows = 0
+            for line in lines:
+                batch.write(line)
+                rows += 1
+                if rows == self.batch_rows:
+                    self._copy_batch(cursor, batch)
+                    batch, rows = io.StringIO(), 0
+            if rows:
+                self._copy_batch(cursor, batch)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _copy_batch(cursor, batch: io.StringIO):
+        batch.seek(0)
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(COPY_SQL, batch)
+        else:  # psycopg 3
+            with cursor.copy(COPY_SQL) as copy:
+                copy.write(batch.getvalue())
+
+    def _insert(self, db, visits: BotVisitColumns, brand_id, upload_id, segment: int):
+        """Fallback for non-Postgres databases (development SQLite)"""
+        rows = []
+        for index in range(len(visits)):
+            row = visits.row(index)
+            rows.append({
+                'id': uuid.uuid4(), 'brand_id': brand_id, 'upload_id': upload_id, 'upload_segment': segment,
+                'bot_name': row['bot_name'][:100], 'platform': row['platform'], 'user_agent': row['user_agent'],
+                'timestamp': row['timestamp'], 'ip_address': row['ip_address'][:45], 'path': row['path'][:500],
+                'status_code': row['status_code'], 'response_time': row['response_time'],
+                'brand_mentioned': row['brand_mentioned'], 'content_type': row['content_type'],
+            })
+            if len(rows) == self.batch_rows:
+                db.execute(insert(BOT_VISITS), rows)
+                rows = []
+        if rows:
+            db.execute(insert(BOT_VISITS), rows)
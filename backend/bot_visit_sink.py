@@ -0,0 +1,200 @@
+"""
+Bot Visit Sink
+Write-behind buffer for bot visit persistence: visits and counter deltas accumulate in
+memory and are flushed to Redis (asyncio client) through non-transactional pipelines.
+Redis keeps a capped window of recent visits; full visit detail is spilled to segment files.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import redis.asyncio as aioredis
+
+from redis_pool import execute_pipelined
+from visit_retention import RECENT_WINDOW_SIZE, SegmentSpill, cap_command
+
+logger = logging.getLogger(__name__)
+
+VISIT_TTL_SECONDS = 90 * 24 * 3600
+VISIT_SPILL_STREAM = 'bot_visits'
+MONTHLY_ROLLUP_TTL_SECONDS = 400 * 24 * 3600
+# How long apply_once remembers a batch it has applied
+APPLIED_MARKER_TTL_SECONDS = 7 * 24 * 3600
+
+def daily_rollup_key(brand_name: str, date_str: str) -> str:
+    """Per-brand daily rollup hash (date_str is YYYYMMDD); fields are '<metric>:<platform>'"""
+    return f"bot_rollup:daily:{brand_name.lower()}:{date_str}"
+
+def monthly_rollup_key(brand_name: str, month_str: str) -> str:
+    """Per-brand monthly rollup hash (month_str is YYYYMM)"""
+    return f"bot_rollup:monthly:{brand_name.lower()}:{month_str}"
+
+def rollup_fields(platform: str) -> List[str]:
+    """Rollup hash fields for one platform, in the order readers expect"""
+    return [f"visits:{platform}", f"brand:{platform}", f"crawl_total:{platform}", f"crawl_ok:{platform}"]
+
+class BotVisitSink:
+    """
+    Buffers bot visit writes and flushes them in pipelined batches.
+    Repeated increments on the same key/field collapse into one command and each touched
+    key gets its TTL set once per flush. Per-brand daily and monthly rollups are updated
+    alongside the raw visit keys so reads never have to scan them. Each visit sorted set is
+    capped to its newest `recent_window` members and, with a `spill`, every visit is also
+    appended to a segment file. With `auto_flush` off, callers decide when writes happen
+    (see drain_commands / apply_once).
+    """
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        batch_size: int = 1000,
+        max_pending: int = 10000,
+        ttl: int = VISIT_TTL_SECONDS,
+        recent_window: int = RECENT_WINDOW_SIZE,
+        spill: Optional[SegmentSpill] = None,
+        auto_flush: bool = True
+    ):
+        self.redis_client = redis_client
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(1, max_pending)
+        self.ttl = ttl
+        self.recent_window = max(1, recent_window)
+        self.spill = spill
+        self.auto_flush = auto_flush
+
+        self._sorted_sets: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._hash_increments: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._counter_increments: Dict[str, int] = defaultdict(int)
+        self._expiring_keys: Dict[str, int] = {}
+        self._spill_records: List[Dict] = []
+        self.pending_visits = 0
+
+        self.stats = {'visits': 0, 'flushes': 0, 'commands': 0, 'round_trips': 0, 'spilled': 0}
+
+    def add_visit(self, visit, bot_pattern, brand_name: str):
+        """Buffer one bot visit (log_analyzer.BotVisit) and its counter updates"""
+        date_str = visit.timestamp.strftime('%Y%m%d')
+
+        # Individual visit, scored by timestamp (recent window only; the segment keeps them all)
+        visit_data = visit.to_dict()
+        visit_key = f"llm_bot_visit:{brand_name.lower()}:{bot_pattern.platform}:{date_str}"
+        members = self._sorted_sets[visit_key]
+        members[json.dumps(visit_data)] = visit.timestamp.timestamp()
+        if len(members) > 2 * self.recent_window:
+            # Only the newest recent_window survive the cap in Redis, so don't hold the rest
+            newest = sorted(members.items(), key=lambda item: item[1])[-self.recent_window:]
+            self._sorted_sets[visit_key] = dict(newest)
+        self._expire(visit_key)
+        if self.spill is not None:
+            self._spill_records.append({**visit_data, 'brand': brand_name.lower(), 'platform': bot_pattern.platform})
+
+        # Daily counters
+        self.hincrby(f"llm_bot_counter:{bot_pattern.platform}:{date_str}", bot_pattern.name)
+
+        # Brand-specific counters if brand mentioned
+        brand_mentioned = brand_name.lower() in visit.path.lower()
+        if brand_mentioned:
+            self.incr(f"brand_citation:{brand_name.lower()}:{bot_pattern.platform}:{date_str}")
+
+        # Path access patterns
+        self.hincrby(f"path_access:{bot_pattern.platform}:{date_str}", visit.path)
+
+        # Rollups read by get_real_time_metrics
+        visits_field, brand_field, total_field, ok_field = rollup_fields(bot_pattern.platform)
+        for key, ttl in (
+            (daily_rollup_key(brand_name, date_str), self.ttl),
+            (monthly_rollup_key(brand_name, date_str[:6]), MONTHLY_ROLLUP_TTL_SECONDS)
+        ):
+            self.hincrby(key, visits_field, ttl=ttl)
+            self.hincrby(key, total_field, ttl=ttl)
+            if visit.status_code < 400:
+                self.hincrby(key, ok_field, ttl=ttl)
+            if brand_mentioned:
+                self.hincrby(key, brand_field, ttl=ttl)
+
+        self.pending_visits += 1
+        self.stats['visits'] += 1
+
+    @property
+    def should_flush(self) -> bool:
+        """True once max_pending visits are buffered; callers then await flush()"""
+        return self.auto_flush and self.pending_visits >= self.max_pending
+
+    def hincrby(self, key: str, field: str, amount: int = 1, ttl: Optional[int] = None):
+        """Buffer a hash field increment"""
+        self._hash_increments[(key, field)] += amount
+        self._expire(key, ttl)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None):
+        """Buffer a counter increment"""
+        self._counter_increments[key] += amount
+        self._expire(key, ttl)
+
+    def _expire(self, key: str, ttl: Optional[int] = None):
+        self._expiring_keys[key] = ttl or self.ttl
+
+    async def flush(self) -> int:
+        """Write everything buffered to Redis (and the spill); returns the number of commands sent"""
+        spill_records, self._spill_records = self._spill_records, []
+        if spill_records:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.spill.write, VISIT_SPILL_STREAM, spill_records
+            )
+            self.stats['spilled'] += len(spill_records)
+
+        commands = self.drain_commands()
+        if not commands:
+            return 0
+
+        await execute_pipelined(self.redis_client, commands, self.batch_size)
+        self.stats['round_trips'] += -(-len(commands) // self.batch_size)
+
+        self.stats['flushes'] += 1
+        self.stats['commands'] += len(commands)
+        logger.debug(f"Flushed {len(commands)} Redis commands for bot visits")
+        return len(commands)
+
+    async def apply_once(self, marker: str, commands: List[Tuple[str, tuple]],
+                         ttl: int = APPLIED_MARKER_TTL_SECONDS) -> bool:
+        """
+        Send drained commands in one MULTI/EXEC that also sets `marker`, unless the marker already
+        exists, so replaying the same batch is a no-op. Returns whether the commands were applied.
+        """
+        if not commands or await self.redis_client.exists(marker):
+            return False
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        for method, args in commands:
+            getattr(pipe, method)(*args)
+        pipe.set(marker, 1, ex=ttl)
+        await pipe.execute()
+
+        self.stats['round_trips'] += 1
+        self.stats['flushes'] += 1
+        self.stats['commands'] += len(commands)
+        return True
+
+    def drain_commands(self) -> List[Tuple[str, tuple]]:
+        """Take the buffered Redis writes as (method, args) commands without sending them (spill records stay buffered)"""
+        commands: List[Tuple[str, tuple]] = []
+
+        for key, members in self._sorted_sets.items():
+            commands.append(('zadd', (key, members)))
+            commands.append(cap_command(key, self.recent_window))
+        for (key, field), amount in self._hash_increments.items():
+            commands.append(('hincrby', (key, field, amount)))
+        for key, amount in self._counter_increments.items():
+            commands.append(('incrby', (key, amount)))
+        # TTLs last so every key exists when its expiry is set
+        for key, ttl in self._expiring_keys.items():
+            commands.append(('expire', (key, ttl)))
+
+        self._sorted_sets = defaultdict(dict)
+        self._hash_increments = defaultdict(int)
+        self._counter_increments = defaultdict(int)
+        self._expiring_keys = {}
+        self.pending_visits = 0
+
+        return commands
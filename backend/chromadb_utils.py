@@ -2,15 +2,23 @@ import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
+from model_registry import DEFAULT_EMBEDDING_MODEL, get_shared_model
+from embedding_cache import get_embedding_cache
+
 # Initialize ChromaDB client and collection
 chroma_client = chromadb.Client(Settings())
 collection = chroma_client.get_or_create_collection("brand_content")
 
-# Use a sentence transformer for embeddings
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+def _get_embedder():
+    # Shared with the optimization engine; loaded on first use instead of at import
+    return get_shared_model(DEFAULT_EMBEDDING_MODEL, loader=SentenceTransformer)
+
+def _encode(texts):
+    return _get_embedder().encode(texts, convert_to_numpy=True)
 
 def add_content_to_chromadb(content_id: str, content_text: str, metadata: dict = None):
-    embedding = embedder.encode([content_text])[0]
+    # Boilerplate shared across brands is embedded once and reused from the cache
+    embedding = get_embedding_cache(DEFAULT_EMBEDDING_MODEL).get_or_encode([content_text], _encode)[0].tolist()
     collection.add(
         ids=[content_id],
         embeddings=[embedding],
@@ -19,9 +27,9 @@ def add_content_to_chromadb(content_id: str, content_text: str, metadata: dict =
     )
 
 def query_chromadb(query_text: str, top_k: int = 5):
-    embedding = embedder.encode([query_text])[0]
+    embedding = _get_embedder().encode([query_text])[0]
     results = collection.query(
         query_embeddings=[embedding],
         n_results=top_k
     )
-    return results 
\ No newline at end of file
+    return results 
@@ -6,7 +6,7 @@ Includes user subscriptions, API usage, error logs, admin activity, and user imp
 import uuid
 from datetime import datetime
 from sqlalchemy import (
-    Column, String, Integer, Float, Boolean, DateTime, JSON, Text, 
+    Column, String, Integer, BigInteger, Float, Boolean, DateTime, JSON, Text, 
     ForeignKey, CheckConstraint, Index, UniqueConstraint, Enum
 )
 from sqlalchemy.dialects.postgresql import UUID
@@ -323,6 +323,7 @@ class ServerLogUpload(Base):
     filename = Column(String(255), nullable=False)
     file_size_bytes = Column(Integer, nullable=False)
     file_format = Column(String(50), nullable=False)  # nginx, apache, cloudflare, etc.
+    format_string = Column(Text, nullable=True)  # nginx log_format / Apache LogFormat for "custom"
     
     # Processing status
     status = Column(String(50), default="uploaded")  # uploaded, processing, completed, failed
@@ -330,6 +331,16 @@ class ServerLogUpload(Base):
     processing_completed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     
+    # Resumable processing (see log_jobs.py)
+    file_path = Column(String(1024), nullable=True)
+    bytes_processed = Column(BigInteger, default=0)
+    lines_processed = Column(BigInteger, default=0)
+    lines_per_second = Column(Float, nullable=True)
+    eta_seconds = Column(Float, nullable=True)
+    last_checkpoint_at = Column(DateTime, nullable=True)
+    worker_id = Column(String(255), nullable=True)  # runner that claimed the job
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed while that runner is alive
+    
     # Analysis results
     total_requests = Column(Integer, nullable=True)
     bot_requests = Column(Integer, nullable=True)
@@ -523,8 +534,8 @@ class BotVisit(Base):
     platform = Column(String(50), nullable=True)  # anthropic, openai, google, etc.
     user_agent = Column(Text, nullable=True)
     
-    # Visit details
-    timestamp = Column(DateTime, default=func.now())
+    # Visit details; part of the key because the table is partitioned by month on it
+    timestamp = Column(DateTime, primary_key=True, nullable=False, default=func.now())
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     path = Column(String(500), nullable=False)
     status_code = Column(Integer, nullable=False)
@@ -534,10 +545,18 @@ class BotVisit(Base):
     brand_mentioned = Column(Boolean, default=False)
     content_type = Column(String(50), nullable=True)
     
+    # Source log upload and segment (start offset) the row was bulk-loaded from; re-loading a
+    # segment replaces its rows (see bot_visit_loader.py)
+    upload_id = Column(UUID(as_uuid=True), ForeignKey("server_log_uploads.id", ondelete="CASCADE"), nullable=True)
+    upload_segment = Column(BigInteger, nullable=True)
+    
     __table_args__ = (
         Index('ix_bot_visits_brand_timestamp', 'brand_id', 'timestamp'),
         Index('ix_bot_visits_bot_platform', 'bot_name', 'platform'),
         Index('ix_bot_visits_timestamp', 'timestamp'),
+        Index('ix_bot_visits_upload_segment', 'upload_id', 'upload_segment'),
+        # Monthly partitions are managed by partition_manager.py
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
     
     # Relationships
@@ -569,12 +588,15 @@ class TrackingEvent(Base):
     
     # FIXED: Renamed from 'metadata' to 'event_metadata' to avoid SQLAlchemy conflict
     event_metadata = Column(JSON, nullable=True)
-    timestamp = Column(DateTime, default=func.now())
+    # Part of the key because the table is partitioned by month on it
+    timestamp = Column(DateTime, primary_key=True, nullable=False, default=func.now())
     
     __table_args__ = (
         Index('ix_tracking_events_brand_timestamp', 'brand_id', 'timestamp'),
         Index('ix_tracking_events_session', 'session_id'),
         Index('ix_tracking_events_type', 'event_type'),
+        # Monthly partitions are managed by partition_manager.py
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
     
     # Relationships
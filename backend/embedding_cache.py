@@ -0,0 +1,216 @@
+"""
+Embedding Cache
+Content-addressed two-tier cache for text embeddings: an in-process LRU bounded by bytes,
+backed by Redis storing raw float32 vectors
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+DEFAULT_CACHE_MAX_BYTES = int(os.getenv('EMBEDDING_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+DEFAULT_CACHE_TTL = int(os.getenv('EMBEDDING_CACHE_TTL', 7 * 24 * 3600))
+REDIS_RETRY_SECONDS = 60
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share one embedding"""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+def make_cache_key(model_name: str, text: str) -> str:
+    """Content address for an embedding: sha256 of model name and normalized text"""
+    digest = hashlib.sha256(f"{model_name}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+    return f"emb:{digest}"
+
+class EmbeddingCache:
+    """
+    Embedding cache for one model.
+    Memory tier is an LRU capped at max_bytes; Redis tier stores float32 bytes with a TTL.
+    """
+
+    def __init__(self, model_name: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 redis_url: Optional[str] = None, ttl: int = DEFAULT_CACHE_TTL):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+    def get_or_encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return a float32 matrix with one row per text.
+        Only texts missing from both tiers are passed to encode_fn, in a single call.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [make_cache_key(self.model_name, text) for text in texts]
+        rows: List[Optional[np.ndarray]] = [self._memory_get(key) for key in keys]
+        memory_hits = sum(1 for row in rows if row is not None)
+
+        missing = [index for index, row in enumerate(rows) if row is None]
+        redis_hits = 0
+        if missing:
+            found = self._redis_get_many([keys[index] for index in missing])
+            for index, vector in zip(missing, found):
+                if vector is not None:
+                    rows[index] = vector
+                    self._memory_put(keys[index], vector)
+                    redis_hits += 1
+
+        missing = [index for index, row in enumerate(rows) if row is None]
+        if missing:
+            # Encode each distinct key once even if the batch repeats a paragraph
+            unique_keys = list(dict.fromkeys(keys[index] for index in missing))
+            first_text = {}
+            for index in missing:
+                first_text.setdefault(keys[index], texts[index])
+
+            encoded = np.atleast_2d(np.asarray(encode_fn([first_text[key] for key in unique_keys]), dtype=np.float32))
+            if encoded.shape[0] != len(unique_keys):
+                raise ValueError(f"Expected {len(unique_keys)} embeddings, got {encoded.shape[0]}")
+
+            # Copies, not views: a view would keep the whole batch alive past the byte budget
+            new_vectors = {key: encoded[i].copy() for i, key in enumerate(unique_keys)}
+            for key, vector in new_vectors.items():
+                self._memory_put(key, vector)
+            self._redis_set_many(new_vectors)
+            for index in missing:
+                rows[index] = new_vectors[keys[index]]
+
+        self._record(memory_hits, redis_hits, len(missing))
+        return np.ascontiguousarray(np.vstack(rows))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters and memory tier usage"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['memory_bytes'] = self._current_bytes
+        lookups = stats['memory_hits'] + stats['redis_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['redis_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop the memory tier (Redis entries expire on their own)"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    # ==================== MEMORY TIER ====================
+
+    def _memory_get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key: str, vector: np.ndarray):
+        if vector.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._current_bytes += vector.nbytes
+            while self._current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._current_bytes -= evicted.nbytes
+
+    # ==================== REDIS TIER ====================
+
+    def _get_redis(self):
+        if not self.redis_url or time.time() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            try:
+                import redis
+                # Raw bytes, not decoded strings
+                self._redis = redis.from_url(self.redis_url, decode_responses=False)
+            except Exception as e:
+                self._disable_redis(e)
+        return self._redis
+
+    def _disable_redis(self, error: Exception):
+        logger.warning(f"Embedding cache Redis tier unavailable, retrying in {REDIS_RETRY_SECONDS}s: {error}")
+        self._redis = None
+        self._redis_retry_at = time.time() + REDIS_RETRY_SECONDS
+
+    def _redis_get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        client = self._get_redis()
+        if client is None:
+            return [None] * len(keys)
+        try:
+            values = client.mget(keys)
+        except Exception as e:
+            self._disable_redis(e)
+            return [None] * len(keys)
+
+        vectors = []
+        for value in values:
+            if value and len(value) % 4 == 0:
+                vectors.append(np.frombuffer(value, dtype=np.float32))
+            else:
+                vectors.append(None)
+        return vectors
+
+    def _redis_set_many(self, vectors: Dict[str, np.ndarray]):
+        client = self._get_redis()
+        if client is None or not vectors:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, vector in vectors.items():
+                pipe.setex(key, self.ttl, vector.astype(np.float32, copy=False).tobytes())
+            pipe.execute()
+        except Exception as e:
+            self._disable_redis(e)
+
+    def _record(self, memory_hits: int, redis_hits: int, misses: int):
+        with self._lock:
+            self.stats['memory_hits'] += memory_hits
+            self.stats['redis_hits'] += redis_hits
+            self.stats['misses'] += misses
+        try:
+            from monitoring import get_prometheus_metrics
+            counter = get_prometheus_metrics().embedding_cache_requests
+            if memory_hits:
+                counter.labels(tier='memory', result='hit').inc(memory_hits)
+            if redis_hits:
+                counter.labels(tier='redis', result='hit').inc(redis_hits)
+            if misses:
+                counter.labels(tier='all', result='miss').inc(misses)
+        except Exception as e:
+            logger.debug(f"Embedding cache metrics not reported: {e}")
+
+# One cache per model name, shared process-wide
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    """Get the process-wide embedding cache for a model"""
+    cache = _caches.get(model_name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(model_name)
+            if cache is None:
+                redis_url = os.getenv('EMBEDDING_CACHE_REDIS_URL', os.getenv('REDIS_URL'))
+                cache = EmbeddingCache(model_name, redis_url=redis_url)
+                _caches[model_name] = cache
+    return cache
@@ -0,0 +1,142 @@
+"""
+GeoIP Service
+Memoized geolocation over a memory-mapped GeoLite2 City database. Crawler traffic comes from a
+small set of ranges, so results are cached per IP and per /24 (IPv6: /48) prefix, and a log's
+unique IPs are resolved in one batch after parsing instead of once per hit.
+"""
+
+import ipaddress
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+import geoip2.database
+import geoip2.errors
+
+logger = logging.getLogger(__name__)
+
+Location = Tuple[Optional[str], Optional[str]]  # (country, city)
+NO_LOCATION: Location = (None, None)
+
+DEFAULT_CACHE_SIZE = int(os.getenv('GEOIP_CACHE_SIZE', 65536))
+IPV4_PREFIX_LEN = 24
+IPV6_PREFIX_LEN = 48
+
+class _LRUCache:
+    """Bounded mapping that evicts the least recently used key; safe across executor threads"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+def _prefix_key(ip_address: str) -> Optional[Tuple[int, int]]:
+    """(version, network) of the /24 or /48 containing an address; None if it isn't one"""
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+    prefix_len = IPV4_PREFIX_LEN if address.version == 4 else IPV6_PREFIX_LEN
+    host_bits = address.max_prefixlen - prefix_len
+    return address.version, int(address) >> host_bits
+
+class GeoIPService:
+    """
+    Country/city lookups with an IP-level LRU and a prefix memo.
+    The prefix memo is only filled when the database record covers the whole /24 (or /48),
+    so it never changes an answer; finer-grained records stay in the per-IP cache.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        mode: int = geoip2.database.MODE_MMAP
+    ):
+        self.reader = None
+        if db_path and os.path.exists(db_path):
+            try:
+                self.reader = geoip2.database.Reader(db_path, mode=mode)
+                logger.info("GeoIP database loaded successfully")
+            except Exception as e:
+                logger.warning(f"Failed to load GeoIP database: {e}")
+
+        self._ips = _LRUCache(cache_size)
+        self._prefixes = _LRUCache(cache_size)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.reader is not None
+
+    def lookup(self, ip_address: str) -> Location:
+        """Country and city names for one address"""
+        if self.reader is None:
+            return NO_LOCATION
+
+        location = self._ips.get(ip_address)
+        if location is not None:
+            self.hits += 1
+            return location
+
+        prefix = _prefix_key(ip_address)
+        if prefix is None:
+            return NO_LOCATION
+        location = self._prefixes.get(prefix)
+        if location is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            location, network_prefix_len = self._query(ip_address)
+            covering_len = IPV4_PREFIX_LEN if prefix[0] == 4 else IPV6_PREFIX_LEN
+            if network_prefix_len is not None and network_prefix_len <= covering_len:
+                self._prefixes.put(prefix, location)
+        self._ips.put(ip_address, location)
+        return location
+
+    def lookup_many(self, ip_addresses: Iterable[str]) -> Dict[str, Location]:
+        """Locations for each distinct address; blocking, so run it off the event loop"""
+        return {ip_address: self.lookup(ip_address) for ip_address in set(ip_addresses)}
+
+    def _query(self, ip_address: str) -> Tuple[Location, Optional[int]]:
+        """Database lookup: location and the prefix length of the record that answered it"""
+        try:
+            response = self.reader.city(ip_address)
+        except geoip2.errors.AddressNotFoundError as e:
+            network = getattr(e, 'network', None)
+            return NO_LOCATION, network.prefixlen if network is not None else None
+        except ValueError:
+            return NO_LOCATION, None
+        network = response.traits.network
+        return (response.country.name, response.city.name), network.prefixlen if network is not None else None
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+@lru_cache(maxsize=None)
+def get_geoip_service(db_path: Optional[str]) -> GeoIPService:
+    """Process-wide service per database, so the caches outlive individual analyzers"""
+    return GeoIPService(db_path)
@@ -11,16 +11,19 @@ from sqlalchemy import and_
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import structlog
-import tempfile
-import asyncio
 
 from database import get_db
 from models import StandardResponse, ErrorResponse
 from db_models import (
     User, Brand, UserBrand, ServerLogUpload,
-    UserSubscription, SubscriptionPlan
+    UserSubscription, SubscriptionPlan, BotVisit
 )
+from bot_activity import bot_activity_summary
 from log_analyzer import ServerLogAnalyzer
+from redis_pool import get_redis
+from log_jobs import log_job_runner
+import log_sources
+import log_formats
 from subscription_manager import SubscriptionManager
 from utils import ValidationUtils
 from auth_utils import get_current_user
@@ -29,12 +32,15 @@ logger = structlog.get_logger()
 
 router = APIRouter(prefix="/logs", tags=["Server Logs"])
 
-# Supported log formats
+# Supported log formats (parsers live in log_formats; "custom" takes an nginx/Apache format string)
 SUPPORTED_LOG_FORMATS = {
     "nginx": ["nginx", "nginx-combined", "nginx-common"],
     "apache": ["apache", "apache-combined", "apache-common"],
     "cloudflare": ["cloudflare"],
     "aws-alb": ["aws-alb"],
+    "cloudfront": ["cloudfront"],
+    "jsonl": ["jsonl", "json"],
+    "auto": ["auto"],
     "custom": ["custom"]
 }
 
@@ -46,6 +52,7 @@ async def upload_server_log(
     brand_id: str = Form(...),
     log_format: str = Form(...),
     timezone: str = Form("UTC"),
+    format_string: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -85,32 +92,59 @@ async def upload_server_log(
             detail=f"Unsupported log format. Supported formats: {list(SUPPORTED_LOG_FORMATS.keys())}"
         )
     
+    if log_format == "custom":
+        # nginx log_format or Apache LogFormat string, compiled into a parser
+        try:
+            if not format_string:
+                raise ValueError("format_string is required for custom logs")
+            log_formats.get_log_parser(format_string)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     # Check file size
     file_size = 0
     temp_file_path = None
     
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".log") as temp_file:
-            temp_file_path = temp_file.name
-            
-            # Read and save file in chunks
-            chunk_size = 1024 * 1024  # 1MB chunks
-            async with aiofiles.open(temp_file_path, 'wb') as f:
-                while True:
-                    chunk = await file.read(chunk_size)
-                    if not chunk:
-                        break
-                    file_size += len(chunk)
-                    
-                    # Check size limit
-                    if file_size > MAX_FILE_SIZE:
-                        raise HTTPException(
-                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024**3):.1f}GB"
-                        )
-                    
-                    await f.write(chunk)
+        # Save uploaded file where the processing job (and a restarted worker) can find it
+        temp_file_path = log_job_runner.new_upload_path(suffix=".log")
+        
+        # Read and save file in chunks
+        chunk_size = 1024 * 1024  # 1MB chunks
+        async with aiofiles.open(temp_file_path, 'wb') as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                
+                # Check size limit
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024**3):.1f}GB"
+                    )
+                
+                await f.write(chunk)
+        
+        # gzip, zstd and tar bundles are kept compressed and decompressed while analyzing
+        compression = log_sources.detect_compression(temp_file_path)
+        if compression == "zstd" and log_sources.zstandard is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="zstd-compressed logs are not supported on this server"
+            )
+        
+        if log_format == "auto":
+            log_format = log_formats.detect_file_format(temp_file_path)
+            if not log_format:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Could not detect the log format. Please specify it."
+                )
         
         # Check daily limit for subscription
         today_gb = await _get_today_log_usage(current_user, db)
@@ -130,21 +164,15 @@ async def upload_server_log(
             filename=ValidationUtils.sanitize_filename(file.filename),
             file_size_bytes=file_size,
             file_format=log_format,
+            format_string=format_string if log_format == "custom" else None,
+            file_path=temp_file_path,
             status="uploaded"
         )
         db.add(log_upload)
         db.commit()
         
-        # Start async analysis
-        asyncio.create_task(
-            _analyze_log_file(
-                log_upload.id,
-                temp_file_path,
-                log_format,
-                brand_id,
-                db
-            )
-        )
+        # Start resumable analysis; the job owns the file from here on
+        log_job_runner.submit(log_upload.id)
         
         return StandardResponse(
             success=True,
@@ -162,7 +190,7 @@ async def upload_server_log(
         raise
     
     finally:
-        # Cleanup will be handled by analysis task
+        # Cleanup will be handled by the analysis job
         pass
 
 @router.get("/upload/{upload_id}/status", response_model=StandardResponse)
@@ -210,6 +238,19 @@ async def get_upload_status(
     elif log_upload.status == "failed":
         response_data["error"] = log_upload.error_message
     
+    if log_upload.status in ("processing", "completed"):
+        bytes_processed = log_upload.bytes_processed or 0
+        response_data["progress"] = {
+            "bytes_processed": bytes_processed,
+            "bytes_total": log_upload.file_size_bytes,
+            "percent": round(
+                min(100.0, bytes_processed / log_upload.file_size_bytes * 100), 1
+            ) if log_upload.file_size_bytes else 100.0,
+            "lines_processed": log_upload.lines_processed or 0,
+            "lines_per_second": round(log_upload.lines_per_second, 1) if log_upload.lines_per_second else None,
+            "eta_seconds": round(log_upload.eta_seconds) if log_upload.eta_seconds is not None else None
+        }
+    
     return StandardResponse(
         success=True,
         data=response_data
@@ -246,9 +287,8 @@ async def get_log_analysis(
             detail="Brand not found"
         )
     
-    # Initialize analyzer
-    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-    analyzer = ServerLogAnalyzer(redis.from_url(redis_url))
+    # Initialize analyzer on the shared Redis pool
+    analyzer = ServerLogAnalyzer(get_redis())
     
     # Get real-time metrics from Redis
     metrics = await analyzer.get_real_time_metrics(brand.name, days)
@@ -313,86 +353,11 @@ async def get_bot_activity(
             detail="You don't have access to this brand"
         )
     
-    # Get bot visits from database
-    query = db.query(BotVisit).filter(
-        and_(
-            BotVisit.brand_id == brand_id,
-            BotVisit.timestamp >= datetime.utcnow() - timedelta(days=days)
-        )
-    )
-    
-    if platform:
-        query = query.filter(BotVisit.platform == platform)
-    
-    bot_visits = query.order_by(BotVisit.timestamp.desc()).limit(1000).all()
-    
-    # Aggregate data
-    platform_stats = {}
-    hourly_distribution = {}
-    top_paths = {}
-    
-    for visit in bot_visits:
-        # Platform stats
-        if visit.platform not in platform_stats:
-            platform_stats[visit.platform] = {
-                "total_visits": 0,
-                "brand_mentions": 0,
-                "unique_paths": set(),
-                "success_rate": {"success": 0, "total": 0}
-            }
-        
-        platform_stats[visit.platform]["total_visits"] += 1
-        if visit.brand_mentioned:
-            platform_stats[visit.platform]["brand_mentions"] += 1
-        platform_stats[visit.platform]["unique_paths"].add(visit.path)
-        
-        platform_stats[visit.platform]["success_rate"]["total"] += 1
-        if visit.status_code < 400:
-            platform_stats[visit.platform]["success_rate"]["success"] += 1
-        
-        # Hourly distribution
-        hour = visit.timestamp.hour
-        if hour not in hourly_distribution:
-            hourly_distribution[hour] = 0
-        hourly_distribution[hour] += 1
-        
-        # Top paths
-        if visit.path not in top_paths:
-            top_paths[visit.path] = {"count": 0, "brand_mentions": 0}
-        top_paths[visit.path]["count"] += 1
-        if visit.brand_mentioned:
-            top_paths[visit.path]["brand_mentions"] += 1
-    
-    # Format platform stats
-    formatted_platform_stats = {}
-    for platform, stats in platform_stats.items():
-        formatted_platform_stats[platform] = {
-            "total_visits": stats["total_visits"],
-            "brand_mentions": stats["brand_mentions"],
-            "citation_rate": (stats["brand_mentions"] / stats["total_visits"] * 100) if stats["total_visits"] > 0 else 0,
-            "unique_paths": len(stats["unique_paths"]),
-            "success_rate": (stats["success_rate"]["success"] / stats["success_rate"]["total"] * 100) if stats["success_rate"]["total"] > 0 else 0
-        }
-    
-    # Get top 20 paths
-    sorted_paths = sorted(top_paths.items(), key=lambda x: x[1]["count"], reverse=True)[:20]
-    
     return StandardResponse(
         success=True,
         data={
             "period_days": days,
-            "total_bot_visits": len(bot_visits),
-            "platform_breakdown": formatted_platform_stats,
-            "hourly_distribution": hourly_distribution,
-            "top_paths": [
-                {
-                    "path": path,
-                    "visits": data["count"],
-                    "brand_mentions": data["brand_mentions"],
-                    "citation_rate": (data["brand_mentions"] / data["count"] * 100) if data["count"] > 0 else 0
-                }
-                for path, data in sorted_paths
-            ]
+            **bot_activity_summary(db, brand_id, datetime.utcnow() - timedelta(days=days), platform)
         }
     )
 
@@ -427,12 +392,18 @@ async def analyze_log_sample(
         )
     
     try:
-        # Initialize analyzer
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-        analyzer = ServerLogAnalyzer(redis.from_url(redis_url))
+        # Initialize analyzer on the shared Redis pool
+        analyzer = ServerLogAnalyzer(get_redis())
         
         # Parse sample lines
         lines = log_sample.strip().split('\n')
+        if log_format == "auto":
+            log_format = log_formats.detect_log_format(lines[:100])
+            if not log_format:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Could not detect the log format. Please specify it."
+                )
         bot_visits = []
         total_requests = 0
         
@@ -458,6 +429,7 @@ async def analyze_log_sample(
         return StandardResponse(
             success=True,
             data={
+                "log_format": log_format,
                 "total_lines": len(lines),
                 "total_parsed": total_requests,
                 "bot_visits_found": len(bot_visits),
@@ -466,6 +438,8 @@ async def analyze_log_sample(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Log sample analysis failed: {e}")
         raise HTTPException(
@@ -475,83 +449,6 @@ async def analyze_log_sample(
 
 # Helper functions
 
-async def _analyze_log_file(
-    upload_id: str,
-    file_path: str,
-    log_format: str,
-    brand_id: str,
-    db: Session
-):
-    """Async task to analyze uploaded log file"""
-    
-    try:
-        # Update status to processing
-        upload = db.query(ServerLogUpload).filter(
-            ServerLogUpload.id == upload_id
-        ).first()
-        
-        if not upload:
-            return
-        
-        upload.status = "processing"
-        upload.processing_started_at = datetime.utcnow()
-        db.commit()
-        
-        # Get brand name
-        brand = db.query(Brand).filter(Brand.id == brand_id).first()
-        if not brand:
-            raise Exception("Brand not found")
-        
-        # Initialize analyzer
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-        geoip_path = os.getenv('GEOIP_PATH')
-        analyzer = ServerLogAnalyzer(redis.from_url(redis_url), geoip_path)
-        
-        # Analyze file
-        results = await analyzer.analyze_log_file(
-            log_file_path=file_path,
-            brand_name=brand.name,
-            log_format=log_format
-        )
-        
-        # Update upload record with results
-        upload.status = "completed"
-        upload.processing_completed_at = datetime.utcnow()
-        upload.total_requests = results['total_requests']
-        upload.bot_requests = results['llm_bot_requests']
-        upload.unique_bots = results['unique_bot_ips']
-        
-        # Extract date range from results
-        if results.get('daily_trends'):
-            dates = list(results['daily_trends'].get(
-                next(iter(results['daily_trends'])), {}
-            ).keys())
-            if dates:
-                upload.date_range_start = datetime.fromisoformat(min(dates))
-                upload.date_range_end = datetime.fromisoformat(max(dates))
-        
-        db.commit()
-        
-        logger.info(f"Log analysis completed for upload {upload_id}")
-        
-    except Exception as e:
-        logger.error(f"Log analysis failed for upload {upload_id}: {e}")
-        
-        # Update upload status
-        upload = db.query(ServerLogUpload).filter(
-            ServerLogUpload.id == upload_id
-        ).first()
-        
-        if upload:
-            upload.status = "failed"
-            upload.error_message = str(e)
-            db.commit()
-    
-    finally:
-        # Cleanup temp file
-        if os.path.exists(file_path):
-            os.unlink(file_path)
-
 async def _get_today_log_usage(user: User, db: Session) -> float:
     """Get today's log usage in GB"""
     
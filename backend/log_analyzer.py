@@ -8,16 +8,29 @@ import json
 import asyncio
 from datetime import datetime, timedelta
 from collections import defaultdict
-from typing import Dict, List, Optional, Set, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 import logging
 from dataclasses import dataclass, asdict
+from functools import lru_cache
 from ua_parser import user_agent_parser
 from user_agents import parse as parse_user_agent
-import geoip2.database
-import redis
+import redis.asyncio as aioredis
 import os
 import aiofiles
+import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from bot_signatures import LLMBotPattern, DEFAULT_LLM_BOT_PATTERNS, SUSPICIOUS_BOT_PATTERNS, get_signature_matcher
+from log_timestamps import parse_timestamp
+from visit_columns import BotVisitColumns, VisitSummary
+from bot_visit_sink import BotVisitSink, daily_rollup_key, monthly_rollup_key, rollup_fields
+from log_sources import LogLineReader, detect_compression
+from log_follower import LogFollower
+from log_formats import get_log_parser, detect_file_format
+from geoip_service import get_geoip_service
+from redis_pool import read_pipelined
+from visit_retention import SegmentSpill, visit_spill
 
 logger = logging.getLogger(__name__)
 
@@ -36,19 +49,288 @@ class BotVisit:
     country: Optional[str]
     city: Optional[str]
     platform: str
+    brand_mentioned: bool = False
+    content_type: Optional[str] = None
     
     def to_dict(self):
         data = asdict(self)
         data['timestamp'] = self.timestamp.isoformat()
         return data
 
-@dataclass
-class LLMBotPattern:
-    """Pattern to identify LLM bots"""
-    name: str
-    patterns: List[str]
-    type: str  # 'crawler', 'api', 'browser'
-    platform: str  # 'openai', 'anthropic', 'google', etc.
+# Content categories by path, first match wins (bot_visits.content_type and content interest)
+CONTENT_CATEGORIES = {
+    'product_pages': r'/product[s]?/|/item[s]?/|/p/',
+    'category_pages': r'/category/|/categories/|/c/',
+    'blog_posts': r'/blog/|/post[s]?/|/article[s]?/',
+    'api_endpoints': r'/api/|/v\d+/',
+    'static_assets': r'\.(css|js|jpg|jpeg|png|gif|svg|ico|woff|woff2|ttf)$',
+    'home_page': r'^/$|^/index\.',
+    'about_pages': r'/about|/company|/team',
+    'faq_pages': r'/faq|/help|/support',
+    'reviews': r'/review[s]?/|/testimonial[s]?/',
+    'search': r'/search|/s\?',
+    'checkout': r'/cart|/checkout|/order',
+    'sitemap': r'sitemap\.xml|/sitemap',
+    'robots': r'robots\.txt'
+}
+_CONTENT_CATEGORY_RES = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in CONTENT_CATEGORIES.items()]
+
+@lru_cache(maxsize=65536)
+def classify_content_type(path: str) -> str:
+    """Content category of a request path ('other' if none match); memoized since paths repeat"""
+    for name, pattern in _CONTENT_CATEGORY_RES:
+        if pattern.search(path):
+            return name
+    return 'other'
+
+# Platforms reported by get_real_time_metrics
+REALTIME_PLATFORMS = ['openai', 'anthropic', 'google', 'perplexity', 'microsoft', 'you', 'cohere']
+
+ROLLUP_METRIC_NAMES = {
+    'visits': 'visits',
+    'brand': 'brand_mentions',
+    'crawl_total': 'crawl_total',
+    'crawl_ok': 'crawl_successful'
+}
+
+# Parallel analysis settings; files smaller than PARALLEL_MIN_BYTES are analyzed in-process
+DEFAULT_LOG_WORKERS = int(os.getenv('LOG_ANALYSIS_WORKERS', os.cpu_count() or 1))
+PARALLEL_MIN_BYTES = int(os.getenv('LOG_ANALYSIS_PARALLEL_MIN_BYTES', 16 * 1024 * 1024))
+# Compressed sources report progress (and store visits) once per this many lines
+STREAM_SEGMENT_LINES = int(os.getenv('LOG_ANALYSIS_STREAM_SEGMENT_LINES', 500000))
+# Decompressed lines one compressed upload may expand to (upload limits only see compressed bytes)
+STREAM_MAX_LINES = int(os.getenv('LOG_ANALYSIS_STREAM_MAX_LINES', 200_000_000))
+# Newest visits reported individually in the analysis results
+VISIT_DETAIL_LIMIT = 1000
+
+def match_llm_bot(user_agent: str, bot_patterns: List[LLMBotPattern]) -> Optional[Tuple[LLMBotPattern, float]]:
+    """
+    Identify if a user agent belongs to an LLM bot
+    Returns the bot pattern and confidence score if matched
+    """
+    return get_signature_matcher(bot_patterns).match(user_agent)
+
+def parse_log_timestamp(timestamp_str: str, log_format: str) -> Optional[datetime]:
+    """Parse timestamp based on log format (naive UTC; None if unparseable)"""
+    return parse_timestamp(timestamp_str, log_format)
+
+def _nested_counter():
+    # Module-level factory so aggregates stay picklable across processes
+    return defaultdict(int)
+
+class LogAnalysisAggregate:
+    """
+    Per-line accumulator for log analysis.
+    Used directly for in-process analysis and per shard in parallel mode; shards are merged in file order.
+    """
+    
+    def __init__(self, brand_name: str, log_format: str, bot_patterns: List[LLMBotPattern],
+                 date_range: Optional[Tuple[datetime, datetime]] = None):
+        self.brand_name_lower = brand_name.lower()
+        self.log_format = log_format
+        self.bot_patterns = bot_patterns
+        self.date_range = date_range
+        # Compiled once per format string; raises ValueError for unknown formats
+        self.parser = get_log_parser(log_format)
+        self._matcher = get_signature_matcher(bot_patterns)
+        
+        self.total_visits = 0
+        self.brand_visits = 0
+        self.unparseable_timestamps = 0
+        # Typed columns instead of one BotVisit object per hit
+        self.visits = BotVisitColumns()
+        # Visits folded out of the columns (see fold_visits): their counters and newest rows
+        self.folded_visits = VisitSummary()
+        self.visit_detail: List[Dict] = []
+        self.llm_bot_visits = defaultdict(_nested_counter)
+        self.path_access_frequency = defaultdict(_nested_counter)
+        self.hourly_distribution = defaultdict(_nested_counter)
+        self.daily_trends = defaultdict(_nested_counter)
+        # Confidence kept as sum/count so shard averages merge exactly
+        self.confidence_sums = defaultdict(float)
+        self.confidence_counts = defaultdict(int)
+    
+    def __getstate__(self):
+        # The matcher holds a compiled regex and memo; workers rebuild it from the patterns
+        state = self.__dict__.copy()
+        state.pop('_matcher', None)
+        return state
+    
+    def __setstate__(self, state):
+        # Checkpoints written before visits were folded have neither attribute
+        state.setdefault('folded_visits', VisitSummary())
+        state.setdefault('visit_detail', [])
+        self.__dict__.update(state)
+        self._matcher = get_signature_matcher(self.bot_patterns)
+    
+    def process_line(self, line: str) -> bool:
+        """Account for one log line; returns whether it was a bot visit"""
+        self.total_visits += 1
+        
+        record = self.parser.parse(line)
+        if record is None:
+            return False
+        ip, timestamp_str, path, status_code, bytes_sent, referer, user_agent, response_time = record
+        
+        timestamp = parse_log_timestamp(timestamp_str, self.parser.timestamp_format)
+        if timestamp is None:
+            # Skip rather than misattribute the line to the current time
+            self.unparseable_timestamps += 1
+            return False
+        
+        # Check date range if specified
+        if self.date_range:
+            if timestamp < self.date_range[0] or timestamp > self.date_range[1]:
+                return False
+        
+        bot_result = self._matcher.match(user_agent)
+        if not bot_result:
+            return False
+        
+        bot_pattern, confidence = bot_result
+        brand_mentioned = self.brand_name_lower in path.lower()
+        # Straight into the columns: no per-visit object
+        self.visits.append(
+            timestamp=timestamp,
+            bot_name=bot_pattern.name,
+            ip_address=ip,
+            user_agent=user_agent,
+            path=path,
+            status_code=status_code,
+            response_time=response_time,
+            bytes_sent=bytes_sent,
+            referer=referer,
+            country=None,
+            city=None,
+            platform=bot_pattern.platform,
+            brand_mentioned=brand_mentioned,
+            content_type=classify_content_type(path)
+        )
+        self.confidence_sums[bot_pattern.platform] += confidence
+        self.confidence_counts[bot_pattern.platform] += 1
+        
+        # Update statistics
+        self.llm_bot_visits[bot_pattern.platform][bot_pattern.name] += 1
+        self.path_access_frequency[bot_pattern.platform][path] += 1
+        self.hourly_distribution[bot_pattern.platform][timestamp.hour] += 1
+        self.daily_trends[bot_pattern.platform][timestamp.date().isoformat()] += 1
+        
+        # Check if brand is mentioned in path
+        if brand_mentioned:
+            self.brand_visits += 1
+        
+        return True
+    
+    def merge(self, other: 'LogAnalysisAggregate'):
+        """Fold a later shard into this one"""
+        self.total_visits += other.total_visits
+        self.brand_visits += other.brand_visits
+        self.unparseable_timestamps += other.unparseable_timestamps
+        if other.folded_visits.count:
+            # Keep detail rows in file order: our unfolded rows come before the other's folded ones
+            self.fold_visits()
+            self.folded_visits.merge(other.folded_visits)
+            self.visit_detail = (self.visit_detail + other.visit_detail)[-VISIT_DETAIL_LIMIT:]
+        self.visits.extend(other.visits)
+        for mine, theirs in (
+            (self.llm_bot_visits, other.llm_bot_visits),
+            (self.path_access_frequency, other.path_access_frequency),
+            (self.hourly_distribution, other.hourly_distribution),
+            (self.daily_trends, other.daily_trends)
+        ):
+            for platform, counts in theirs.items():
+                target = mine[platform]
+                for key, count in counts.items():
+                    target[key] += count
+        for platform, total in other.confidence_sums.items():
+            self.confidence_sums[platform] += total
+            self.confidence_counts[platform] += other.confidence_counts[platform]
+
+    def fold_visits(self):
+        """
+        Replace the visit columns with counters and the newest VISIT_DETAIL_LIMIT rows, so the
+        aggregate stays a fixed size once its visits are stored elsewhere (e.g. job checkpoints)
+        """
+        if not len(self.visits):
+            return
+        self.folded_visits.merge(VisitSummary.from_columns(self.visits))
+        self.visit_detail = (self.visit_detail + self.visits.tail(VISIT_DETAIL_LIMIT))[-VISIT_DETAIL_LIMIT:]
+        self.visits = BotVisitColumns()
+    
+    def visit_summary(self) -> VisitSummary:
+        """Counters over every visit, folded or not"""
+        summary = VisitSummary()
+        summary.merge(self.folded_visits)
+        summary.merge(VisitSummary.from_columns(self.visits))
+        return summary
+    
+    def recent_visits(self, count: int = VISIT_DETAIL_LIMIT) -> List[Dict]:
+        """The newest `count` visits as rows, oldest first"""
+        return (self.visit_detail + self.visits.tail(count))[-count:]
+
+def align_to_line(file_path: str, offset: int) -> int:
+    """Smallest line start at or after offset"""
+    if offset <= 0:
+        return 0
+    with open(file_path, 'rb') as f:
+        f.seek(offset - 1)
+        f.readline()
+        return f.tell()
+
+def compute_shard_ranges(file_path: str, shards: int, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split [start, end) of a file into up to `shards` byte ranges that start and end on line boundaries"""
+    end = os.path.getsize(file_path) if end is None else end
+    size = end - start
+    if size <= 0:
+        return []
+    shards = max(1, min(shards, size))
+    
+    boundaries = [start]
+    with open(file_path, 'rb') as f:
+        for index in range(1, shards):
+            offset = max(start + size * index // shards, boundaries[-1], 1)
+            # Move to the start of the line following offset - 1
+            f.seek(offset - 1)
+            f.readline()
+            boundaries.append(min(f.tell(), end))
+    boundaries.append(end)
+    
+    return [(range_start, range_end) for range_start, range_end in zip(boundaries, boundaries[1:]) if range_end > range_start]
+
+def analyze_log_shard(
+    file_path: str,
+    start: int,
+    end: int,
+    brand_name: str,
+    log_format: str,
+    bot_patterns: List[LLMBotPattern],
+    date_range: Optional[Tuple[datetime, datetime]] = None
+) -> LogAnalysisAggregate:
+    """Analyze the lines in [start, end) of a log file; runs in a worker process"""
+    aggregate = LogAnalysisAggregate(brand_name, log_format, bot_patterns, date_range)
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            raw = f.readline()
+            if not raw:
+                break
+            position += len(raw)
+            aggregate.process_line(raw.decode('utf-8', errors='replace'))
+    return aggregate
+
+def analyze_log_lines(
+    lines: List[bytes],
+    brand_name: str,
+    log_format: str,
+    bot_patterns: List[LLMBotPattern],
+    date_range: Optional[Tuple[datetime, datetime]] = None
+) -> LogAnalysisAggregate:
+    """Analyze a batch of raw lines from a decompressed stream; runs in a worker process"""
+    aggregate = LogAnalysisAggregate(brand_name, log_format, bot_patterns, date_range)
+    for raw in lines:
+        aggregate.process_line(raw.decode('utf-8', errors='replace'))
+    return aggregate
 
 class ServerLogAnalyzer:
     """
@@ -56,339 +338,355 @@ class ServerLogAnalyzer:
     Supports multiple log formats and provides real-time analysis
     """
     
-    def __init__(self, redis_client: redis.Redis, geoip_path: Optional[str] = None):
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        geoip_path: Optional[str] = None,
+        redis_batch_size: int = 1000,
+        redis_max_pending: int = 10000,
+        spill: Optional[SegmentSpill] = visit_spill
+    ):
         self.redis_client = redis_client
         
-        # Define comprehensive LLM bot patterns based on real user agents
-        self.llm_bot_patterns = [
-            # OpenAI/ChatGPT Bots
-            LLMBotPattern(
-                name="GPTBot",
-                patterns=[
-                    "GPTBot/1.0", "GPTBot/1.1", "GPTBot/1.2",
-                    "ChatGPT-User", "OpenAI-GPT", "OpenAI-Bot"
-                ],
-                type="crawler",
-                platform="openai"
-            ),
-            
-            # Anthropic/Claude Bots
-            LLMBotPattern(
-                name="Claude-Web",
-                patterns=[
-                    "Claude-Web/1.0", "anthropic-ai", "ClaudeBot",
-                    "Claude-Web-Crawler", "Anthropic-AI-Bot"
-                ],
-                type="crawler",
-                platform="anthropic"
-            ),
-            
-            # Google Bard/Gemini Bots
-            LLMBotPattern(
-                name="Google-Extended",
-                patterns=[
-                    "Google-Extended", "Bard-Google", "Gemini-Google",
-                    "GoogleOther", "Google-InspectionTool"
-                ],
-                type="crawler",
-                platform="google"
-            ),
-            
-            # Perplexity Bots
-            LLMBotPattern(
-                name="PerplexityBot",
-                patterns=[
-                    "PerplexityBot", "Perplexity-UA", "PerplexityAI"
-                ],
-                type="crawler",
-                platform="perplexity"
-            ),
-            
-            # Bing Chat/Copilot Bots
-            LLMBotPattern(
-                name="BingChat",
-                patterns=[
-                    "BingChat/1.0", "BingPreview", "msnbot-UDiscovery",
-                    "BingCopilot", "Microsoft-Copilot"
-                ],
-                type="crawler",
-                platform="microsoft"
-            ),
-            
-            # You.com Bot
-            LLMBotPattern(
-                name="YouBot",
-                patterns=["YouBot/1.0", "You.com"],
-                type="crawler",
-                platform="you"
-            ),
-            
-            # Cohere Bots
-            LLMBotPattern(
-                name="CohereBot",
-                patterns=["CohereBot", "Cohere-AI"],
-                type="crawler",
-                platform="cohere"
-            ),
-            
-            # Common Crawl (used by many AI companies)
-            LLMBotPattern(
-                name="CCBot",
-                patterns=["CCBot/2.0", "CCBot/3.0", "CCBot/3.1"],
-                type="crawler",
-                platform="commoncrawl"
-            )
-        ]
+        # Visit writes are buffered and pipelined instead of issued one round trip at a time;
+        # Redis keeps recent visits only, the spill keeps every visit
+        self.visit_sink = BotVisitSink(
+            redis_client, batch_size=redis_batch_size, max_pending=redis_max_pending, spill=spill
+        )
         
-        # Initialize GeoIP database
-        self.geoip_reader = None
-        if geoip_path and os.path.exists(geoip_path):
-            try:
-                self.geoip_reader = geoip2.database.Reader(geoip_path)
-                logger.info("GeoIP database loaded successfully")
-            except Exception as e:
-                logger.warning(f"Failed to load GeoIP database: {e}")
-        
-        # Compile regex patterns for performance
-        self.log_patterns = {
-            'nginx': re.compile(
-                r'(?P<ip>\d+\.\d+\.\d+\.\d+) - (?P<user>\S+) \[(?P<timestamp>[^\]]+)\] '
-                r'"(?P<method>\w+) (?P<path>[^ ]+) (?P<protocol>[^"]+)" '
-                r'(?P<status>\d+) (?P<bytes>\d+) "(?P<referer>[^"]*)" '
-                r'"(?P<user_agent>[^"]*)" (?P<response_time>[\d.]+)?'
-            ),
-            'apache': re.compile(
-                r'(?P<ip>\S+) \S+ \S+ \[(?P<timestamp>[^\]]+)\] '
-                r'"(?P<method>\w+) (?P<path>[^ ]+) (?P<protocol>[^"]+)" '
-                r'(?P<status>\d+) (?P<bytes>\S+) "(?P<referer>[^"]*)" '
-                r'"(?P<user_agent>[^"]*)"'
-            ),
-            'cloudflare': re.compile(
-                r'(?P<timestamp>\S+) (?P<ip>\S+) (?P<method>\w+) (?P<path>\S+) '
-                r'(?P<status>\d+) (?P<bytes>\d+) "(?P<user_agent>[^"]*)" '
-                r'(?P<response_time>[\d.]+)'
-            )
-        }
+        self.llm_bot_patterns = list(DEFAULT_LLM_BOT_PATTERNS)
+        
+        # Memory-mapped GeoIP database with memoized lookups, shared by analyzers in this process
+        self.geoip = get_geoip_service(geoip_path)
     
     def identify_llm_bot(self, user_agent: str) -> Optional[Tuple[LLMBotPattern, float]]:
         """
         Identify if a user agent belongs to an LLM bot
         Returns the bot pattern and confidence score if matched
         """
-        if not user_agent:
-            return None
-        
-        user_agent_lower = user_agent.lower()
-        
-        for bot_pattern in self.llm_bot_patterns:
-            for pattern in bot_pattern.patterns:
-                if pattern.lower() in user_agent_lower:
-                    # Calculate confidence based on exact match vs partial match
-                    confidence = 1.0 if pattern.lower() == user_agent_lower else 0.8
-                    return (bot_pattern, confidence)
-        
-        # Check for suspicious patterns that might be LLM bots
-        suspicious_patterns = ['bot', 'crawler', 'spider', 'scraper', 'ai', 'llm']
-        for pattern in suspicious_patterns:
-            if pattern in user_agent_lower and 'googlebot' not in user_agent_lower:
-                # Lower confidence for generic patterns
-                return (LLMBotPattern(
-                    name="Unknown-AI-Bot",
-                    patterns=[user_agent],
-                    type="crawler",
-                    platform="unknown"
-                ), 0.5)
-        
-        return None
+        return match_llm_bot(user_agent, self.llm_bot_patterns)
+    
+    def resolve_log_format(self, log_file_path: str, log_format: str) -> str:
+        """
+        Validate a format name or custom format string, sampling the file when it is 'auto'
+        Raises ValueError up front instead of failing every line
+        """
+        if log_format == "auto":
+            detected = detect_file_format(log_file_path)
+            if not detected:
+                raise ValueError("Could not detect the log format; specify it explicitly")
+            logger.info(f"Detected log format {detected} for {log_file_path}")
+            return detected
+        get_log_parser(log_format)
+        return log_format
     
     async def parse_log_line(self, line: str, log_format: str = "nginx") -> Optional[Dict]:
-        """Parse a single log line based on format"""
-        pattern = self.log_patterns.get(log_format)
-        if not pattern:
+        """Parse a single log line based on format (a registered name or custom format string)"""
+        try:
+            parser = get_log_parser(log_format)
+        except ValueError:
             logger.error(f"Unsupported log format: {log_format}")
             return None
         
-        match = pattern.match(line.strip())
-        if not match:
-            return None
-        
-        return match.groupdict()
+        return parser.parse_dict(line)
     
     async def analyze_log_file(
         self, 
         log_file_path: str, 
         brand_name: str,
         log_format: str = "nginx",
-        date_range: Optional[Tuple[datetime, datetime]] = None
+        date_range: Optional[Tuple[datetime, datetime]] = None,
+        workers: Optional[int] = None
     ) -> Dict:
         """
         Analyze server log file for LLM bot activity
         Returns comprehensive statistics about AI bot visits
+        Large files are split into line-aligned byte ranges analyzed across `workers` processes
+        gzip, zstd and tar bundles of rotated logs are decompressed as a stream alongside parsing
+        `log_format` is a registered format, a custom nginx/Apache format string, or 'auto'
         """
         logger.info(f"Starting log analysis for {log_file_path}")
         
-        bot_visits = []
-        total_visits = 0
-        brand_visits = 0
-        llm_bot_visits = defaultdict(lambda: defaultdict(int))
-        path_access_frequency = defaultdict(lambda: defaultdict(int))
-        hourly_distribution = defaultdict(lambda: defaultdict(int))
-        daily_trends = defaultdict(lambda: defaultdict(int))
-        bot_confidence_scores = defaultdict(list)
+        log_format = self.resolve_log_format(log_file_path, log_format)
         
-        try:
-            async with aiofiles.open(log_file_path, 'r') as f:
-                async for line in f:
-                    total_visits += 1
-                    
-                    # Parse log line
-                    parsed = await self.parse_log_line(line, log_format)
-                    if not parsed:
-                        continue
-                    
-                    # Parse timestamp
-                    timestamp = self._parse_timestamp(parsed['timestamp'], log_format)
-                    
-                    # Check date range if specified
-                    if date_range:
-                        if timestamp < date_range[0] or timestamp > date_range[1]:
-                            continue
-                    
-                    user_agent = parsed.get('user_agent', '')
-                    
-                    # Check if it's an LLM bot
-                    bot_result = self.identify_llm_bot(user_agent)
-                    if bot_result:
-                        bot_pattern, confidence = bot_result
-                        
-                        # Get geolocation
-                        country, city = await self._get_geolocation(parsed['ip'])
-                        
-                        # Create bot visit record
-                        visit = BotVisit(
-                            timestamp=timestamp,
-                            bot_name=bot_pattern.name,
-                            ip_address=parsed['ip'],
-                            user_agent=user_agent,
-                            path=parsed['path'],
-                            status_code=int(parsed['status']),
-                            response_time=float(parsed.get('response_time', 0)),
-                            bytes_sent=int(parsed.get('bytes', 0)),
-                            referer=parsed.get('referer', ''),
-                            country=country,
-                            city=city,
-                            platform=bot_pattern.platform
-                        )
-                        
-                        bot_visits.append(visit)
-                        bot_confidence_scores[bot_pattern.platform].append(confidence)
-                        
-                        # Update statistics
-                        llm_bot_visits[bot_pattern.platform][bot_pattern.name] += 1
-                        path_access_frequency[bot_pattern.platform][parsed['path']] += 1
-                        hourly_distribution[bot_pattern.platform][timestamp.hour] += 1
-                        daily_trends[bot_pattern.platform][timestamp.date().isoformat()] += 1
-                        
-                        # Check if brand is mentioned in path
-                        if brand_name.lower() in parsed['path'].lower():
-                            brand_visits += 1
-                        
-                        # Store in Redis for real-time tracking
-                        await self._store_bot_visit(visit, bot_pattern, brand_name)
-                    
-                    # Progress logging every 10000 lines
-                    if total_visits % 10000 == 0:
-                        logger.info(f"Processed {total_visits} log entries...")
+        workers = workers or DEFAULT_LOG_WORKERS
         
+        try:
+            file_size = os.path.getsize(log_file_path)
+            if detect_compression(log_file_path):
+                # Compressed files and bundles can't be split by offset; stream them instead
+                aggregate = LogAnalysisAggregate(brand_name, log_format, self.llm_bot_patterns, date_range)
+                async for _, _, segment in self.analyze_log_stream(
+                    log_file_path, brand_name, log_format, date_range=date_range, workers=workers
+                ):
+                    aggregate.merge(segment)
+                    # Keep only counters and recent detail so memory doesn't grow with the decompressed size
+                    aggregate.fold_visits()
+            elif workers > 1 and file_size >= PARALLEL_MIN_BYTES:
+                aggregate = await self.analyze_log_range(
+                    log_file_path, brand_name, log_format, 0, file_size, date_range, workers
+                )
+            else:
+                aggregate = await self._analyze_log_file_serial(
+                    log_file_path, brand_name, log_format, date_range
+                )
         except Exception as e:
             logger.error(f"Error analyzing log file: {e}")
             raise
+        finally:
+            # Persist whatever was buffered, including visits seen before a failure
+            try:
+                await self.visit_sink.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush bot visits to Redis: {e}")
+        
+        analysis_results = self.build_analysis_results(aggregate)
+        
+        logger.info(
+            f"Log analysis complete. Found {analysis_results['llm_bot_requests']} LLM bot visits "
+            f"out of {analysis_results['total_requests']} total requests"
+        )
+        
+        return analysis_results
+    
+    def build_analysis_results(self, aggregate: LogAnalysisAggregate) -> Dict:
+        """Comprehensive statistics about AI bot visits from a (possibly merged) aggregate"""
+        visits = aggregate.visit_summary()
+        bot_visit_count = visits.count
+        total_visits = aggregate.total_visits
         
         # Calculate comprehensive metrics
         analysis_results = {
             'total_requests': total_visits,
-            'llm_bot_requests': len(bot_visits),
-            'brand_specific_bot_requests': brand_visits,
-            'llm_bot_percentage': (len(bot_visits) / total_visits * 100) if total_visits > 0 else 0,
-            'brand_citation_rate': (brand_visits / len(bot_visits) * 100) if bot_visits else 0,
-            'platform_breakdown': dict(llm_bot_visits),
-            'top_accessed_paths': self._get_top_paths(path_access_frequency),
-            'hourly_distribution': dict(hourly_distribution),
-            'daily_trends': dict(daily_trends),
-            'unique_bot_ips': len(set(v.ip_address for v in bot_visits)),
-            'bot_visits_detail': [v.to_dict() for v in bot_visits[-1000:]],  # Last 1000 visits
-            'crawl_success_rate': self._calculate_crawl_success_rate(bot_visits),
-            'geographic_distribution': self._calculate_geographic_distribution(bot_visits),
-            'content_interest_map': self._analyze_content_interest(path_access_frequency),
+            'llm_bot_requests': bot_visit_count,
+            'brand_specific_bot_requests': aggregate.brand_visits,
+            'llm_bot_percentage': (bot_visit_count / total_visits * 100) if total_visits > 0 else 0,
+            'brand_citation_rate': (aggregate.brand_visits / bot_visit_count * 100) if bot_visit_count else 0,
+            'platform_breakdown': dict(aggregate.llm_bot_visits),
+            'top_accessed_paths': self._get_top_paths(aggregate.path_access_frequency),
+            'hourly_distribution': dict(aggregate.hourly_distribution),
+            'daily_trends': dict(aggregate.daily_trends),
+            'unique_bot_ips': len(visits.ip_addresses),
+            'bot_visits_detail': [BotVisit(**row).to_dict() for row in aggregate.recent_visits()],
+            'crawl_success_rate': self._calculate_crawl_success_rate(visits),
+            'geographic_distribution': self._calculate_geographic_distribution(visits),
+            'content_interest_map': self._analyze_content_interest(aggregate.path_access_frequency),
             'average_confidence_scores': {
-                platform: sum(scores) / len(scores) if scores else 0
-                for platform, scores in bot_confidence_scores.items()
+                platform: total / aggregate.confidence_counts[platform] if aggregate.confidence_counts[platform] else 0
+                for platform, total in aggregate.confidence_sums.items()
             },
-            'response_time_analysis': self._analyze_response_times(bot_visits),
-            'error_rate_by_platform': self._calculate_error_rates(bot_visits)
+            'response_time_analysis': self._analyze_response_times(visits),
+            'error_rate_by_platform': self._calculate_error_rates(visits),
+            'unparseable_timestamps': aggregate.unparseable_timestamps
         }
         
-        logger.info(f"Log analysis complete. Found {len(bot_visits)} LLM bot visits out of {total_visits} total requests")
-        
         return analysis_results
     
-    def _parse_timestamp(self, timestamp_str: str, log_format: str) -> datetime:
-        """Parse timestamp based on log format"""
-        timestamp_formats = {
-            'nginx': '%d/%b/%Y:%H:%M:%S',
-            'apache': '%d/%b/%Y:%H:%M:%S',
-            'cloudflare': '%Y-%m-%dT%H:%M:%S'
-        }
+    async def _analyze_log_file_serial(
+        self,
+        log_file_path: str,
+        brand_name: str,
+        log_format: str,
+        date_range: Optional[Tuple[datetime, datetime]]
+    ) -> LogAnalysisAggregate:
+        """Analyze a log file line by line in this process"""
+        aggregate = LogAnalysisAggregate(brand_name, log_format, self.llm_bot_patterns, date_range)
+        
+        async with aiofiles.open(log_file_path, 'r') as f:
+            async for line in f:
+                aggregate.process_line(line)
+                
+                # Progress logging every 10000 lines
+                if aggregate.total_visits % 10000 == 0:
+                    logger.info(f"Processed {aggregate.total_visits} log entries...")
         
-        try:
-            # Remove timezone info if present
-            timestamp_str = timestamp_str.split()[0]
-            return datetime.strptime(timestamp_str, timestamp_formats.get(log_format, '%d/%b/%Y:%H:%M:%S'))
-        except Exception as e:
-            logger.warning(f"Failed to parse timestamp: {timestamp_str} - {e}")
-            return datetime.now()
+        await self._record_visits(aggregate, brand_name)
+        return aggregate
     
-    async def _get_geolocation(self, ip_address: str) -> Tuple[Optional[str], Optional[str]]:
-        """Get country and city from IP address"""
-        if not self.geoip_reader:
-            return None, None
+    async def analyze_log_range(
+        self,
+        log_file_path: str,
+        brand_name: str,
+        log_format: str,
+        start: int,
+        end: int,
+        date_range: Optional[Tuple[datetime, datetime]] = None,
+        workers: Optional[int] = None,
+        executor: Optional[ProcessPoolExecutor] = None
+    ) -> LogAnalysisAggregate:
+        """
+        Analyze the line-aligned byte range [start, end) of a log file and store its bot visits
+        The range is split across `workers` processes and the shard aggregates merged in file order
+        Pass `executor` to reuse one process pool across calls (e.g. every segment of a job)
+        """
+        workers = workers or DEFAULT_LOG_WORKERS
+        ranges = compute_shard_ranges(log_file_path, workers, start, end)
+        
+        loop = asyncio.get_running_loop()
+        if workers > 1 and len(ranges) > 1:
+            logger.info(f"Analyzing {log_file_path} [{start}, {end}) in {len(ranges)} shards across {workers} processes")
+            pool = executor or ProcessPoolExecutor(max_workers=workers)
+            try:
+                shards = await asyncio.gather(*[
+                    loop.run_in_executor(
+                        pool, analyze_log_shard,
+                        log_file_path, shard_start, shard_end, brand_name, log_format, self.llm_bot_patterns, date_range
+                    )
+                    for shard_start, shard_end in ranges
+                ])
+            finally:
+                if executor is None:
+                    pool.shutdown()
+        else:
+            shards = [
+                await loop.run_in_executor(
+                    None, analyze_log_shard,
+                    log_file_path, shard_start, shard_end, brand_name, log_format, self.llm_bot_patterns, date_range
+                )
+                for shard_start, shard_end in ranges
+            ]
+        
+        return await self._merge_and_record(shards, brand_name, log_format, date_range)
+    
+    async def analyze_log_stream(
+        self,
+        log_file_path: str,
+        brand_name: str,
+        log_format: str,
+        date_range: Optional[Tuple[datetime, datetime]] = None,
+        workers: Optional[int] = None,
+        skip_lines: int = 0,
+        segment_lines: int = STREAM_SEGMENT_LINES,
+        max_lines: int = STREAM_MAX_LINES
+    ) -> AsyncIterator[Tuple[int, int, LogAnalysisAggregate]]:
+        """
+        Analyze a gzip, zstd or tar-bundled log without writing it out decompressed
+        A reader thread decompresses while line batches are parsed across `workers` processes
+        Yields (lines consumed, compressed bytes read, segment aggregate) every `segment_lines` lines,
+        after the segment's bot visits are stored; pass `skip_lines` to resume after a segment
+        Raises ValueError once the source decompresses to more than `max_lines` lines
+        """
+        workers = workers or DEFAULT_LOG_WORKERS
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        lines_consumed = skip_lines
         
         try:
-            response = self.geoip_reader.city(ip_address)
-            return response.country.name, response.city.name
-        except:
-            return None, None
+            with LogLineReader(log_file_path, skip_lines=skip_lines) as reader:
+                finished = False
+                while not finished:
+                    done, pending, segment_size, bytes_read = [], [], 0, 0
+                    while segment_size < segment_lines:
+                        item = await loop.run_in_executor(None, reader.next_batch)
+                        if item is None:
+                            finished = True
+                            break
+                        lines, bytes_read = item
+                        segment_size += len(lines)
+                        if lines_consumed + segment_size > max_lines:
+                            raise ValueError(f"Decompressed log exceeds {max_lines:,} lines")
+                        pending.append(loop.run_in_executor(
+                            executor, analyze_log_lines,
+                            lines, brand_name, log_format, self.llm_bot_patterns, date_range
+                        ))
+                        # Bound the batches in flight; results stay in stream order
+                        if len(pending) >= workers * 2:
+                            done.append(await pending.pop(0))
+                    
+                    if not segment_size:
+                        break
+                    done.extend(await asyncio.gather(*pending))
+                    lines_consumed += segment_size
+                    segment = await self._merge_and_record(done, brand_name, log_format, date_range)
+                    yield lines_consumed, bytes_read, segment
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def follow_log(
+        self,
+        path: str,
+        brand_name: str,
+        log_format: str = "nginx",
+        poll_interval: float = 1.0,
+        state_path: Optional[str] = None,
+        from_start: bool = False,
+        stop_event: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[LogAnalysisAggregate]:
+        """
+        Tail a live log (or a directory of rotating logs) and store bot visits as they are written
+        Each poll's new lines form a micro-batch: its visits are flushed to the same Redis keys as
+        uploads before the position is committed, then its aggregate is yielded
+        Runs until `stop_event` is set or the consumer stops iterating
+        """
+        loop = asyncio.get_running_loop()
+        with LogFollower(path, from_start=from_start, state_path=state_path) as follower:
+            while not (stop_event and stop_event.is_set()):
+                lines = await loop.run_in_executor(None, follower.poll)
+                if not lines:
+                    if stop_event:
+                        try:
+                            await asyncio.wait_for(stop_event.wait(), poll_interval)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await asyncio.sleep(poll_interval)
+                    continue
+                
+                batch = await loop.run_in_executor(
+                    None, analyze_log_lines, lines, brand_name, log_format, self.llm_bot_patterns
+                )
+                batch = await self._merge_and_record([batch], brand_name, log_format, None)
+                await self.visit_sink.flush()
+                await loop.run_in_executor(None, follower.commit)
+                yield batch
+    
+    async def _merge_and_record(
+        self,
+        shards: List[LogAnalysisAggregate],
+        brand_name: str,
+        log_format: str,
+        date_range: Optional[Tuple[datetime, datetime]]
+    ) -> LogAnalysisAggregate:
+        """Merge shard aggregates in order and store their bot visits"""
+        aggregate = LogAnalysisAggregate(brand_name, log_format, self.llm_bot_patterns, date_range)
+        for shard in shards:
+            aggregate.merge(shard)
+        
+        await self._record_visits(aggregate, brand_name)
+        return aggregate
+    
+    async def _record_visits(self, aggregate: LogAnalysisAggregate, brand_name: str):
+        """Geolocate an aggregate's bot visits and store them for real-time tracking"""
+        # Geolocation and Redis writes stay in the parent, which owns the reader and connection
+        visits = aggregate.visits
+        await self._geolocate_visits(visits)
+        
+        patterns_by_name = {pattern.name: pattern for pattern in self.llm_bot_patterns}
+        for index in range(len(visits)):
+            visit = BotVisit(**visits.row(index))
+            bot_pattern = patterns_by_name.get(visit.bot_name) or LLMBotPattern(
+                name=visit.bot_name, patterns=[visit.user_agent], type="crawler", platform=visit.platform
+            )
+            await self._store_bot_visit(visit, bot_pattern, brand_name)
+    
+    async def _geolocate_visits(self, visits: BotVisitColumns):
+        """Resolve each distinct bot IP once (memoized, off the event loop) and fill in every row"""
+        if not self.geoip.enabled or not len(visits):
+            return
+        ip_addresses = list(visits.tables['ip_address'].values)
+        locations = await asyncio.get_running_loop().run_in_executor(None, self.geoip.lookup_many, ip_addresses)
+        visits.set_locations(locations)
+    
+    def _parse_timestamp(self, timestamp_str: str, log_format: str) -> Optional[datetime]:
+        """Parse timestamp based on log format (naive UTC; None if unparseable)"""
+        return parse_log_timestamp(timestamp_str, log_format)
     
     async def _store_bot_visit(self, visit: BotVisit, bot_pattern: LLMBotPattern, brand_name: str):
-        """Store bot visit in Redis for real-time tracking"""
-        # Store individual visit
-        visit_key = f"llm_bot_visit:{bot_pattern.platform}:{visit.timestamp.strftime('%Y%m%d')}"
-        visit_data = visit.to_dict()
-        
-        # Add to sorted set with timestamp as score
-        self.redis_client.zadd(
-            visit_key,
-            {json.dumps(visit_data): visit.timestamp.timestamp()}
-        )
-        
-        # Set expiration to 90 days
-        self.redis_client.expire(visit_key, 90 * 24 * 3600)
-        
-        # Update daily counters
-        counter_key = f"llm_bot_counter:{bot_pattern.platform}:{visit.timestamp.strftime('%Y%m%d')}"
-        self.redis_client.hincrby(counter_key, bot_pattern.name, 1)
-        self.redis_client.expire(counter_key, 90 * 24 * 3600)
-        
-        # Update brand-specific counters if brand mentioned
-        if brand_name.lower() in visit.path.lower():
-            brand_key = f"brand_citation:{brand_name.lower()}:{bot_pattern.platform}:{visit.timestamp.strftime('%Y%m%d')}"
-            self.redis_client.incr(brand_key)
-            self.redis_client.expire(brand_key, 90 * 24 * 3600)
-        
-        # Store path access patterns
-        path_key = f"path_access:{bot_pattern.platform}:{visit.timestamp.strftime('%Y%m%d')}"
-        self.redis_client.hincrby(path_key, visit.path, 1)
-        self.redis_client.expire(path_key, 90 * 24 * 3600)
+        """Buffer bot visit for real-time tracking; written to Redis when the sink flushes"""
+        self.visit_sink.add_visit(visit, bot_pattern, brand_name)
+        if self.visit_sink.should_flush:
+            await self.visit_sink.flush()
     
     def _get_top_paths(self, path_frequency: Dict, limit: int = 50) -> Dict:
         """Get most accessed paths by platform"""
@@ -403,15 +701,10 @@ class ServerLogAnalyzer:
         
         return top_paths
     
-    def _calculate_crawl_success_rate(self, bot_visits: List[BotVisit]) -> Dict:
+    def _calculate_crawl_success_rate(self, visits: VisitSummary) -> Dict:
         """Calculate crawl success rate by status code"""
-        platform_status = defaultdict(lambda: defaultdict(int))
-        
-        for visit in bot_visits:
-            platform_status[visit.platform][visit.status_code] += 1
-        
         success_rates = {}
-        for platform, status_counts in platform_status.items():
+        for platform, status_counts in visits.status_codes.items():
             total = sum(status_counts.values())
             successful = sum(count for status, count in status_counts.items() if status < 400)
             
@@ -419,51 +712,22 @@ class ServerLogAnalyzer:
                 'total_crawls': total,
                 'successful_crawls': successful,
                 'success_rate': (successful / total * 100) if total > 0 else 0,
-                'status_breakdown': dict(status_counts)
+                'status_breakdown': status_counts
             }
         
         return success_rates
     
-    def _calculate_geographic_distribution(self, bot_visits: List[BotVisit]) -> Dict:
+    def _calculate_geographic_distribution(self, visits: VisitSummary) -> Dict:
         """Calculate geographic distribution of bot visits"""
-        geo_distribution = defaultdict(lambda: defaultdict(int))
-        
-        for visit in bot_visits:
-            if visit.country:
-                geo_distribution[visit.platform][visit.country] += 1
-        
-        return dict(geo_distribution)
+        return {platform: dict(countries) for platform, countries in visits.countries.items()}
     
     def _analyze_content_interest(self, path_frequency: Dict) -> Dict:
         """Analyze which content types are most accessed by AI bots"""
-        content_categories = {
-            'product_pages': r'/product[s]?/|/item[s]?/|/p/',
-            'category_pages': r'/category/|/categories/|/c/',
-            'blog_posts': r'/blog/|/post[s]?/|/article[s]?/',
-            'api_endpoints': r'/api/|/v\d+/',
-            'static_assets': r'\.(css|js|jpg|jpeg|png|gif|svg|ico|woff|woff2|ttf)$',
-            'home_page': r'^/$|^/index\.',
-            'about_pages': r'/about|/company|/team',
-            'faq_pages': r'/faq|/help|/support',
-            'reviews': r'/review[s]?/|/testimonial[s]?/',
-            'search': r'/search|/s\?',
-            'checkout': r'/cart|/checkout|/order',
-            'sitemap': r'sitemap\.xml|/sitemap',
-            'robots': r'robots\.txt'
-        }
-        
         interest_map = defaultdict(lambda: defaultdict(int))
         
         for platform, paths in path_frequency.items():
-            categorized_count = 0
             for path, count in paths.items():
-                for category, pattern in content_categories.items():
-                    if re.search(pattern, path, re.IGNORECASE):
-                        interest_map[platform][category] += count
-                        categorized_count += count
-                        break
-                else:
-                    interest_map[platform]['other'] += count
+                interest_map[platform][classify_content_type(path)] += count
             
             # Calculate percentages
             total = sum(interest_map[platform].values())
@@ -478,41 +742,28 @@ class ServerLogAnalyzer:
         
         return dict(interest_map)
     
-    def _analyze_response_times(self, bot_visits: List[BotVisit]) -> Dict:
+    def _analyze_response_times(self, visits: VisitSummary) -> Dict:
         """Analyze response times by platform"""
-        response_times = defaultdict(list)
-        
-        for visit in bot_visits:
-            if visit.response_time > 0:
-                response_times[visit.platform].append(visit.response_time)
-        
-        analysis = {}
-        for platform, times in response_times.items():
-            if times:
-                analysis[platform] = {
-                    'average': sum(times) / len(times),
-                    'min': min(times),
-                    'max': max(times),
-                    'count': len(times)
-                }
-        
-        return analysis
+        return {
+            platform: {
+                'average': total / count,
+                'min': low,
+                'max': high,
+                'count': count
+            }
+            for platform, (total, low, high, count) in visits.response_times.items()
+        }
     
-    def _calculate_error_rates(self, bot_visits: List[BotVisit]) -> Dict:
+    def _calculate_error_rates(self, visits: VisitSummary) -> Dict:
         """Calculate error rates by platform"""
-        platform_errors = defaultdict(lambda: {'total': 0, 'errors': 0})
-        
-        for visit in bot_visits:
-            platform_errors[visit.platform]['total'] += 1
-            if visit.status_code >= 400:
-                platform_errors[visit.platform]['errors'] += 1
-        
         error_rates = {}
-        for platform, counts in platform_errors.items():
+        for platform, status_counts in visits.status_codes.items():
+            total = sum(status_counts.values())
+            error_count = sum(count for status, count in status_counts.items() if status >= 400)
             error_rates[platform] = {
-                'error_rate': (counts['errors'] / counts['total'] * 100) if counts['total'] > 0 else 0,
-                'total_requests': counts['total'],
-                'error_count': counts['errors']
+                'error_rate': (error_count / total * 100) if total > 0 else 0,
+                'total_requests': total,
+                'error_count': error_count
             }
         
         return error_rates
@@ -521,6 +772,7 @@ class ServerLogAnalyzer:
         """
         Get real-time metrics based on actual bot visits from Redis
         This provides REAL citation data instead of simulations
+        Reads the per-brand daily rollups for the whole window in one pipelined batch
         """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -535,50 +787,39 @@ class ServerLogAnalyzer:
             'brand_mention_trends': {}
         }
         
+        date_strs = self._date_window(start_date, end_date)
+        fields = [field for platform in REALTIME_PLATFORMS for field in rollup_fields(platform)]
+        
+        rollups = await read_pipelined(
+            self.redis_client, 'hmget', [daily_rollup_key(brand_name, date_str) for date_str in date_strs], fields
+        )
+        
         total_bot_visits = 0
         brand_mentions = 0
         platform_visits = defaultdict(int)
+        platform_brand_mentions = defaultdict(int)
         daily_visits = defaultdict(int)
         daily_brand_mentions = defaultdict(int)
         
-        # Iterate through each day in the range
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y%m%d')
-            
-            # Get data for each platform
-            for platform in ['openai', 'anthropic', 'google', 'perplexity', 'microsoft', 'you', 'cohere']:
-                # Get visit counter
-                counter_key = f"llm_bot_counter:{platform}:{date_str}"
-                daily_counts = self.redis_client.hgetall(counter_key)
+        for date_str, values in zip(date_strs, rollups):
+            for index, platform in enumerate(REALTIME_PLATFORMS):
+                visits, mentions, crawl_total, crawl_ok = (int(v or 0) for v in values[index * 4:index * 4 + 4])
                 
-                for bot, count in daily_counts.items():
-                    count = int(count)
-                    platform_visits[platform] += count
-                    total_bot_visits += count
-                    daily_visits[date_str] += count
+                if visits:
+                    platform_visits[platform] += visits
+                    total_bot_visits += visits
+                    daily_visits[date_str] += visits
                 
-                # Get brand-specific citations
-                brand_key = f"brand_citation:{brand_name.lower()}:{platform}:{date_str}"
-                brand_count = self.redis_client.get(brand_key)
-                if brand_count:
-                    brand_mentions += int(brand_count)
-                    daily_brand_mentions[date_str] += int(brand_count)
+                if mentions:
+                    brand_mentions += mentions
+                    platform_brand_mentions[platform] += mentions
+                    daily_brand_mentions[date_str] += mentions
                 
-                # Get crawl success data
-                success_key = f"crawl_success:{platform}:{date_str}"
-                success_data = self.redis_client.hgetall(success_key)
-                if success_data:
-                    total = int(success_data.get(b'total', 0))
-                    successful = int(success_data.get(b'successful', 0))
-                    if platform not in metrics['content_accessibility']:
-                        metrics['content_accessibility'][platform] = []
-                    metrics['content_accessibility'][platform].append({
+                if crawl_total:
+                    metrics['content_accessibility'].setdefault(platform, []).append({
                         'date': date_str,
-                        'success_rate': (successful / total * 100) if total > 0 else 0
+                        'success_rate': crawl_ok / crawl_total * 100
                     })
-            
-            current_date += timedelta(days=1)
         
         # Calculate final metrics
         metrics['real_citation_frequency'] = (brand_mentions / total_bot_visits * 100) if total_bot_visits > 0 else 0
@@ -588,24 +829,14 @@ class ServerLogAnalyzer:
         metrics['brand_mention_trends'] = dict(daily_brand_mentions)
         
         # Calculate platform-specific citation rates
-        metrics['platform_citation_rates'] = {}
-        for platform, visits in platform_visits.items():
-            if visits > 0:
-                platform_brand_mentions = 0
-                current_date = start_date
-                while current_date <= end_date:
-                    date_str = current_date.strftime('%Y%m%d')
-                    brand_key = f"brand_citation:{brand_name.lower()}:{platform}:{date_str}"
-                    count = self.redis_client.get(brand_key)
-                    if count:
-                        platform_brand_mentions += int(count)
-                    current_date += timedelta(days=1)
-                
-                metrics['platform_citation_rates'][platform] = {
-                    'citation_rate': (platform_brand_mentions / visits * 100) if visits > 0 else 0,
-                    'total_visits': visits,
-                    'brand_mentions': platform_brand_mentions
-                }
+        metrics['platform_citation_rates'] = {
+            platform: {
+                'citation_rate': platform_brand_mentions[platform] / visits * 100,
+                'total_visits': visits,
+                'brand_mentions': platform_brand_mentions[platform]
+            }
+            for platform, visits in platform_visits.items() if visits > 0
+        }
         
         # Get content access patterns
         metrics['content_patterns'] = await self._get_content_access_patterns(days)
@@ -614,26 +845,54 @@ class ServerLogAnalyzer:
         
         return metrics
     
+    async def get_monthly_rollups(self, brand_name: str, months: int = 12) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """
+        Monthly bot visit totals per platform for the last `months` months (including this one)
+        Returns {YYYYMM: {platform: {'visits', 'brand_mentions', 'crawl_total', 'crawl_successful'}}}
+        """
+        month_strs = []
+        year, month = datetime.now().year, datetime.now().month
+        for _ in range(months):
+            month_strs.append(f"{year:04d}{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        month_strs.reverse()
+        
+        rollups = await read_pipelined(
+            self.redis_client, 'hgetall', [monthly_rollup_key(brand_name, month_str) for month_str in month_strs]
+        )
+        
+        monthly = {}
+        for month_str, rollup in zip(month_strs, rollups):
+            platforms = defaultdict(lambda: {'visits': 0, 'brand_mentions': 0, 'crawl_total': 0, 'crawl_successful': 0})
+            for field, value in rollup.items():
+                field = field.decode() if isinstance(field, bytes) else field
+                metric, _, platform = field.partition(':')
+                name = ROLLUP_METRIC_NAMES.get(metric)
+                if name:
+                    platforms[platform][name] = int(value)
+            monthly[month_str] = dict(platforms)
+        
+        return monthly
+    
     async def _get_content_access_patterns(self, days: int) -> Dict:
         """Analyze content access patterns from Redis data"""
         patterns = defaultdict(lambda: defaultdict(int))
         
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
-        current_date = start_date
         
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y%m%d')
-            
-            for platform in ['openai', 'anthropic', 'google', 'perplexity', 'microsoft']:
-                path_key = f"path_access:{platform}:{date_str}"
-                path_data = self.redis_client.hgetall(path_key)
-                
-                for path, count in path_data.items():
-                    path_str = path.decode() if isinstance(path, bytes) else path
-                    patterns[platform][path_str] += int(count)
-            
-            current_date += timedelta(days=1)
+        keys = [
+            (platform, f"path_access:{platform}:{date_str}")
+            for date_str in self._date_window(start_date, end_date)
+            for platform in ['openai', 'anthropic', 'google', 'perplexity', 'microsoft']
+        ]
+        
+        path_data_by_key = await read_pipelined(self.redis_client, 'hgetall', [path_key for _, path_key in keys])
+        
+        for (platform, _), path_data in zip(keys, path_data_by_key):
+            for path, count in path_data.items():
+                path_str = path.decode() if isinstance(path, bytes) else path
+                patterns[platform][path_str] += int(count)
         
         # Sort and limit results
         top_patterns = {}
@@ -642,3 +901,13 @@ class ServerLogAnalyzer:
             top_patterns[platform] = sorted_paths[:20]
         
         return top_patterns
+    
+    @staticmethod
+    def _date_window(start_date: datetime, end_date: datetime) -> List[str]:
+        """YYYYMMDD strings for each day from start_date through end_date"""
+        date_strs = []
+        current_date = start_date
+        while current_date <= end_date:
+            date_strs.append(current_date.strftime('%Y%m%d'))
+            current_date += timedelta(days=1)
+        return date_strs
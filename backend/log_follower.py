@@ -0,0 +1,166 @@
+"""
+Log Follower
+Tails a live access log, or a directory of rotating logs, and hands out new complete lines.
+Positions are tracked per (device, inode) so renamed rotations are neither re-read nor lost,
+and can be saved to a state file to resume after a restart. Stdlib only.
+"""
+
+import fnmatch
+import json
+import os
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# Rotated-away files are still drained for this long, since writers reopen lazily
+ROTATION_GRACE_SECONDS = 5.0
+MAX_POLL_BYTES = 8 * 1024 * 1024
+COMPRESSED_SUFFIXES = ('.gz', '.zst', '.bz2', '.xz')
+
+FileKey = Tuple[int, int]
+
+class LogFollower:
+    """
+    Incremental reader for growing log files.
+    `path` is a single log (rotation detected by inode change) or a directory whose files
+    matching `pattern` are all followed. Files present at start are tailed from their end
+    unless `from_start`; files that appear later are read from the beginning.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pattern: str = '*.log*',
+        from_start: bool = False,
+        state_path: Optional[str] = None,
+        max_poll_bytes: int = MAX_POLL_BYTES
+    ):
+        self.path = path
+        self.pattern = pattern
+        self.state_path = state_path
+        self.max_poll_bytes = max_poll_bytes
+
+        self.positions: Dict[FileKey, int] = {}
+        self._handles: Dict[FileKey, BinaryIO] = {}
+        self._rotated_at: Dict[FileKey, float] = {}
+
+        if state_path and os.path.exists(state_path):
+            self._load_state()
+        elif not from_start:
+            for key, _, size in self._list_files():
+                self.positions[key] = size
+
+    def _list_files(self) -> List[Tuple[FileKey, str, int]]:
+        """(key, path, size) of the files being followed, oldest first"""
+        if os.path.isdir(self.path):
+            paths = [
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if fnmatch.fnmatch(name, self.pattern) and not name.endswith(COMPRESSED_SUFFIXES)
+            ]
+        else:
+            paths = [self.path]
+
+        files = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if os.path.isfile(path):
+                files.append((stat.st_mtime, (stat.st_dev, stat.st_ino), path, stat.st_size))
+        return [(key, path, size) for _, key, path, size in sorted(files)]
+
+    def poll(self) -> List[bytes]:
+        """New complete lines (without newlines) since the last poll, up to max_poll_bytes"""
+        now = time.time()
+        current = self._list_files()
+        current_keys = {key for key, _, _ in current}
+        lines: List[bytes] = []
+        budget = self.max_poll_bytes
+
+        # Files that vanished without ever being opened have nothing left to read
+        for key in list(self.positions):
+            if key not in current_keys and key not in self._handles:
+                del self.positions[key]
+
+        # Drain files rotated away from the followed path (or deleted) before newer ones
+        for key in list(self._handles):
+            if key in current_keys:
+                continue
+            self._rotated_at.setdefault(key, now)
+            read = self._read_new(key, self._handles[key], None, lines, budget)
+            budget -= read
+            if not read and now - self._rotated_at[key] >= ROTATION_GRACE_SECONDS:
+                self._forget(key)
+
+        for key, path, size in current:
+            if budget <= 0:
+                break
+            offset = self.positions.get(key, 0)
+            if size < offset:
+                # Truncated in place (copytruncate rotation); start over
+                offset = self.positions[key] = 0
+            if size == offset:
+                continue
+            handle = self._handles.get(key)
+            if handle is None:
+                try:
+                    handle = self._handles[key] = open(path, 'rb')
+                except FileNotFoundError:
+                    continue
+            budget -= self._read_new(key, handle, size, lines, budget)
+
+        return lines
+
+    def _read_new(self, key: FileKey, handle: BinaryIO, size: Optional[int], lines: List[bytes], budget: int) -> int:
+        """Append complete lines after the key's offset; returns bytes consumed"""
+        if budget <= 0:
+            return 0
+        offset = self.positions.get(key, 0)
+        handle.seek(offset)
+        limit = budget if size is None else min(budget, size - offset)
+        data = handle.read(limit)
+
+        # Leave a trailing partial line for the next poll
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+        lines.extend(data[:end - 1].split(b'\n'))
+        self.positions[key] = offset + end
+        return end
+
+    def _forget(self, key: FileKey):
+        handle = self._handles.pop(key, None)
+        if handle:
+            handle.close()
+        self._rotated_at.pop(key, None)
+        self.positions.pop(key, None)
+
+    def commit(self):
+        """Persist the positions of everything returned so far, once it has been processed"""
+        if not self.state_path:
+            return
+        state = {f"{dev}:{ino}": offset for (dev, ino), offset in self.positions.items()}
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+
+    def _load_state(self):
+        with open(self.state_path) as f:
+            state = json.load(f)
+        live = {key for key, _, _ in self._list_files()}
+        for name, offset in state.items():
+            dev, ino = (int(part) for part in name.split(':'))
+            # Inodes that no longer exist here may have been reused by unrelated files
+            if (dev, ino) in live:
+                self.positions[(dev, ino)] = offset
+
+    def close(self):
+        for key in list(self._handles):
+            self._handles.pop(key).close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,417 @@
+"""
+Log Format Registry
+Compiles nginx `log_format` and Apache `LogFormat` strings into line parsers that capture only
+the fields the analysis uses, provides ALB, CloudFront and JSON-lines parsers, and detects the
+format of a file from a sample of its lines. Stdlib only.
+"""
+
+import json
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from log_timestamps import PARSERS as TIMESTAMP_PARSERS
+
+# What every parser returns, in this order
+LOG_FIELDS = ('ip', 'timestamp', 'path', 'status', 'bytes', 'referer', 'user_agent', 'response_time')
+LogRecord = Tuple[str, str, str, int, int, Optional[str], str, float]
+
+DETECTION_SAMPLE_LINES = 100
+DETECTION_MIN_RATIO = 0.5
+
+def _to_int(value: Optional[str]) -> int:
+    return int(value) if value and value.isdigit() else 0
+
+def _to_float(value: Optional[str], scale: float = 1.0) -> float:
+    try:
+        return max(0.0, float(value) * scale) if value else 0.0
+    except ValueError:
+        # '-' or upstream lists such as '0.010, 0.020'
+        return 0.0
+
+class LogFormatParser:
+    """Base class: parse() returns a LogRecord or None when the line isn't in this format"""
+
+    name = 'base'
+    # Key into log_timestamps.PARSERS
+    timestamp_format = 'clf'
+
+    def parse(self, line: str) -> Optional[LogRecord]:
+        raise NotImplementedError
+
+    def parse_dict(self, line: str) -> Optional[Dict]:
+        """The record keyed by LOG_FIELDS"""
+        record = self.parse(line)
+        return dict(zip(LOG_FIELDS, record)) if record else None
+
+class RegexLineParser(LogFormatParser):
+    """
+    One compiled regex whose only capture groups are the analysis fields.
+    `groups` maps field name -> group number; missing fields come back empty.
+    """
+
+    def __init__(self, name: str, pattern: str, groups: Dict[str, int],
+                 timestamp_format: str = 'clf', response_time_scale: float = 1.0):
+        self.name = name
+        self.pattern = pattern
+        self.groups = groups
+        self.timestamp_format = timestamp_format
+        self.response_time_scale = response_time_scale
+        self._regex = re.compile(pattern)
+        # Group numbers in LOG_FIELDS order (0 = not captured)
+        self._indexes = tuple(groups.get(field, 0) for field in LOG_FIELDS)
+
+    def __reduce__(self):
+        return (RegexLineParser, (self.name, self.pattern, self.groups, self.timestamp_format, self.response_time_scale))
+
+    def parse(self, line: str) -> Optional[LogRecord]:
+        match = self._regex.match(line.strip())
+        if not match:
+            return None
+        values = match.groups()
+        ip, timestamp, path, status, sent, referer, user_agent, response_time = (
+            values[index - 1] if index else None for index in self._indexes
+        )
+        if not (status and status.isdigit()) or not timestamp:
+            return None
+        return (
+            ip or '', timestamp, path or '', int(status), _to_int(sent), referer,
+            user_agent or '', _to_float(response_time, self.response_time_scale)
+        )
+
+# ==================== NGINX log_format ====================
+
+NGINX_COMBINED = (
+    '$remote_addr - $remote_user [$time_local] "$request" '
+    '$status $body_bytes_sent "$http_referer" "$http_user_agent"'
+)
+NGINX_COMMON = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent'
+
+# Request line: capture the target, tolerate a missing protocol
+REQUEST_PATTERN = r'[^ "]+ ([^ "]+)(?: [^"]*)?'
+# Quoted values such as user agents may contain spaces; bare ones may not
+QUOTED_VALUE = r'([^"]*)'
+
+# variable -> (field, regex with exactly one group, timestamp format, response time scale)
+NGINX_VARIABLES = {
+    'remote_addr': ('ip', r'(\S+)', None, None),
+    'http_x_forwarded_for': ('ip', r'([^, "]+)(?:, [^ "]+)*', None, None),
+    'time_local': ('timestamp', r'([^\]]+)', 'clf', None),
+    'time_iso8601': ('timestamp', r'(\S+)', 'iso8601', None),
+    'msec': ('timestamp', r'([\d.]+)', 'epoch', None),
+    'request': ('path', REQUEST_PATTERN, None, None),
+    'request_uri': ('path', r'(\S+)', None, None),
+    'uri': ('path', r'(\S+)', None, None),
+    'status': ('status', r'(\d{3})', None, None),
+    'body_bytes_sent': ('bytes', r'(\d+|-)', None, None),
+    'bytes_sent': ('bytes', r'(\d+|-)', None, None),
+    'http_referer': ('referer', QUOTED_VALUE, None, None),
+    'http_user_agent': ('user_agent', QUOTED_VALUE, None, None),
+    'request_time': ('response_time', r'([\d.]+|-)', None, 1.0),
+    'upstream_response_time': ('response_time', r'([^ "]+(?:, [^ "]+)*)', None, 1.0),
+}
+
+_NGINX_TOKEN = re.compile(r'\$(\w+)|\$\{(\w+)\}')
+
+def _strip_nginx_directive(format_string: str) -> str:
+    """Accept either the bare format or a whole `log_format name '...' '...';` directive"""
+    text = format_string.strip().rstrip(';').strip()
+    if text.startswith('log_format'):
+        text = text.split(None, 2)[2] if len(text.split(None, 2)) == 3 else ''
+        parts = re.findall(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"", text)
+        if parts:
+            text = ''.join(single or double for single, double in parts)
+    return text
+
+class _PatternBuilder:
+    """Accumulates regex source and field groups while compiling a format string"""
+
+    def __init__(self):
+        self.source: List[str] = []
+        self.groups: Dict[str, int] = {}
+        self.timestamp_format = 'clf'
+        self.response_time_scale = 1.0
+        self._group_count = 0
+
+    def literal(self, text: str):
+        self.source.append(re.escape(text))
+
+    def skip(self, quoted: bool):
+        self.source.append(r'[^"]*' if quoted else r'\S*')
+
+    def capture(self, field: str, pattern: str, timestamp_format: Optional[str], scale: Optional[float]):
+        if field in self.groups:
+            # Repeated field: match it but keep the first capture
+            self.source.append(re.sub(r'\((?!\?)', '(?:', pattern))
+            return
+        self._group_count += 1
+        self.groups[field] = self._group_count
+        self.source.append(pattern)
+        if timestamp_format:
+            self.timestamp_format = timestamp_format
+        if scale is not None:
+            self.response_time_scale = scale
+
+    def build(self, name: str, suffix: str = '', suffix_groups: Optional[Dict[str, int]] = None) -> RegexLineParser:
+        groups = dict(self.groups)
+        for field, offset in (suffix_groups or {}).items():
+            groups[field] = self._group_count + offset
+        return RegexLineParser(name, ''.join(self.source) + suffix, groups,
+                               self.timestamp_format, self.response_time_scale)
+
+def _in_quotes(source: str, position: int) -> bool:
+    return source.count('"', 0, position) % 2 == 1
+
+def _compile_nginx(format_string: str) -> _PatternBuilder:
+    source = _strip_nginx_directive(format_string)
+    builder = _PatternBuilder()
+    position = 0
+    for token in _NGINX_TOKEN.finditer(source):
+        builder.literal(source[position:token.start()])
+        variable = (token.group(1) or token.group(2)).lower()
+        spec = NGINX_VARIABLES.get(variable)
+        if spec:
+            builder.capture(*spec)
+        else:
+            builder.skip(_in_quotes(source, token.start()))
+        position = token.end()
+    builder.literal(source[position:])
+    return builder
+
+def compile_nginx_format(format_string: str, name: str = 'nginx-custom') -> RegexLineParser:
+    """Parser for an nginx `log_format` string (or full directive)"""
+    return _compile_nginx(format_string).build(name)
+
+# ==================== APACHE LogFormat ====================
+
+APACHE_COMBINED = '%h %l %u %t "%r" %>s %b "%{Referer}i" "%{User-Agent}i"'
+APACHE_COMMON = '%h %l %u %t "%r" %>s %b'
+
+# directive (with header/note name for %{...}x) -> (field, regex, timestamp format, response time scale)
+APACHE_DIRECTIVES = {
+    'h': ('ip', r'(\S+)', None, None),
+    'a': ('ip', r'(\S+)', None, None),
+    '{x-forwarded-for}i': ('ip', r'([^, "]+)(?:, [^ "]+)*', None, None),
+    't': ('timestamp', r'\[([^\]]+)\]', 'clf', None),
+    'r': ('path', REQUEST_PATTERN, None, None),
+    'U': ('path', r'(\S+)', None, None),
+    's': ('status', r'(\d{3})', None, None),
+    'b': ('bytes', r'(\d+|-)', None, None),
+    'B': ('bytes', r'(\d+)', None, None),
+    'O': ('bytes', r'(\d+)', None, None),
+    '{referer}i': ('referer', QUOTED_VALUE, None, None),
+    '{user-agent}i': ('user_agent', QUOTED_VALUE, None, None),
+    'D': ('response_time', r'(\d+)', None, 1e-6),
+    'T': ('response_time', r'(\d+)', None, 1.0),
+    '{ms}T': ('response_time', r'(\d+)', None, 1e-3),
+    '{us}T': ('response_time', r'(\d+)', None, 1e-6),
+}
+
+_APACHE_TOKEN = re.compile(r'%(?:[<>]|!?\d+(?:,\d+)*)*(?:\{([^}]*)\})?([a-zA-Z%])')
+
+def _strip_apache_directive(format_string: str) -> str:
+    """Accept either the bare format or a whole `LogFormat "..." nickname` line"""
+    text = format_string.strip()
+    if text.startswith('LogFormat'):
+        match = re.match(r'LogFormat\s+"((?:[^"\\]|\\.)*)"', text)
+        if match:
+            text = match.group(1)
+    return text.replace('\\"', '"')
+
+def _compile_apache(format_string: str) -> _PatternBuilder:
+    source = _strip_apache_directive(format_string)
+    builder = _PatternBuilder()
+    position = 0
+    for token in _APACHE_TOKEN.finditer(source):
+        builder.literal(source[position:token.start()])
+        argument, directive = token.group(1), token.group(2)
+        if directive == '%':
+            builder.literal('%')
+        else:
+            key = directive if argument is None else (
+                f"{{{argument}}}{directive}" if directive == 'T' else f"{{{argument.lower()}}}{directive}"
+            )
+            spec = APACHE_DIRECTIVES.get(key)
+            if spec:
+                builder.capture(*spec)
+            else:
+                builder.skip(_in_quotes(source, token.start()))
+        position = token.end()
+    builder.literal(source[position:])
+    return builder
+
+def compile_apache_format(format_string: str, name: str = 'apache-custom') -> RegexLineParser:
+    """Parser for an Apache `LogFormat` string (or full LogFormat line)"""
+    return _compile_apache(format_string).build(name)
+
+# ==================== FIXED FORMATS ====================
+
+# Combined format optionally followed by $request_time, as the nginx format always accepted
+_OPTIONAL_RESPONSE_TIME = r'(?: ([\d.]+))?'
+
+class CloudFrontParser(LogFormatParser):
+    """CloudFront standard (access) logs: tab-separated W3C fields, URL-encoded user agents"""
+
+    name = 'cloudfront'
+    timestamp_format = 'iso8601'
+
+    def parse(self, line: str) -> Optional[LogRecord]:
+        if line.startswith('#'):
+            return None
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) < 19 or not fields[8].isdigit():
+            return None
+        referer = fields[9]
+        return (
+            fields[4], f"{fields[0]}T{fields[1]}Z", fields[7], int(fields[8]), _to_int(fields[3]),
+            None if referer == '-' else unquote(referer), unquote(fields[10]), _to_float(fields[18])
+        )
+
+class JsonLinesParser(LogFormatParser):
+    """One JSON object per line (nginx `escape=json`, Cloudflare Logpush, app loggers)"""
+
+    name = 'jsonl'
+    timestamp_format = 'iso8601'
+
+    KEYS = {
+        'ip': ('remote_addr', 'ip', 'client_ip', 'ClientIP', 'clientIp'),
+        'timestamp': ('time', 'timestamp', '@timestamp', 'time_iso8601', 'time_local', 'EdgeStartTimestamp'),
+        'path': ('request_uri', 'uri', 'path', 'url', 'ClientRequestURI', 'ClientRequestPath'),
+        'request': ('request',),
+        'status': ('status', 'status_code', 'EdgeResponseStatus'),
+        'bytes': ('body_bytes_sent', 'bytes_sent', 'bytes', 'EdgeResponseBytes'),
+        'referer': ('http_referer', 'referer', 'referrer', 'ClientRequestReferer'),
+        'user_agent': ('http_user_agent', 'user_agent', 'userAgent', 'ClientRequestUserAgent'),
+        'response_time': ('request_time', 'response_time', 'duration'),
+    }
+
+    def _first(self, data: Dict, field: str):
+        for key in self.KEYS[field]:
+            value = data.get(key)
+            if value not in (None, ''):
+                return value
+        return None
+
+    def parse(self, line: str) -> Optional[LogRecord]:
+        line = line.strip()
+        if not line.startswith('{'):
+            return None
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        status = str(self._first(data, 'status') or '')
+        timestamp = self._first(data, 'timestamp')
+        if not status.isdigit() or timestamp is None:
+            return None
+        path = self._first(data, 'path')
+        if path is None:
+            request = str(self._first(data, 'request') or '').split(' ')
+            path = request[1] if len(request) > 1 else ''
+        referer = self._first(data, 'referer')
+        return (
+            str(self._first(data, 'ip') or ''), str(timestamp), str(path), int(status),
+            _to_int(str(self._first(data, 'bytes') or '')), None if referer is None else str(referer),
+            str(self._first(data, 'user_agent') or ''), _to_float(str(self._first(data, 'response_time') or ''))
+        )
+
+def _alb_parser() -> RegexLineParser:
+    # type time elb client:port target:port request_time target_time response_time elb_status
+    # target_status received_bytes sent_bytes "request" "user_agent" ...
+    pattern = (
+        r'\S+ (\S+) \S+ ([^ :]+|\[[^\]]+\]):\d+ \S+ \S+ (\S+) \S+ (\d{3}) \S+ \d+ (\d+) '
+        r'"[^ "]+ (?:[a-z]+://[^/ "]*)?([^ "]*)[^"]*" "([^"]*)"'
+    )
+    return RegexLineParser(
+        'aws-alb', pattern,
+        {'timestamp': 1, 'ip': 2, 'response_time': 3, 'status': 4, 'bytes': 5, 'path': 6, 'user_agent': 7},
+        timestamp_format='iso8601'
+    )
+
+def _cloudflare_parser() -> RegexLineParser:
+    return RegexLineParser(
+        'cloudflare',
+        r'(\S+) (\S+) \w+ (\S+) (\d+) (\d+) "([^"]*)" ([\d.]+)',
+        {'timestamp': 1, 'ip': 2, 'path': 3, 'status': 4, 'bytes': 5, 'user_agent': 6, 'response_time': 7},
+        timestamp_format='iso8601'
+    )
+
+# ==================== REGISTRY ====================
+
+_REGISTRY: Dict[str, LogFormatParser] = {}
+_ALIASES: Dict[str, str] = {}
+
+def register_log_format(parser: LogFormatParser, aliases: Tuple[str, ...] = ()):
+    """Make a parser available by name (and aliases) to uploads, detection and the CLI"""
+    _REGISTRY[parser.name] = parser
+    for alias in aliases:
+        _ALIASES[alias] = parser.name
+
+def log_format_names() -> List[str]:
+    """Registered format names, in detection priority order"""
+    return list(_REGISTRY)
+
+@lru_cache(maxsize=128)
+def get_log_parser(log_format: str) -> LogFormatParser:
+    """
+    Parser for a registered format name or alias, or a custom nginx (`$var`) or
+    Apache (`%x`) format string. Raises ValueError for anything else.
+    """
+    name = _ALIASES.get(log_format, log_format)
+    if name in _REGISTRY:
+        return _REGISTRY[name]
+    if '$' in log_format:
+        return compile_nginx_format(log_format)
+    if '%' in log_format:
+        return compile_apache_format(log_format)
+    raise ValueError(f"Unsupported log format: {log_format}")
+
+def detect_log_format(lines: List[str], min_ratio: float = DETECTION_MIN_RATIO) -> Optional[str]:
+    """
+    Registered format that parses the most sample lines (timestamps included),
+    or None if none parses at least `min_ratio` of them
+    """
+    sample = [line for line in lines if line.strip() and not line.startswith('#')]
+    if not sample:
+        return None
+
+    best_name, best_count = None, 0
+    for name, parser in _REGISTRY.items():
+        parse_timestamp = TIMESTAMP_PARSERS[parser.timestamp_format]
+        count = 0
+        for line in sample:
+            record = parser.parse(line)
+            if record is None:
+                continue
+            try:
+                if parse_timestamp(record[1].strip()) is not None:
+                    count += 1
+            except (ValueError, IndexError):
+                continue
+        if count > best_count:
+            best_name, best_count = name, count
+
+    return best_name if best_count >= len(sample) * min_ratio else None
+
+def detect_file_format(file_path: str, sample_lines: int = DETECTION_SAMPLE_LINES) -> Optional[str]:
+    """detect_log_format on the first lines of a (possibly compressed) log file"""
+    from log_sources import iter_log_lines
+    return detect_log_format(list(islice(iter_log_lines(file_path), sample_lines)))
+
+_nginx_combined = _compile_nginx(NGINX_COMBINED)
+register_log_format(
+    _nginx_combined.build('nginx', _OPTIONAL_RESPONSE_TIME, {'response_time': 1}),
+    aliases=('nginx-combined',)
+)
+register_log_format(compile_apache_format(APACHE_COMBINED, 'apache'), aliases=('apache-combined',))
+register_log_format(_cloudflare_parser())
+register_log_format(_alb_parser(), aliases=('alb',))
+register_log_format(CloudFrontParser())
+register_log_format(JsonLinesParser(), aliases=('json',))
+register_log_format(compile_nginx_format(NGINX_COMMON, 'nginx-common'))
+register_log_format(compile_apache_format(APACHE_COMMON, 'apache-common'))
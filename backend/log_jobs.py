@@ -0,0 +1,358 @@
+"""
+Log Processing Jobs
+Durable processing of uploaded server logs: files are analyzed in byte-offset segments and the
+partial aggregates are checkpointed to disk after each one, so a restarted worker resumes a job
+where it stopped instead of leaving it "processing" forever. Runners heartbeat the jobs they own
+and periodically sweep for jobs whose owner stopped heartbeating.
+"""
+
+import asyncio
+import os
+import pickle
+import socket
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import structlog
+from sqlalchemy import and_, func, or_
+
+from database import SessionLocal
+from db_models import Brand, ServerLogUpload
+from bot_visit_loader import BotVisitLoader
+from log_analyzer import DEFAULT_LOG_WORKERS, ServerLogAnalyzer, LogAnalysisAggregate, align_to_line
+from log_sources import detect_compression
+from redis_pool import get_redis
+
+logger = structlog.get_logger()
+
+LOG_JOB_DIR = os.getenv('LOG_JOB_DIR', os.path.join(tempfile.gettempdir(), 'backendsight-log-jobs'))
+SEGMENT_BYTES = int(os.getenv('LOG_JOB_SEGMENT_BYTES', 64 * 1024 * 1024))
+# Runners refresh heartbeat_at on their jobs and sweep for abandoned ones this often
+HEARTBEAT_INTERVAL_SECONDS = int(os.getenv('LOG_JOB_HEARTBEAT_SECONDS', 30))
+# A "processing" job without a heartbeat for this long is assumed to belong to a dead worker
+STALE_AFTER_SECONDS = int(os.getenv('LOG_JOB_STALE_SECONDS', 120))
+
+@dataclass
+class JobCheckpoint:
+    """
+    Progress of one upload: everything before `offset` is folded into `aggregate`
+    Compressed uploads resume by decompressed line count (`lines`); `offset` is then only progress
+    `pending_redis` holds the last segment's Redis commands and the marker they are applied under
+    """
+    upload_id: str
+    offset: int
+    aggregate: LogAnalysisAggregate
+    elapsed_seconds: float = 0.0
+    lines: int = 0
+    pending_redis: Optional[Tuple[str, List[Tuple[str, tuple]]]] = None
+
+class LogJobRunner:
+    """Runs log upload jobs segment by segment with on-disk checkpoints"""
+
+    def __init__(self, job_dir: str = LOG_JOB_DIR, segment_bytes: int = SEGMENT_BYTES, workers: Optional[int] = None,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS):
+        self.job_dir = job_dir
+        self.segment_bytes = max(1, segment_bytes)
+        self.workers = workers
+        self.heartbeat_interval = heartbeat_interval
+        self.loader = BotVisitLoader()
+        # Unique per process lifetime, so a restarted worker never mistakes old claims for its own
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{int(time.time())}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def new_upload_path(self, suffix: str = ".log") -> str:
+        """Durable location for an uploaded file (kept until its job finishes)"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.job_dir)
+        os.close(fd)
+        return path
+
+    def submit(self, upload_id: str) -> asyncio.Task:
+        """Start processing an upload in this process unless it's already running here"""
+        upload_id = str(upload_id)
+        task = self._tasks.get(upload_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.run(upload_id))
+            self._tasks[upload_id] = task
+        return task
+
+    def start(self):
+        """Heartbeat this runner's jobs and resume abandoned ones in the background"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._tasks = {upload_id: task for upload_id, task in self._tasks.items() if not task.done()}
+                for upload_id in await loop.run_in_executor(None, self._heartbeat, list(self._tasks)):
+                    task = self._tasks.pop(upload_id, None)
+                    if task is not None:
+                        logger.warning("Log job taken over by another worker", upload_id=upload_id)
+                        task.cancel()
+                await self.resume_pending()
+            except Exception as e:
+                logger.error("Log job sweep failed", error=str(e))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def resume_pending(self) -> int:
+        """Submit every upload that is new or whose worker stopped heartbeating; returns how many"""
+        db = SessionLocal()
+        try:
+            pending = db.query(ServerLogUpload.id).filter(
+                self._claimable(datetime.utcnow()),
+                ServerLogUpload.file_path.isnot(None)
+            ).all()
+        finally:
+            db.close()
+
+        running = {upload_id for upload_id, task in self._tasks.items() if not task.done()}
+        pending = [upload_id for (upload_id,) in pending if str(upload_id) not in running]
+        for upload_id in pending:
+            self.submit(upload_id)
+        if pending:
+            logger.info("Resuming log processing jobs", count=len(pending))
+        return len(pending)
+
+    def _heartbeat(self, running: List[str]) -> List[str]:
+        """Refresh heartbeat_at on the jobs running here (blocking); returns those another worker now owns"""
+        if not running:
+            return []
+
+        db = SessionLocal()
+        try:
+            processing = and_(ServerLogUpload.id.in_(running), ServerLogUpload.status == "processing")
+            db.query(ServerLogUpload).filter(processing, ServerLogUpload.worker_id == self.worker_id).update(
+                {ServerLogUpload.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+            )
+            taken = db.query(ServerLogUpload.id).filter(processing, ServerLogUpload.worker_id != self.worker_id).all()
+            db.commit()
+        finally:
+            db.close()
+        return [str(upload_id) for (upload_id,) in taken]
+
+    async def run(self, upload_id: str):
+        """Process an upload from its last checkpoint to completion"""
+        db = SessionLocal()
+        upload = None
+        try:
+            if not self._claim(db, upload_id):
+                return
+
+            upload = db.query(ServerLogUpload).filter(ServerLogUpload.id == upload_id).first()
+            brand = db.query(Brand).filter(Brand.id == upload.brand_id).first()
+            if not brand:
+                raise Exception("Brand not found")
+
+            # bot_visits keeps every visit of an upload, so no spill; Redis writes wait for the
+            # checkpoint (see _checkpoint) instead of flushing mid-segment
+            analyzer = ServerLogAnalyzer(get_redis(), os.getenv('GEOIP_PATH'), spill=None)
+            analyzer.visit_sink.auto_flush = False
+
+            file_path = upload.file_path
+            file_size = os.path.getsize(file_path)
+            checkpoint = self._load_checkpoint(upload_id) or JobCheckpoint(
+                upload_id=upload_id,
+                offset=0,
+                aggregate=LogAnalysisAggregate(brand.name, self._log_format(upload), analyzer.llm_bot_patterns)
+            )
+            if checkpoint.offset:
+                logger.info("Resuming log job from checkpoint", upload_id=upload_id, offset=checkpoint.offset)
+            if checkpoint.pending_redis:
+                # The previous worker may have stopped between saving the checkpoint and applying these
+                await analyzer.visit_sink.apply_once(*checkpoint.pending_redis)
+
+            if detect_compression(file_path):
+                await self._process_stream(db, upload, brand, analyzer, checkpoint, file_size)
+            else:
+                await self._process_segments(db, upload, brand, analyzer, checkpoint, file_size)
+
+            results = analyzer.build_analysis_results(checkpoint.aggregate)
+            self._complete(upload, results)
+            db.commit()
+            self._cleanup(upload_id, file_path)
+
+            logger.info(f"Log analysis completed for upload {upload_id}")
+
+        except Exception as e:
+            logger.error(f"Log analysis failed for upload {upload_id}: {e}")
+            db.rollback()
+            if upload is not None:
+                upload.status = "failed"
+                upload.error_message = str(e)
+                db.commit()
+                self._cleanup(upload_id, upload.file_path)
+
+        finally:
+            db.close()
+
+    @staticmethod
+    def _log_format(upload: ServerLogUpload) -> str:
+        """Registered format name, or the custom format string for "custom" uploads"""
+        return upload.format_string or upload.file_format
+
+    async def _process_segments(self, db, upload, brand, analyzer, checkpoint: JobCheckpoint, file_size: int):
+        """Plain logs: analyze line-aligned byte segments, checkpointing after each"""
+        # One process pool for the whole job rather than a fresh one (and fresh imports) per segment
+        workers = self.workers or DEFAULT_LOG_WORKERS
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while checkpoint.offset < file_size:
+                segment_start = time.time()
+                segment_end = min(align_to_line(upload.file_path, checkpoint.offset + self.segment_bytes), file_size)
+
+                segment = await analyzer.analyze_log_range(
+                    upload.file_path, brand.name, self._log_format(upload),
+                    checkpoint.offset, segment_end, workers=workers, executor=executor
+                )
+                segment_key = checkpoint.offset
+                checkpoint.offset = segment_end
+                await self._checkpoint(db, upload, analyzer, checkpoint, segment, segment_key,
+                                       time.time() - segment_start, file_size)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _process_stream(self, db, upload, brand, analyzer, checkpoint: JobCheckpoint, file_size: int):
+        """Compressed logs and bundles: decompress as a stream, checkpointing by lines consumed"""
+        segment_start = time.time()
+        async for lines, bytes_read, segment in analyzer.analyze_log_stream(
+            upload.file_path, brand.name, self._log_format(upload),
+            workers=self.workers, skip_lines=checkpoint.lines
+        ):
+            segment_key = checkpoint.lines
+            checkpoint.lines = lines
+            checkpoint.offset = bytes_read
+            await self._checkpoint(db, upload, analyzer, checkpoint, segment, segment_key,
+                                   time.time() - segment_start, file_size)
+            segment_start = time.time()
+        checkpoint.offset = file_size
+
+    async def _checkpoint(self, db, upload, analyzer, checkpoint: JobCheckpoint, segment: LogAnalysisAggregate,
+                          segment_key: int, elapsed: float, file_size: int):
+        # bot_visits rows land before the checkpoint: a crash in between replays the segment, and
+        # the loader replaces rows from segment_key onwards
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.loader.load_segment, segment.visits, upload.brand_id, upload.id, segment_key
+        )
+
+        checkpoint.aggregate.merge(segment)
+        # The rows are in bot_visits now; checkpoint only counters and the newest detail rows,
+        # so checkpoint I/O stays constant per segment instead of growing with the file
+        checkpoint.aggregate.fold_visits()
+        checkpoint.elapsed_seconds += elapsed
+        # Redis counters aren't idempotent: the segment's commands are saved with the checkpoint and
+        # applied after it under a per-(upload, segment) marker, so a replay neither drops nor doubles them
+        checkpoint.pending_redis = (f"log_job_applied:{upload.id}:{segment_key}", analyzer.visit_sink.drain_commands())
+        await asyncio.get_running_loop().run_in_executor(None, self._save_checkpoint, checkpoint)
+        await analyzer.visit_sink.apply_once(*checkpoint.pending_redis)
+
+        self._record_progress(upload, checkpoint, file_size)
+        db.commit()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """Filter for uploads that are new or whose worker stopped heartbeating"""
+        return or_(
+            ServerLogUpload.status == "uploaded",
+            and_(
+                ServerLogUpload.status == "processing",
+                or_(
+                    ServerLogUpload.heartbeat_at.is_(None),
+                    ServerLogUpload.heartbeat_at < now - timedelta(seconds=STALE_AFTER_SECONDS)
+                )
+            )
+        )
+
+    def _claim(self, db, upload_id: str) -> bool:
+        """Atomically take ownership of an upload that is new or abandoned by a dead worker"""
+        now = datetime.utcnow()
+        claimed = db.query(ServerLogUpload).filter(
+            ServerLogUpload.id == upload_id,
+            self._claimable(now)
+        ).update({
+            ServerLogUpload.status: "processing",
+            ServerLogUpload.worker_id: self.worker_id,
+            ServerLogUpload.heartbeat_at: now,
+            ServerLogUpload.processing_started_at: func.coalesce(ServerLogUpload.processing_started_at, now)
+        }, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    @staticmethod
+    def _record_progress(upload: ServerLogUpload, checkpoint: JobCheckpoint, file_size: int):
+        elapsed = max(checkpoint.elapsed_seconds, 1e-6)
+        bytes_per_second = checkpoint.offset / elapsed
+
+        upload.bytes_processed = checkpoint.offset
+        upload.lines_processed = checkpoint.aggregate.total_visits
+        upload.lines_per_second = checkpoint.aggregate.total_visits / elapsed
+        upload.eta_seconds = (file_size - checkpoint.offset) / bytes_per_second if bytes_per_second else None
+        upload.last_checkpoint_at = datetime.utcnow()
+
+    @staticmethod
+    def _complete(upload: ServerLogUpload, results: Dict):
+        upload.status = "completed"
+        upload.processing_completed_at = datetime.utcnow()
+        upload.total_requests = results['total_requests']
+        upload.bot_requests = results['llm_bot_requests']
+        upload.unique_bots = results['unique_bot_ips']
+        upload.eta_seconds = 0
+
+        # Extract date range from results
+        if results.get('daily_trends'):
+            dates = list(results['daily_trends'].get(
+                next(iter(results['daily_trends'])), {}
+            ).keys())
+            if dates:
+                upload.date_range_start = datetime.fromisoformat(min(dates))
+                upload.date_range_end = datetime.fromisoformat(max(dates))
+
+    # ==================== CHECKPOINT FILES ====================
+
+    def _checkpoint_path(self, upload_id: str) -> str:
+        return os.path.join(self.job_dir, f"{upload_id}.checkpoint")
+
+    def _load_checkpoint(self, upload_id: str) -> Optional[JobCheckpoint]:
+        path = self._checkpoint_path(upload_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint for upload {upload_id}: {e}")
+            return None
+
+    def _save_checkpoint(self, checkpoint: JobCheckpoint):
+        os.makedirs(self.job_dir, exist_ok=True)
+        path = self._checkpoint_path(checkpoint.upload_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        # Atomic swap so a crash mid-write never leaves a truncated checkpoint
+        os.replace(temp_path, path)
+
+    def _cleanup(self, upload_id: str, file_path: Optional[str]):
+        for path in (file_path, self._checkpoint_path(upload_id)):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+# Process-wide runner used by the upload route and API startup
+log_job_runner = LogJobRunner()
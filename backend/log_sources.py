@@ -0,0 +1,219 @@
+"""
+Log Sources
+Opens plain, gzip, zstd and tar-bundled (rotated) log files as streams of decompressed lines.
+Decompression runs in a reader thread so it overlaps with parsing, and nothing is written to disk.
+"""
+
+import gzip
+import io
+import os
+import queue
+import tarfile
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+TAR_MAGIC_OFFSET = 257
+
+READ_CHUNK_BYTES = 1024 * 1024
+STREAM_BATCH_LINES = 20000
+
+def sniff_compression(header: bytes) -> Optional[str]:
+    """Container type from the first bytes of a file: 'gzip', 'zstd', 'tar' or None for plain text"""
+    if header.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if header.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    if header[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + 5] == b'ustar':
+        return 'tar'
+    return None
+
+def _decompressor(raw: BinaryIO, kind: Optional[str]) -> BinaryIO:
+    if kind == 'gzip':
+        # GzipFile also reads concatenated members (`cat a.gz b.gz`)
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if kind == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd logs require the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True))
+    return raw
+
+class _ReplayStream(io.RawIOBase):
+    """Serves bytes already read for sniffing ahead of the rest of the stream"""
+
+    def __init__(self, header: bytes, stream: BinaryIO):
+        self._header = header
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._header:
+            size = min(len(buffer), len(self._header))
+            buffer[:size] = self._header[:size]
+            self._header = self._header[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _sniff(stream: BinaryIO, size: int) -> Tuple[bytes, BinaryIO]:
+    """Read up to `size` bytes for sniffing; returns them and a stream that still starts at them"""
+    header = b''
+    while len(header) < size:
+        data = stream.read(size - len(header))
+        if not data:
+            break
+        header += data
+    return header, io.BufferedReader(_ReplayStream(header, stream), buffer_size=READ_CHUNK_BYTES)
+
+def open_decompressed(raw: BinaryIO) -> BinaryIO:
+    """Wrap a binary stream in the decompressor its magic bytes call for"""
+    header, stream = _sniff(raw, len(ZSTD_MAGIC))
+    return _decompressor(stream, sniff_compression(header))
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """
+    'gzip', 'zstd' or 'tar' (a bundle, possibly itself compressed) for files that need
+    decompressing; None for plain logs that can be read by byte offset
+    """
+    with open(file_path, 'rb') as f:
+        kind = sniff_compression(f.read(TAR_MAGIC_OFFSET + 5))
+        if kind in ('gzip', 'zstd'):
+            f.seek(0)
+            try:
+                header = _decompressor(f, kind).read(TAR_MAGIC_OFFSET + 5)
+            except (OSError, EOFError, ValueError):
+                return kind
+            if sniff_compression(header) == 'tar':
+                return 'tar'
+    return kind
+
+def iter_log_members(file_path: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, decompressed stream) for each log in a file. Tar bundles are read as a
+    single forward stream in archive order and each member is decompressed as needed
+    (access.log.1, access.log.2.gz, ...); the analysis aggregates don't depend on order.
+    """
+    with open(file_path, 'rb') as raw:
+        yield from _iter_members(raw, os.path.basename(file_path))
+
+def _iter_members(raw: BinaryIO, name: str) -> Iterator[Tuple[str, BinaryIO]]:
+    header, stream = _sniff(open_decompressed(raw), TAR_MAGIC_OFFSET + 5)
+    if sniff_compression(header) != 'tar':
+        yield name, stream
+        return
+
+    with tarfile.open(fileobj=stream, mode='r|') as bundle:
+        for member in bundle:
+            if member.isfile():
+                yield member.name, open_decompressed(bundle.extractfile(member))
+
+def iter_line_chunks(stream: BinaryIO, chunk_size: int = READ_CHUNK_BYTES) -> Iterator[List[bytes]]:
+    """Read a stream in large chunks and yield the complete lines (without newlines) of each"""
+    pending = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        if lines:
+            yield lines
+    if pending:
+        yield [pending]
+
+class LogLineReader:
+    """
+    Decompresses a log source in a background thread and hands out line batches.
+    zlib and zstd release the GIL while inflating, so this overlaps with parsing;
+    the bounded queue keeps at most `prefetch` batches in memory.
+    """
+
+    def __init__(self, file_path: str, batch_lines: int = STREAM_BATCH_LINES, prefetch: int = 8, skip_lines: int = 0):
+        self.file_path = file_path
+        self.batch_lines = max(1, batch_lines)
+        self.skip_lines = skip_lines
+        self.members: List[str] = []
+        self.error: Optional[BaseException] = None
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+        self._stopped = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name="log-line-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            batch: List[bytes] = []
+            skip = self.skip_lines
+            with open(self.file_path, 'rb') as raw_file:
+                for name, stream in _iter_members(raw_file, os.path.basename(self.file_path)):
+                    self.members.append(name)
+                    for lines in iter_line_chunks(stream):
+                        if skip:
+                            dropped = min(skip, len(lines))
+                            skip -= dropped
+                            lines = lines[dropped:]
+                        batch.extend(lines)
+                        if len(batch) >= self.batch_lines:
+                            if not self._put((batch, raw_file.tell())):
+                                return
+                            batch = []
+                if batch:
+                    self._put((batch, raw_file.tell()))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(None)
+
+    def _put(self, item) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def next_batch(self) -> Optional[Tuple[List[bytes], int]]:
+        """
+        Next (lines, compressed bytes read so far) or None at the end of the source.
+        Blocks; call from an executor when on the event loop.
+        """
+        if self._finished:
+            return None
+        item = self._queue.get()
+        if item is None:
+            self._finished = True
+            if self.error:
+                raise self.error
+        return item
+
+    def close(self):
+        """Stop the reader thread early"""
+        self._stopped.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def iter_log_lines(file_path: str, **reader_options) -> Iterator[str]:
+    """Decoded lines of any supported log source, decompressed in a background thread"""
+    with LogLineReader(file_path, **reader_options) as reader:
+        while True:
+            item = reader.next_batch()
+            if item is None:
+                return
+            for line in item[0]:
+                yield line.decode('utf-8', errors='replace')
@@ -0,0 +1,128 @@
+"""
+Log Timestamp Parsing
+Fixed-offset timestamp parsers for the supported access log formats. Stdlib only.
+Timestamps are returned as naive UTC datetimes; unparseable values return None.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+def _parse_offset(text: str) -> Optional[timedelta]:
+    """Parse '+0000', '+00:00', '-0530' or 'Z' into an offset from UTC"""
+    if not text or text in ('Z', 'z'):
+        return timedelta(0)
+    sign = text[0]
+    if sign not in '+-':
+        return None
+    digits = text[1:].replace(':', '')
+    if len(digits) != 4 or not digits.isdigit():
+        return None
+    offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+    return -offset if sign == '-' else offset
+
+def parse_clf_timestamp(value: str) -> Optional[datetime]:
+    """
+    Common log format timestamp used by nginx and apache: '10/Oct/2023:13:55:36 +0000'
+    Fields are sliced at fixed offsets instead of going through strptime.
+    """
+    if len(value) < 20 or value[2] != '/' or value[6] != '/' or value[11] != ':':
+        return None
+    month = MONTHS.get(value[3:6].lower())
+    if month is None:
+        return None
+    parsed = datetime(
+        int(value[7:11]), month, int(value[0:2]),
+        int(value[12:14]), int(value[15:17]), int(value[18:20])
+    )
+    offset = _parse_offset(value[20:].strip())
+    if offset is None:
+        return None
+    return parsed - offset
+
+def parse_iso_timestamp(value: str) -> Optional[datetime]:
+    """
+    ISO 8601 / RFC 3339 timestamp used by cloudflare: '2023-10-10T13:55:36Z',
+    optionally with fractional seconds and a '+HH:MM' offset. All-digit values are
+    treated as Unix epoch seconds, milliseconds or nanoseconds (Logpush).
+    """
+    if value.isdigit():
+        epoch = int(value)
+        # Seconds until year 2286; larger values are ms (13 digits) or ns (19 digits)
+        while epoch > 10_000_000_000:
+            epoch //= 1000
+        return datetime(1970, 1, 1) + timedelta(seconds=epoch)
+
+    if len(value) < 19 or value[4] != '-' or value[7] != '-' or value[10] not in 'Tt ':
+        return None
+    parsed = datetime(
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19])
+    )
+
+    rest = value[19:]
+    microsecond = 0
+    if rest[:1] == '.':
+        end = 1
+        while end < len(rest) and rest[end].isdigit():
+            end += 1
+        fraction = rest[1:end]
+        microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+        rest = rest[end:]
+
+    offset = _parse_offset(rest)
+    if offset is None:
+        return None
+    return parsed.replace(microsecond=microsecond) - offset
+
+def parse_epoch_timestamp(value: str) -> Optional[datetime]:
+    """Unix epoch seconds with optional fraction, as written by nginx $msec: '1696946136.123'"""
+    seconds, _, fraction = value.partition('.')
+    if not seconds.isdigit() or (fraction and not fraction.isdigit()):
+        return None
+    microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+    return datetime(1970, 1, 1) + timedelta(seconds=int(seconds), microseconds=microsecond)
+
+# Keyed by timestamp style (see log_formats) and, for older callers, by built-in format name
+PARSERS = {
+    'clf': parse_clf_timestamp,
+    'iso8601': parse_iso_timestamp,
+    'epoch': parse_epoch_timestamp,
+    'nginx': parse_clf_timestamp,
+    'apache': parse_clf_timestamp,
+    'cloudflare': parse_iso_timestamp
+}
+
+class TimestampParser:
+    """
+    Parses log timestamps with a one-entry memo.
+    Consecutive log lines usually share a second, so the last (format, string) pair is reused.
+    """
+
+    def __init__(self):
+        self._last: Tuple[Optional[str], Optional[str], Optional[datetime]] = (None, None, None)
+
+    def parse(self, value: str, log_format: str) -> Optional[datetime]:
+        """Return the timestamp as naive UTC, or None if it can't be parsed"""
+        last_format, last_value, last_result = self._last
+        if value == last_value and log_format == last_format:
+            return last_result
+
+        parser = PARSERS.get(log_format, parse_clf_timestamp)
+        try:
+            result = parser(value.strip())
+        except (ValueError, IndexError):
+            result = None
+
+        self._last = (log_format, value, result)
+        return result
+
+_default_parser = TimestampParser()
+
+def parse_timestamp(value: str, log_format: str) -> Optional[datetime]:
+    """Parse a log timestamp with the process-wide memoizing parser"""
+    return _default_parser.parse(value, log_format)
@@ -0,0 +1,127 @@
+"""
+Shared Model Registry
+Loads each embedding model once per process and shares it across the optimization
+engine, ChromaDB utilities and brand analyzer
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+DEFAULT_EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+    Models are keyed by (loader, model name) so different model classes never collide.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[Callable, str], Any] = {}
+        self._load_stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[Callable, str], threading.Lock] = {}
+
+    def get(self, model_name: str = DEFAULT_EMBEDDING_MODEL, loader: Optional[Callable] = None) -> Any:
+        """Return the shared model, loading it on first use"""
+        loader = loader or _default_loader()
+        key = (loader, model_name)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        # One lock per model so concurrent first requests load it only once
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(model_name, loader)
+                self._models[key] = model
+        return model
+
+    def warm_up(self, model_names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Load models and run one encode so the first request doesn't pay for initialization"""
+        for model_name in model_names or [DEFAULT_EMBEDDING_MODEL]:
+            model = self.get(model_name)
+            if hasattr(model, 'encode'):
+                model.encode(["warm up"], show_progress_bar=False)
+        return self.get_load_stats()
+
+    def get_load_stats(self) -> Dict[str, Dict[str, float]]:
+        """Load time and memory per loaded model"""
+        return {name: dict(stats) for name, stats in self._load_stats.items()}
+
+    def clear(self):
+        """Drop all cached models"""
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+            self._load_stats.clear()
+
+    def _load(self, model_name: str, loader: Callable) -> Any:
+        rss_before = _get_rss_bytes()
+        start_time = time.time()
+
+        model = loader(model_name)
+
+        load_time = time.time() - start_time
+        memory_bytes = _get_parameter_bytes(model) or max(0, _get_rss_bytes() - rss_before)
+
+        self._load_stats[model_name] = {
+            'load_time_seconds': load_time,
+            'memory_bytes': memory_bytes
+        }
+        _report_model_load(model_name, load_time, memory_bytes)
+
+        logger.info(
+            "shared_model_loaded",
+            model=model_name,
+            load_time=round(load_time, 3),
+            memory_mb=round(memory_bytes / (1024**2), 1)
+        )
+        return model
+
+def _default_loader() -> Callable:
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer
+
+def _get_rss_bytes() -> int:
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except Exception:
+        return 0
+
+def _get_parameter_bytes(model: Any) -> int:
+    """Size of the model weights when the model exposes torch parameters"""
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return 0
+
+def _report_model_load(model_name: str, load_time: float, memory_bytes: int):
+    try:
+        from monitoring import get_prometheus_metrics
+        metrics = get_prometheus_metrics()
+        metrics.model_load_time.labels(model=model_name).set(load_time)
+        metrics.model_memory_bytes.labels(model=model_name).set(memory_bytes)
+    except Exception as e:
+        logger.debug(f"Model metrics not reported: {e}")
+
+# Process-wide registry
+model_registry = ModelRegistry()
+
+def get_shared_model(model_name: str = DEFAULT_EMBEDDING_MODEL, loader: Optional[Callable] = None) -> Any:
+    """Get a model from the process-wide registry"""
+    return model_registry.get(model_name, loader)
+
+def warm_up_models(model_names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """Warm up the process-wide registry (called on API startup)"""
+    return model_registry.warm_up(model_names)
@@ -115,6 +115,25 @@ class PrometheusMetrics:
             buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5]
         )
         
+        # Shared model registry metrics
+        self.model_load_time = Gauge(
+            'model_load_seconds',
+            'Time taken to load a shared model',
+            ['model']
+        )
+        
+        self.model_memory_bytes = Gauge(
+            'model_memory_bytes',
+            'Approximate memory held by a shared model',
+            ['model']
+        )
+        
+        self.embedding_cache_requests = Counter(
+            'embedding_cache_requests_total',
+            'Embedding cache lookups',
+            ['tier', 'result']
+        )
+        
         # User metrics
         self.active_users = Gauge(
             'active_users_total',
@@ -163,11 +182,20 @@ class PrometheusMetrics:
             'python_version': f"{os.sys.version_info.major}.{os.sys.version_info.minor}.{os.sys.version_info.micro}"
         })
 
+_prometheus_metrics: Optional[PrometheusMetrics] = None
+
+def get_prometheus_metrics() -> PrometheusMetrics:
+    """Process-wide metrics instance (collectors can only be registered once)"""
+    global _prometheus_metrics
+    if _prometheus_metrics is None:
+        _prometheus_metrics = PrometheusMetrics()
+    return _prometheus_metrics
+
 class ApplicationMonitor:
     """Comprehensive application monitoring"""
     
     def __init__(self, redis_client, db_session):
-        self.metrics = PrometheusMetrics()
+        self.metrics = get_prometheus_metrics()
         self.redis = redis_client
         self.db = db_session
         self.logger = structlog.get_logger()
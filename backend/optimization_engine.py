@@ -5,8 +5,11 @@ All test method names and functionality implemented
 
 import asyncio
 import logging
+import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
@@ -19,8 +22,30 @@ from collections import defaultdict
 import json
 import structlog
 
+from model_registry import DEFAULT_EMBEDDING_MODEL, get_shared_model
+from embedding_cache import get_embedding_cache
+
 logger = structlog.get_logger()
 
+# Embedding pipeline defaults (overridable per engine via config)
+DEFAULT_EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', 2))
+
+_embedding_executor: Optional[ThreadPoolExecutor] = None
+_embedding_executor_lock = threading.Lock()
+
+def get_embedding_executor() -> ThreadPoolExecutor:
+    """Process-wide bounded pool that runs encode calls off the event loop"""
+    global _embedding_executor
+    if _embedding_executor is None:
+        with _embedding_executor_lock:
+            if _embedding_executor is None:
+                _embedding_executor = ThreadPoolExecutor(
+                    max_workers=max(1, EMBEDDING_WORKERS),
+                    thread_name_prefix="embedding"
+                )
+    return _embedding_executor
+
 @dataclass
 class OptimizationMetrics:
     """Complete 12-metric system as specified in FRD Section 5.3"""
@@ -113,20 +138,33 @@ class AIOptimizationEngine:
     FIXED to include all test methods
     """
     
+    # Question types used for LLM answer coverage (Metric 8)
+    QUESTION_TYPES = [
+        "what is", "how does", "what are", "how much", "where can",
+        "what's the", "how to", "what are the benefits", "is it good"
+    ]
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.embedding_batch_size = max(1, int(config.get('embedding_batch_size', DEFAULT_EMBEDDING_BATCH_SIZE)))
+        self._question_type_embeddings: Optional[np.ndarray] = None
         
         # Initialize AI clients
         self.anthropic_client = None
         self.openai_client = None
         
-        # Initialize sentence transformer model
+        # Sentence transformer model is shared process-wide instead of loaded per engine
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = get_shared_model(DEFAULT_EMBEDDING_MODEL, loader=SentenceTransformer)
+            self._shared_model = self.model
             logger.info("Sentence transformer model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load sentence transformer: {e}")
             self.model = None
+            self._shared_model = None
+        
+        # Content-addressed embedding cache shared by all engines using the registry model
+        self.embedding_cache = get_embedding_cache(DEFAULT_EMBEDDING_MODEL) if config.get('embedding_cache', True) else None
         
         # Initialize API clients if keys are provided and not in test mode
         if config.get('anthropic_api_key') and config.get('anthropic_api_key') != 'test_key':
@@ -256,7 +294,7 @@ class AIOptimizationEngine:
             # Create content chunks
             chunks = []
             if content_sample:
-                chunks = self._create_content_chunks_from_sample(content_sample)
+                chunks = await self._create_content_chunks_async(content_sample)
             else:
                 # Use minimal default content
                 chunks = [ContentChunk(
@@ -353,25 +391,15 @@ class AIOptimizationEngine:
             return 0.5  # Default value
         
         try:
-            # Calculate average relevance between chunks and queries
-            total_relevance = 0.0
-            comparisons = 0
-            
-            query_embeddings = self.model.encode(queries)
-            
-            for chunk in chunks:
-                if chunk.embedding is not None:
-                    for query_emb in query_embeddings:
-                        similarity = util.cos_sim(chunk.embedding, query_emb)
-                        similarity_value = self._extract_similarity_value(similarity)
-                        total_relevance += similarity_value
-                        comparisons += 1
-            
-            if comparisons > 0:
-                avg_relevance = total_relevance / comparisons
-                return max(0.0, min(1.0, avg_relevance))
-            else:
+            chunk_matrix = self._stack_chunk_embeddings(chunks)
+            if chunk_matrix is None:
                 return 0.6  # Default reasonable value
+            
+            # Average relevance over every chunk x query pair, from one matrix multiply
+            query_matrix = self._encode_texts(queries)
+            similarities = self._cosine_similarity_matrix(chunk_matrix, query_matrix)
+            avg_relevance = float(similarities.mean())
+            return max(0.0, min(1.0, avg_relevance))
                 
         except Exception as e:
             logger.error(f"Embedding relevance calculation failed: {e}")
@@ -383,40 +411,48 @@ class AIOptimizationEngine:
             return 0.5
         
         try:
-            question_types = [
-                "what is", "how does", "what are", "how much", "where can",
-                "what's the", "how to", "what are the benefits", "is it good"
-            ]
-
+            question_matrix = self._get_question_type_embeddings()
+            chunk_matrix = self._stack_chunk_embeddings(chunks)
+            
             answered_questions = 0
+            if chunk_matrix is not None:
+                # Best-matching chunk per question type; threshold for "can answer this question type"
+                max_similarity = self._cosine_similarity_matrix(question_matrix, chunk_matrix).max(axis=1)
+                answered_questions = int(np.count_nonzero(max_similarity > 0.7))
 
-            for question_type in question_types:
-                try:
-                    # Encode question type
-                    question_embedding = self.model.encode([question_type])
-                    
-                    max_similarity = 0.0
-                    for chunk in chunks:
-                        if chunk.embedding is not None:
-                            similarity = util.cos_sim(question_embedding, chunk.embedding)
-                            similarity_value = self._extract_similarity_value(similarity)
-                            max_similarity = max(max_similarity, similarity_value)
-                    
-                    # Threshold for "can answer this question type"
-                    if max_similarity > 0.7:
-                        answered_questions += 1
-                        
-                except Exception as e:
-                    logger.warning(f"Error processing question type '{question_type}': {e}")
-                    continue
-
-            coverage_score = answered_questions / len(question_types)
+            coverage_score = answered_questions / len(self.QUESTION_TYPES)
             return max(0.0, min(1.0, coverage_score))
             
         except Exception as e:
             logger.error(f"Answer coverage calculation failed: {e}")
             return 0.5
 
+    def _get_question_type_embeddings(self) -> np.ndarray:
+        """Encode all question types in one batch, once per engine"""
+        if self._question_type_embeddings is None:
+            self._question_type_embeddings = self._encode_texts(self.QUESTION_TYPES)
+        return self._question_type_embeddings
+
+    @staticmethod
+    def _stack_chunk_embeddings(chunks: List[ContentChunk]) -> Optional[np.ndarray]:
+        """Stack available chunk embeddings into one float32 matrix"""
+        embeddings = [chunk.embedding for chunk in chunks if chunk.embedding is not None]
+        if not embeddings:
+            return None
+        return np.vstack(embeddings).astype(np.float32, copy=False)
+
+    @staticmethod
+    def _cosine_similarity_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        All-pairs cosine similarity between the rows of a and b.
+        Normalizes like util.cos_sim (norm clamped at 1e-12) so scores match the pairwise version.
+        """
+        a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+        b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+        a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+        b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+        return a @ b.T
+
     # Alias for tests
     async def _calculate_answer_coverage(self, chunks: List[ContentChunk], queries: List[str]) -> float:
         """Calculate LLM answer coverage - alias for tests"""
@@ -470,30 +506,37 @@ class AIOptimizationEngine:
 
     # ==================== CONTENT PROCESSING METHODS ====================
 
+    async def _create_content_chunks_async(self, content_sample: str) -> List[ContentChunk]:
+        """Create content chunks on the embedding pool so encoding doesn't block the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_embedding_executor(),
+            self._create_content_chunks_from_sample,
+            content_sample
+        )
+
     def _create_content_chunks_from_sample(self, content_sample: str) -> List[ContentChunk]:
         """Create content chunks from sample text"""
         if not content_sample:
             return []
         
         try:
-            # Split content into paragraphs
+            # Split content into paragraphs, skipping very short ones
             paragraphs = [p.strip() for p in content_sample.split('\n\n') if p.strip()]
-            chunks = []
+            paragraphs = [para for para in paragraphs if len(para) >= 20]
             
-            for para in paragraphs:
-                if len(para) < 20:  # Skip very short paragraphs
-                    continue
-                
+            # Embed every paragraph in one batched pass; rows stay aligned with paragraphs
+            embeddings = None
+            if self.model and paragraphs:
+                try:
+                    embeddings = self._encode_texts(paragraphs)
+                except Exception as e:
+                    logger.warning(f"Failed to create embeddings: {e}")
+            
+            chunks = []
+            for index, para in enumerate(paragraphs):
                 word_count = len(para.split())
                 
-                # Create embedding if model is available
-                embedding = None
-                if self.model:
-                    try:
-                        embedding = self.model.encode([para])[0]
-                    except Exception as e:
-                        logger.warning(f"Failed to create embedding: {e}")
-                
                 # Extract keywords (simple approach)
                 keywords = self._extract_simple_keywords(para)
                 
@@ -506,7 +549,7 @@ class AIOptimizationEngine:
                 chunk = ContentChunk(
                     text=para,
                     word_count=word_count,
-                    embedding=embedding,
+                    embedding=embeddings[index] if embeddings is not None else None,
                     keywords=keywords,
                     semantic_tags=semantic_tags,
                     has_structure=has_structure,
@@ -521,6 +564,29 @@ class AIOptimizationEngine:
             logger.error(f"Content chunking failed: {e}")
             return []
 
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with batched forward passes.
+        Returns one contiguous float32 matrix whose rows align with texts.
+        Cached embeddings are only valid for the shared registry model, so a swapped model bypasses the cache.
+        """
+        if self.embedding_cache is not None and self.model is self._shared_model:
+            return self.embedding_cache.get_or_encode(texts, self._encode_uncached)
+        return self._encode_uncached(texts)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        """Encode texts directly with the model"""
+        encoded = self.model.encode(
+            texts,
+            batch_size=self.embedding_batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(encoded, dtype=np.float32)))
+        if matrix.shape[0] != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {matrix.shape[0]}")
+        return matrix
+
     def _extract_simple_keywords(self, text: str) -> List[str]:
         """Extract simple keywords from text"""
         try:
@@ -595,32 +661,6 @@ class AIOptimizationEngine:
             stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
             return [word for word in words if len(word) > 3 and word not in stop_words][:10]
 
-    def _extract_similarity_value(self, similarity) -> float:
-        """Extract similarity value from different tensor/array formats - FIXED"""
-        try:
-            if hasattr(similarity, 'item'):
-                # Single value tensor
-                return float(similarity.item())
-            elif hasattr(similarity, 'numpy'):
-                # Tensor with numpy conversion
-                sim_array = similarity.numpy()
-                if sim_array.size == 1:
-                    return float(sim_array.item())
-                else:
-                    return float(sim_array[0][0] if len(sim_array.shape) > 1 else sim_array[0])
-            elif isinstance(similarity, np.ndarray):
-                # NumPy array
-                if similarity.size == 1:
-                    return float(similarity.item())
-                else:
-                    return float(similarity[0][0] if len(similarity.shape) > 1 else similarity[0])
-            else:
-                # Fallback for other formats
-                return float(similarity[0][0] if hasattr(similarity, '__getitem__') and len(similarity.shape) > 1 else similarity[0])
-        except (IndexError, AttributeError, ValueError, TypeError) as e:
-            logger.warning(f"Similarity conversion error: {e}, using 0.0")
-            return 0.0
-
     # ==================== QUERY GENERATION AND ANALYSIS ====================
 
     async def _generate_semantic_queries(self, brand_name: str, product_categories: List[str]) -> List[str]:
@@ -0,0 +1,211 @@
+"""
+Partition Manager
+bot_visits and tracking_events are range-partitioned by month on timestamp (see
+database_setup.sql). This keeps partitions created ahead of the current month and on demand
+for historical log loads, and applies retention by dropping whole partitions instead of
+running DELETEs over the heap.
+"""
+
+import asyncio
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import text
+
+logger = structlog.get_logger()
+
+# Table -> months of data kept (the current month counts as one)
+PARTITION_RETENTION_MONTHS = {
+    'bot_visits': int(os.getenv('BOT_VISIT_RETENTION_MONTHS', 13)),
+    'tracking_events': int(os.getenv('TRACKING_EVENT_RETENTION_MONTHS', 6)),
+}
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv('PARTITION_MAINTENANCE_INTERVAL', 6 * 3600))
+
+LIST_PARTITIONS_SQL = text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = :table"
+)
+
+def month_start(moment: datetime) -> datetime:
+    """First instant of the (UTC) month containing `moment`, naive like the timestamp columns"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(moment.year, moment.month, 1)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+def partition_month(table: str, name: str) -> Optional[datetime]:
+    """Month a partition named by `partition_name` covers (None for anything else)"""
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+def months_between(start: datetime, end: datetime) -> List[datetime]:
+    """Every month from the one containing `start` to the one containing `end`"""
+    month, last = month_start(start), month_start(end)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+class PartitionManager:
+    """Creates and retires the monthly partitions; a no-op on databases other than Postgres"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        retention_months: Dict[str, int] = PARTITION_RETENTION_MONTHS,
+        months_ahead: int = PARTITION_MONTHS_AHEAD,
+        interval: float = PARTITION_MAINTENANCE_INTERVAL_SECONDS
+    ):
+        self._session_factory = session_factory
+        self.retention_months = retention_months
+        self.months_ahead = months_ahead
+        self.interval = interval
+        # Partitions known to exist, so steady-state writes cost no catalog round trips
+        self._known: Set[Tuple[str, datetime]] = set()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_range(self, table: str, start: datetime, end: datetime) -> List[str]:
+        """
+        Create any missing partitions for the months from `start` to `end` in their own
+        transaction (blocking). Returns the names of the partitions created; raises ValueError
+        for spans longer than the table's retention plus `months_ahead`.
+        """
+        months = months_between(start, end)
+        # A wider span means a bad timestamp, not data worth a partition per month in between
+        limit = self.retention_months.get(table, max(self.retention_months.values())) + self.months_ahead
+        if len(months) > limit:
+            raise ValueError(f"Refusing to create {len(months)} {table} partitions (limit {limit}) "
+                             f"for {start:%Y-%m-%d}..{end:%Y-%m-%d}")
+        missing = [month for month in months if (table, month) not in self._known]
+        if not missing:
+            return []
+        with self._lock:
+            db = self._session()
+            created = []
+            try:
+                if self._is_partitioned(db):
+                    existing = self._partitions(db, table)
+                    for month in missing:
+                        if month not in existing:
+                            db.execute(text(create_partition_sql(table, month)))
+                            created.append(partition_name(table, month))
+                    db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            self._known.update((table, month) for month in missing)
+
+        if created:
+            logger.info("Partitions created", table=table, partitions=created)
+        return created
+
+    def maintain(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Create partitions from the current month to `months_ahead` months out and drop those
+        older than each table's retention (blocking). Returns created/dropped names per table.
+        """
+        current = month_start(now or datetime.utcnow())
+        report = {}
+        for table, retention in self.retention_months.items():
+            report[table] = {
+                'created': self.ensure_range(table, current, add_months(current, self.months_ahead)),
+                'dropped': self.drop_expired(table, add_months(current, 1 - retention)),
+            }
+        return report
+
+    def drop_expired(self, table: str, keep_from: datetime) -> List[str]:
+        """Detach and drop every partition covering months before `keep_from`"""
+        with self._lock:
+            db = self._session()
+            try:
+                if not self._is_partitioned(db):
+                    return []
+                expired = sorted(
+                    (month, name) for month, name in self._partitions(db, table).items() if month < keep_from
+                )
+                for month, name in expired:
+                    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    db.execute(text(f"DROP TABLE {name}"))
+                    self._known.discard((table, month))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        dropped = [name for _, name in expired]
+        if dropped:
+            logger.info("Expired partitions dropped", table=table, partitions=dropped)
+        return dropped
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.maintain)
+            except Exception as e:
+                logger.error("Partition maintenance failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def _session(self):
+        session_factory = self._session_factory
+        if session_factory is None:
+            # Imported on first use so callers load without a database driver
+            from database import SessionLocal
+            session_factory = SessionLocal
+        return session_factory()
+
+    @staticmethod
+    def _is_partitioned(db) -> bool:
+        return db.get_bind().dialect.name == 'postgresql'
+
+    @staticmethod
+    def _partitions(db, table: str) -> Dict[datetime, str]:
+        partitions = {}
+        for (name,) in db.execute(LIST_PARTITIONS_SQL, {'table': table}):
+            month = partition_month(table, name)
+            if month is not None:
+                partitions[month] = name
+        return partitions
+
+# Process-wide manager shared by the loaders, the tracking ingestor and API startup
+partition_manager = PartitionManager()
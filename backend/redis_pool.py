@@ -0,0 +1,86 @@
+"""
+Redis Connection Pool
+Shared asyncio Redis clients for the tracking modules: one connection pool per process (and per
+event loop, since asyncio connections can't cross loops) plus helpers for pipelined batches
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis.asyncio as aioredis
+import structlog
+
+logger = structlog.get_logger()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 100))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 5))
+PIPELINE_BATCH_SIZE = 1000
+
+# (event loop, url, decode_responses) -> pool
+_pools: Dict[Tuple[Optional[asyncio.AbstractEventLoop], str, bool], aioredis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+def get_redis(url: Optional[str] = None, decode_responses: bool = False) -> aioredis.Redis:
+    """
+    Async client on the process-wide pool for `url` (REDIS_URL by default)
+    Clients are cheap wrappers; connections are shared through the pool
+    """
+    url = url or REDIS_URL
+    loop = _current_loop()
+    key = (loop, url, decode_responses)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # Drop pools of loops that have finished (tests and scripts run several)
+            for stale in [k for k in _pools if k[0] is not None and k[0].is_closed()]:
+                del _pools[stale]
+            pool = _pools[key] = aioredis.ConnectionPool.from_url(
+                url,
+                decode_responses=decode_responses,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                health_check_interval=30
+            )
+            logger.info("Redis connection pool created", url=url, max_connections=REDIS_MAX_CONNECTIONS)
+    return aioredis.Redis(connection_pool=pool)
+
+async def close_redis_pools():
+    """Disconnect every pool created on the running loop (application shutdown)"""
+    loop = _current_loop()
+    with _pools_lock:
+        keys = [key for key in _pools if key[0] is loop or key[0] is None]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        await pool.disconnect()
+
+async def execute_pipelined(
+    client: aioredis.Redis,
+    commands: Sequence[Tuple[str, tuple]],
+    batch_size: int = PIPELINE_BATCH_SIZE
+) -> List[Any]:
+    """
+    Run (method, args) commands through non-transactional pipelines of at most
+    `batch_size` commands each; returns every command's reply in order
+    """
+    results: List[Any] = []
+    batch_size = max(1, batch_size)
+    for start in range(0, len(commands), batch_size):
+        pipe = client.pipeline(transaction=False)
+        for method, args in commands[start:start + batch_size]:
+            getattr(pipe, method)(*args)
+        results.extend(await pipe.execute())
+    return results
+
+async def read_pipelined(client: aioredis.Redis, method: str, keys: Iterable, *args) -> List[Any]:
+    """The same read command for many keys, pipelined (e.g. HGETALL for each day of a window)"""
+    return await execute_pipelined(client, [(method, (key, *args)) for key in keys])
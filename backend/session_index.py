@@ -0,0 +1,64 @@
+"""
+Bot Session Index
+Sorted set of session IDs scored by when they were last seen, plus one HyperLogLog of session IDs
+per hour. Active-session windows are a ZCOUNT (O(log n)) and unique sessions a PFCOUNT over the
+hourly keys, instead of scanning the keyspace for bot_session:* hashes.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+SESSION_INDEX_KEY = "bot_sessions:last_seen"
+SESSION_INDEX_RETENTION = 86400  # Matches the bot_session:* hash TTL
+
+# Active sessions: seen within the window (exact, from the sorted set)
+ACTIVE_WINDOWS = {'5m': 300, '1h': 3600, '24h': 86400}
+# Unique sessions: hourly HyperLogLogs merged over the window (~0.8% error)
+UNIQUE_WINDOWS = {'24h': 24, '7d': 7 * 24}
+UNIQUE_SESSIONS_TTL = 8 * 86400
+
+def unique_sessions_key(moment: datetime) -> str:
+    return f"bot_sessions:unique:{moment.strftime('%Y%m%d%H')}"
+
+def session_index_commands(session_ids: Iterable[str], now: Optional[float] = None) -> List[tuple]:
+    """
+    (method, args) index updates for sessions seen now, including the trim of expired entries;
+    the server clock is used so bots with skewed clocks can't linger in the active windows
+    """
+    session_ids = list(dict.fromkeys(session_ids))
+    if not session_ids:
+        return []
+    now = time.time() if now is None else now
+    unique_key = unique_sessions_key(datetime.fromtimestamp(now))
+    return [
+        ('zadd', (SESSION_INDEX_KEY, {session_id: now for session_id in session_ids})),
+        ('zremrangebyscore', (SESSION_INDEX_KEY, '-inf', f"({now - SESSION_INDEX_RETENTION}")),
+        ('pfadd', (unique_key, *session_ids)),
+        ('expire', (unique_key, UNIQUE_SESSIONS_TTL)),
+    ]
+
+def queue_session_touch(pipe, session_ids: Iterable[str], now: Optional[float] = None):
+    """Queue the index updates for a batch of sessions on a pipeline"""
+    for method, args in session_index_commands(session_ids, now):
+        getattr(pipe, method)(*args)
+
+def queue_session_counts(pipe, now: Optional[float] = None):
+    """Queue the reads for every active and unique window; parse with `session_counts`"""
+    now = time.time() if now is None else now
+    pipe.zremrangebyscore(SESSION_INDEX_KEY, '-inf', f"({now - SESSION_INDEX_RETENTION}")
+    for seconds in ACTIVE_WINDOWS.values():
+        pipe.zcount(SESSION_INDEX_KEY, now - seconds, '+inf')
+
+    current_hour = datetime.fromtimestamp(now)
+    for hours in UNIQUE_WINDOWS.values():
+        pipe.pfcount(*[unique_sessions_key(current_hour - timedelta(hours=i)) for i in range(hours)])
+
+def session_counts(replies: List) -> Dict[str, Dict[str, int]]:
+    """Counts from the replies of `queue_session_counts`, in queue order"""
+    replies = iter(replies)
+    next(replies)  # trim
+    return {
+        'active': {window: int(next(replies) or 0) for window in ACTIVE_WINDOWS},
+        'unique': {window: int(next(replies) or 0) for window in UNIQUE_WINDOWS},
+    }
@@ -4,6 +4,7 @@ Simple Test Configuration - FIXED to work immediately
 
 import os
 import sys
+import importlib
 import pytest
 import asyncio
 import tempfile
@@ -54,7 +55,8 @@ os.environ.update({
     'DATABASE_URL': TEST_CONFIG['database_url'],
     'TEST_DATABASE_URL': TEST_CONFIG['database_url'],
     'REDIS_URL': TEST_CONFIG['redis_url'],
-    'AUTO_INIT_DB': 'false'
+    'AUTO_INIT_DB': 'false',
+    'VISIT_SPILL_DIR': tempfile.mkdtemp(prefix='visit-segments-')
 })
 
 def pytest_configure(config):
@@ -199,11 +201,11 @@ def cache_client(redis_client):
         return CacheUtils(TEST_CONFIG['redis_url'])
     except (ImportError, Exception):
         class MockCacheClient:
-            def get(self, key): 
+            async def get(self, key): 
                 return None
-            def set(self, key, value, ttl=None): 
+            async def set(self, key, value, ttl=None): 
                 return True
-            def delete(self, key): 
+            async def delete(self, key): 
                 return True
         return MockCacheClient()
 
@@ -339,13 +341,18 @@ def load_test_scenarios():
 if not hasattr(threading, 'ThreadPoolExecutor'):
     threading.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor
 
+# Modules with their own unit tests are only mocked when they can't be imported
+for module_name in ['log_analyzer', 'bot_tracker']:
+    try:
+        importlib.import_module(module_name)
+    except ImportError:
+        sys.modules[module_name] = Mock()
+
 # Mock missing modules
 modules_to_mock = [
     'database',
     'utils', 
-    'tracking_manager',
-    'log_analyzer',
-    'bot_tracker'
+    'tracking_manager'
 ]
 
 for module_name in modules_to_mock:
@@ -359,11 +366,11 @@ for module_name in modules_to_mock:
             class MockCacheUtils:
                 def __init__(self, *args, **kwargs):
                     pass
-                def get(self, key):
+                async def get(self, key):
                     return None
-                def set(self, key, value, ttl=None):
+                async def set(self, key, value, ttl=None):
                     return True
-                def delete(self, key):
+                async def delete(self, key):
                     return True
             mock_module.CacheUtils = MockCacheUtils
         
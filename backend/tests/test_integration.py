@@ -743,7 +743,8 @@ class TestCrossComponentIntegration:
         ).scalar()
         assert metrics_count >= 10  # Should have most of the 12 metrics
 
-    def test_cache_database_synchronization(self, cache_client, db_session):
+    @pytest.mark.asyncio
+    async def test_cache_database_synchronization(self, cache_client, db_session):
         """Test cache and database staying synchronized"""
         # Create brand in database
         brand = Brand(name="Cache Sync Test Brand")
@@ -760,11 +761,11 @@ class TestCrossComponentIntegration:
             "cached_at": datetime.now().isoformat()
         }
         
-        success = cache_client.set(brand_cache_key, brand_data, ttl=300)
+        success = await cache_client.set(brand_cache_key, brand_data, ttl=300)
         assert success is True
         
         # Verify cache contains correct data
-        cached_data = cache_client.get(brand_cache_key)
+        cached_data = await cache_client.get(brand_cache_key)
         assert cached_data["name"] == brand.name
         assert cached_data["id"] == str(brand.id)
         
@@ -775,11 +776,11 @@ class TestCrossComponentIntegration:
         db_session.commit()
         
         # Cache should still have old data (demonstrating cache invalidation need)
-        cached_data_after_update = cache_client.get(brand_cache_key)
+        cached_data_after_update = await cache_client.get(brand_cache_key)
         assert cached_data_after_update["name"] == original_name  # Still old data
         
         # Simulate cache invalidation and refresh
-        cache_client.delete(brand_cache_key)
+        await cache_client.delete(brand_cache_key)
         
         # Get fresh data from database and cache it
         fresh_brand = db_session.query(Brand).filter(Brand.id == brand.id).first()
@@ -790,10 +791,10 @@ class TestCrossComponentIntegration:
             "cached_at": datetime.now().isoformat()
         }
         
-        cache_client.set(brand_cache_key, fresh_data, ttl=300)
+        await cache_client.set(brand_cache_key, fresh_data, ttl=300)
         
         # Verify synchronization
-        final_cached_data = cache_client.get(brand_cache_key)
+        final_cached_data = await cache_client.get(brand_cache_key)
         assert final_cached_data["name"] == "Updated Cache Sync Brand"
 
     def test_tracking_data_pipeline_real(self, redis_client, db_session):
@@ -918,7 +919,7 @@ class TestCrossComponentIntegration:
                 for i in range(3):
                     key = f"cache_test_{brand.id}_{i}"
                     data = {"operation": "cache_test", "index": i}
-                    cache_client.set(key, data, ttl=60)
+                    asyncio.run(cache_client.set(key, data, ttl=60))
                 results.append("cache_success")
             except Exception as e:
                 errors.append(f"cache_error: {e}")
@@ -952,7 +953,7 @@ class TestCrossComponentIntegration:
         
         # Verify cache data
         for i in range(3):
-            cached_data = cache_client.get(f"cache_test_{brand.id}_{i}")
+            cached_data = asyncio.run(cache_client.get(f"cache_test_{brand.id}_{i}"))
             assert cached_data is not None
             assert cached_data["index"] == i
 
@@ -1033,7 +1034,7 @@ class TestErrorHandlingIntegration:
         
         # Cache operation (should work if Redis works)
         try:
-            cache_client.set(f"cache_recovery_{brand.id}", {"test": "data"}, ttl=60)
+            asyncio.run(cache_client.set(f"cache_recovery_{brand.id}", {"test": "data"}, ttl=60))
             operations_status["cache"] = True
         except Exception as e:
             print(f"Cache operation failed: {e}")
@@ -1204,7 +1205,7 @@ class TestPerformanceIntegration:
                 
                 # Cache operation
                 cache_key = f"cache_concurrent_{analysis.id}"
-                cache_client.set(cache_key, {"operation_id": operation_id}, ttl=300)
+                asyncio.run(cache_client.set(cache_key, {"operation_id": operation_id}, ttl=300))
                 
                 local_session.close()
                 
@@ -0,0 +1,1185 @@
+"""
+Server Log Analyzer Tests
+"""
+
+import asyncio
+import gzip
+import importlib
+import io
+import ipaddress
+import os
+import pytest
+import tarfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, Mock
+
+from bot_signatures import BotSignatureMatcher, identify_bot
+from bot_tracker import ClientSideBotTracker
+from bot_visit_loader import COPY_COLUMNS, COPY_SQL, BotVisitLoader, copy_lines
+from bot_visit_sink import BotVisitSink
+from geoip_service import GeoIPService
+from log_follower import LogFollower
+from log_formats import compile_apache_format, compile_nginx_format, detect_log_format, get_log_parser
+from log_sources import LogLineReader, detect_compression
+from redis_pool import execute_pipelined, get_redis
+from log_timestamps import TimestampParser, parse_timestamp
+from partition_manager import PartitionManager
+from visit_columns import BotVisitColumns, VisitSummary
+from visit_retention import SegmentSpill, enforce_memory_budget, key_brand, redis_memory_report
+from log_analyzer import (
+    ServerLogAnalyzer, LogAnalysisAggregate, BotVisit, DEFAULT_LLM_BOT_PATTERNS, REALTIME_PLATFORMS,
+    compute_shard_ranges, analyze_log_shard, align_to_line, classify_content_type
+)
+
+USER_AGENTS = [
+    'Mozilla/5.0 (compatible; GPTBot/1.0; +https://openai.com/gptbot)',
+    'ClaudeBot/1.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0',
+    'PerplexityBot/1.0',
+]
+
+def _mock_redis():
+    """Async Redis client double whose pipelines succeed"""
+    redis_client = Mock()
+    redis_client.pipeline.return_value.execute = AsyncMock(return_value=[])
+    return redis_client
+
+def _write_nginx_log(path, count: int = 2000):
+    lines = [
+        f'10.0.0.{i % 200} - - [10/Oct/2023:{i % 24:02d}:55:36 +0000] '
+        f'"GET /products/item-{i % 17} HTTP/1.1" {200 if i % 9 else 404} {100 + i} "-" '
+        f'"{USER_AGENTS[i % len(USER_AGENTS)]}" 0.{i % 9}'
+        for i in range(count)
+    ]
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+class TestParallelLogAnalysis:
+    """Test sharded log analysis matches the in-process pass"""
+
+    @pytest.mark.parametrize("shards", [1, 3, 8])
+    def test_shard_ranges_are_line_aligned(self, tmp_path, shards):
+        """Test byte ranges cover the file and start on line boundaries"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        data = log_file.read_bytes()
+
+        ranges = compute_shard_ranges(str(log_file), shards)
+
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[start - 1:start] == b'\n'
+
+    def test_merged_shards_match_serial_pass(self, tmp_path):
+        """Test merged shard aggregates equal a single sequential aggregate"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+
+        serial = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        with open(log_file) as f:
+            for line in f:
+                serial.process_line(line)
+
+        merged = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        for start, end in compute_shard_ranges(str(log_file), 4):
+            merged.merge(analyze_log_shard(str(log_file), start, end, "item", "nginx", DEFAULT_LLM_BOT_PATTERNS))
+
+        assert merged.total_visits == serial.total_visits == 2000
+        assert merged.brand_visits == serial.brand_visits
+        assert dict(merged.llm_bot_visits) == dict(serial.llm_bot_visits)
+        assert dict(merged.path_access_frequency) == dict(serial.path_access_frequency)
+        assert dict(merged.hourly_distribution) == dict(serial.hourly_distribution)
+        assert merged.visits.tail(len(merged.visits)) == serial.visits.tail(len(serial.visits))
+
+    def test_folded_segments_give_the_same_results(self, tmp_path):
+        """Test a job-style aggregate that folds each segment's visits reports like an unfolded one"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        full = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        folded = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        for start, end in compute_shard_ranges(str(log_file), 4):
+            segment = analyze_log_shard(str(log_file), start, end, "item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+            full.merge(segment)
+            folded.merge(segment)
+            folded.fold_visits()
+
+        assert len(folded.visits) == 0
+        assert len(folded.visit_detail) == min(len(full.visits), 1000)
+        assert analyzer.build_analysis_results(folded) == analyzer.build_analysis_results(full)
+
+        # Merging a folded aggregate after unfolded rows keeps the detail rows in file order
+        combined = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        ranges = compute_shard_ranges(str(log_file), 2)
+        combined.merge(analyze_log_shard(str(log_file), *ranges[0], "item", "nginx", DEFAULT_LLM_BOT_PATTERNS))
+        later = analyze_log_shard(str(log_file), *ranges[1], "item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        later.fold_visits()
+        combined.merge(later)
+        expected = analyzer.build_analysis_results(full)
+        results = analyzer.build_analysis_results(combined)
+        # Confidence sums depend on shard boundaries in the last float bits
+        assert results.pop('average_confidence_scores') == pytest.approx(expected.pop('average_confidence_scores'))
+        assert results == expected
+
+    @pytest.mark.asyncio
+    async def test_parallel_results_match_serial(self, tmp_path, monkeypatch):
+        """Test analyze_log_file returns the same results with worker processes"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        monkeypatch.setattr('log_analyzer.PARALLEL_MIN_BYTES', 0)
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        serial = await analyzer.analyze_log_file(str(log_file), "item", workers=1)
+        parallel = await analyzer.analyze_log_file(str(log_file), "item", workers=3)
+
+        for key in ('total_requests', 'llm_bot_requests', 'platform_breakdown',
+                    'daily_trends', 'top_accessed_paths', 'crawl_success_rate'):
+            assert parallel[key] == serial[key]
+        assert parallel['average_confidence_scores'] == pytest.approx(serial['average_confidence_scores'])
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("workers", [1, 2])
+    async def test_segmented_ranges_match_whole_file(self, tmp_path, workers):
+        """Test checkpoint-sized segments merge to the whole-file results, sharing one pool"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        size = log_file.stat().st_size
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        whole = await analyzer.analyze_log_file(str(log_file), "item", workers=1)
+
+        merged = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        offset = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while offset < size:
+                end = min(align_to_line(str(log_file), offset + 10000), size)
+                merged.merge(await analyzer.analyze_log_range(
+                    str(log_file), "item", "nginx", offset, end, workers=workers, executor=executor
+                ))
+                offset = end
+        segmented = analyzer.build_analysis_results(merged)
+
+        for key in ('total_requests', 'llm_bot_requests', 'platform_breakdown', 'top_accessed_paths'):
+            assert segmented[key] == whole[key]
+
+class TestCompressedLogSources:
+    """Test gzip and tar-bundled logs stream through the same analysis"""
+
+    def _rotated_bundle(self, tmp_path, log_file):
+        """Split a log into access.log, access.log.1 and access.log.2.gz inside a tar.gz"""
+        lines = log_file.read_bytes().splitlines(keepends=True)
+        members = {
+            'access.log.2.gz': gzip.compress(b''.join(lines[:700])),
+            'access.log.1': b''.join(lines[700:1500]),
+            'access.log': b''.join(lines[1500:]),
+        }
+        bundle = tmp_path / "logs.tar.gz"
+        with tarfile.open(bundle, 'w:gz') as tar:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return bundle
+
+    def test_detect_compression(self, tmp_path):
+        """Test container detection by magic bytes"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        gz_file = tmp_path / "access.log.gz"
+        gz_file.write_bytes(gzip.compress(log_file.read_bytes()))
+
+        assert detect_compression(str(log_file)) is None
+        assert detect_compression(str(gz_file)) == 'gzip'
+        assert detect_compression(str(self._rotated_bundle(tmp_path, log_file))) == 'tar'
+
+    def test_reader_skips_lines_across_members(self, tmp_path):
+        """Test resumed readers drop exactly the consumed lines"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        bundle = self._rotated_bundle(tmp_path, log_file)
+
+        with LogLineReader(str(bundle), batch_lines=256, skip_lines=1000) as reader:
+            lines = []
+            while (item := reader.next_batch()) is not None:
+                lines.extend(item[0])
+
+        assert reader.members == ['access.log.2.gz', 'access.log.1', 'access.log']
+        assert lines == log_file.read_bytes().splitlines()[1000:]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("workers", [1, 2])
+    async def test_compressed_results_match_plain(self, tmp_path, workers):
+        """Test gzip and bundled uploads produce the plain-file results"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        gz_file = tmp_path / "access.log.gz"
+        gz_file.write_bytes(gzip.compress(log_file.read_bytes()))
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        plain = await analyzer.analyze_log_file(str(log_file), "item", workers=1)
+        for source in (gz_file, self._rotated_bundle(tmp_path, log_file)):
+            results = await analyzer.analyze_log_file(str(source), "item", workers=workers)
+            for key in ('total_requests', 'llm_bot_requests', 'platform_breakdown', 'daily_trends', 'top_accessed_paths'):
+                assert results[key] == plain[key]
+
+    @pytest.mark.asyncio
+    async def test_decompressed_line_cap(self, tmp_path):
+        """Test a source expanding past max_lines is refused, counting lines skipped on resume"""
+        gz_file = tmp_path / "access.log.gz"
+        gz_file.write_bytes(gzip.compress(_write_nginx_log(tmp_path / "access.log").read_bytes()))
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        segments = [segment async for segment in analyzer.analyze_log_stream(
+            str(gz_file), "item", "nginx", workers=1, max_lines=2000
+        )]
+        assert [lines for lines, _, _ in segments] == [2000]
+
+        with pytest.raises(ValueError, match="exceeds"):
+            async for _ in analyzer.analyze_log_stream(
+                str(gz_file), "item", "nginx", workers=1, skip_lines=1000, max_lines=1500
+            ):
+                pass
+
+class TestStandaloneLogScan:
+    """Test the mmap scanner in scripts/analyze_logs.py"""
+
+    @pytest.fixture
+    def script(self, monkeypatch):
+        # Imported by name so worker processes can unpickle its functions
+        monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+        return importlib.import_module('analyze_logs')
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_prefiltered_scan_matches_full_parse(self, script, tmp_path, workers):
+        """Test signature prefiltering finds every bot line a full parse does"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+
+        reference = script.new_stats()
+        for line in log_file.read_text().splitlines():
+            reference['total_requests'] += 1
+            script.record_candidate(reference, line, 'nginx', 'item')
+
+        stats = script.analyze_logs(str(log_file), 'nginx', 'item', workers=workers)
+
+        assert stats['total_requests'] == reference['total_requests'] == 2000
+        assert stats['bot_requests'] == reference['bot_requests'] == 1500
+        for key in ('platforms', 'bots', 'status_codes', 'hourly_distribution', 'brand_mentions'):
+            assert stats[key] == reference[key]
+
+    def test_scan_windows_and_unterminated_last_line(self, script, tmp_path, monkeypatch):
+        """Test lines are counted and matched across window boundaries, in any case"""
+        log_file = _write_nginx_log(tmp_path / "access.log")
+        content = log_file.read_bytes().rstrip(b'\n').replace(b'GPTBot', b'gptbot')
+        log_file.write_bytes(content)
+        monkeypatch.setattr(script, 'SCAN_WINDOW_BYTES', 4096)
+
+        stats = script.scan_log_slice(str(log_file), 0, len(content), 'nginx', 'item')
+
+        assert stats['total_requests'] == 2000
+        assert stats['bot_requests'] == 1500
+
+class TestLogFollower:
+    """Test tailing live logs across rotations"""
+
+    def test_tails_new_complete_lines(self, tmp_path):
+        """Test existing content is skipped and partial lines wait for their newline"""
+        log_file = tmp_path / "access.log"
+        log_file.write_bytes(b"old\n")
+        follower = LogFollower(str(log_file))
+
+        with open(log_file, 'ab') as f:
+            f.write(b"one\ntw")
+        assert follower.poll() == [b"one"]
+        with open(log_file, 'ab') as f:
+            f.write(b"o\n")
+        assert follower.poll() == [b"two"]
+        assert follower.poll() == []
+
+    def test_rename_rotation_drains_old_file(self, tmp_path, monkeypatch):
+        """Test lines written to the rotated file are read before the new file"""
+        monkeypatch.setattr('log_follower.ROTATION_GRACE_SECONDS', 0)
+        log_file = tmp_path / "access.log"
+        log_file.write_bytes(b"")
+        follower = LogFollower(str(log_file))
+
+        with open(log_file, 'ab') as f:
+            f.write(b"a\n")
+        assert follower.poll() == [b"a"]
+        with open(log_file, 'ab') as f:
+            f.write(b"b\n")
+        log_file.rename(tmp_path / "access.log.1")
+        log_file.write_bytes(b"c\n")
+
+        assert follower.poll() == [b"b", b"c"]
+        assert follower.poll() == []
+        assert len(follower.positions) == 1
+
+    def test_truncation_and_state_resume(self, tmp_path):
+        """Test copytruncate restarts at zero and committed positions survive restarts"""
+        log_file = tmp_path / "access.log"
+        state_file = tmp_path / "follow.json"
+        log_file.write_bytes(b"")
+        follower = LogFollower(str(log_file), state_path=str(state_file))
+
+        log_file.write_bytes(b"a\nb\n")
+        assert follower.poll() == [b"a", b"b"]
+        log_file.write_bytes(b"c\n")
+        assert follower.poll() == [b"c"]
+        follower.commit()
+        follower.close()
+
+        with open(log_file, 'ab') as f:
+            f.write(b"d\n")
+        with LogFollower(str(log_file), state_path=str(state_file)) as resumed:
+            assert resumed.poll() == [b"d"]
+
+    @pytest.mark.asyncio
+    async def test_follow_pushes_micro_batches(self, tmp_path):
+        """Test followed bot visits are flushed through the sink per batch"""
+        log_file = _write_nginx_log(tmp_path / "access.log", count=40)
+        redis_client = _mock_redis()
+        analyzer = ServerLogAnalyzer(redis_client)
+        stop = asyncio.Event()
+
+        batches = []
+        async for batch in analyzer.follow_log(str(log_file), "item", poll_interval=0.01,
+                                               from_start=True, stop_event=stop):
+            batches.append(batch)
+            stop.set()
+
+        assert sum(batch.total_visits for batch in batches) == 40
+        assert len(batches[0].visits) == 30
+        assert redis_client.pipeline.return_value.execute.called
+
+class TestLogFormats:
+    """Test compiled and built-in log format parsers and detection"""
+
+    ALB_LINE = (
+        'https 2023-10-10T13:55:36.123456Z app/my-lb/50dc6c495c0c9188 203.0.113.7:46532 10.0.0.1:80 '
+        '0.000 0.052 0.000 200 200 34 366 "GET https://example.com:443/products/item-1?x=1 HTTP/1.1" '
+        '"ClaudeBot/1.0" ECDHE-RSA-AES128-GCM-SHA256 TLSv1.2 - "Root=1-58337262" "-" "-" 0 '
+        '2023-10-10T13:55:36.071000Z "forward" "-" "-" "10.0.0.1:80" "200" "-" "-"'
+    )
+    CLOUDFRONT_LINE = '\t'.join([
+        '2023-10-10', '13:55:36', 'SEA19-C1', '4128', '203.0.113.7', 'GET', 'd111.cloudfront.net',
+        '/products/item-1', '200', '-', 'Mozilla/5.0%20(compatible;%20GPTBot/1.0)', '-', '-', 'Hit',
+        'abc==', 'example.com', 'https', '421', '0.003'
+    ])
+    JSONL_LINE = (
+        '{"remote_addr": "203.0.113.7", "time_iso8601": "2023-10-10T15:55:36+02:00", '
+        '"request": "GET /products/item-1 HTTP/1.1", "status": 200, "body_bytes_sent": 512, '
+        '"http_user_agent": "PerplexityBot/1.0", "request_time": "0.120"}'
+    )
+
+    def test_custom_nginx_format(self):
+        """Test an nginx log_format directive compiles to a parser for its own lines"""
+        parser = compile_nginx_format(
+            "log_format timed '$remote_addr [$time_local] $host \"$request\" $status '\n"
+            "                 '$body_bytes_sent $request_time \"$http_user_agent\"';"
+        )
+        record = parser.parse('203.0.113.7 [10/Oct/2023:13:55:36 +0000] example.com "GET /a?b=1 HTTP/2.0" 301 0 0.250 "GPTBot/1.0"')
+        assert record == ('203.0.113.7', '10/Oct/2023:13:55:36 +0000', '/a?b=1', 301, 0, None, 'GPTBot/1.0', 0.25)
+        assert parser.parse('garbage') is None
+
+    def test_custom_apache_format(self):
+        """Test an Apache LogFormat with %D reports seconds"""
+        parser = compile_apache_format('%h %l %u %t "%r" %>s %b "%{User-Agent}i" %D')
+        record = parser.parse('203.0.113.7 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 - "ClaudeBot/1.0" 1500')
+        assert record == ('203.0.113.7', '10/Oct/2023:13:55:36 +0000', '/', 200, 0, None, 'ClaudeBot/1.0', 0.0015)
+
+    @pytest.mark.parametrize("log_format,line_attr,expected", [
+        ('aws-alb', 'ALB_LINE', ('203.0.113.7', '/products/item-1?x=1', 200, 'ClaudeBot/1.0')),
+        ('cloudfront', 'CLOUDFRONT_LINE', ('203.0.113.7', '/products/item-1', 200, 'Mozilla/5.0 (compatible; GPTBot/1.0)')),
+        ('jsonl', 'JSONL_LINE', ('203.0.113.7', '/products/item-1', 200, 'PerplexityBot/1.0')),
+    ])
+    def test_builtin_formats(self, log_format, line_attr, expected):
+        """Test the managed-service formats parse to the common record"""
+        parsed = get_log_parser(log_format).parse_dict(getattr(self, line_attr))
+        assert (parsed['ip'], parsed['path'], parsed['status'], parsed['user_agent']) == expected
+
+    def test_timestamps_normalize_across_formats(self):
+        """Test each format's timestamps land on the same UTC instant"""
+        for log_format, line in (('aws-alb', self.ALB_LINE), ('cloudfront', self.CLOUDFRONT_LINE),
+                                 ('jsonl', self.JSONL_LINE)):
+            parser = get_log_parser(log_format)
+            timestamp = parse_timestamp(parser.parse_dict(line)['timestamp'], parser.timestamp_format)
+            assert timestamp.replace(microsecond=0) == datetime(2023, 10, 10, 13, 55, 36)
+
+    def test_detection(self, tmp_path):
+        """Test formats are detected from a sample of lines"""
+        assert detect_log_format([self.ALB_LINE] * 3) == 'aws-alb'
+        assert detect_log_format([self.CLOUDFRONT_LINE, '#Version: 1.0']) == 'cloudfront'
+        assert detect_log_format([self.JSONL_LINE]) == 'jsonl'
+        assert detect_log_format(['not a log line']) is None
+        assert detect_log_format(_write_nginx_log(tmp_path / "access.log", 10).read_text().splitlines()) == 'nginx'
+
+    def test_unknown_format_is_rejected(self):
+        with pytest.raises(ValueError):
+            get_log_parser('iis')
+
+    @pytest.mark.asyncio
+    async def test_auto_format_matches_explicit(self, tmp_path):
+        """Test analyze_log_file with 'auto' matches the explicit format"""
+        log_file = _write_nginx_log(tmp_path / "access.log", 500)
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        explicit = await analyzer.analyze_log_file(str(log_file), "item", "nginx", workers=1)
+        detected = await analyzer.analyze_log_file(str(log_file), "item", "auto", workers=1)
+        assert detected['total_requests'] == explicit['total_requests'] == 500
+        assert detected['platform_breakdown'] == explicit['platform_breakdown']
+
+class TestBotSignatureMatcher:
+    """Test single-pass bot signature matching"""
+
+    @pytest.fixture
+    def matcher(self):
+        return BotSignatureMatcher(DEFAULT_LLM_BOT_PATTERNS)
+
+    def test_highest_priority_bot_wins(self, matcher):
+        """Test a user agent naming several bots resolves to the first in pattern order"""
+        bot_pattern, confidence = matcher.match('PerplexityBot/1.0 GPTBot/1.1')
+
+        assert bot_pattern.name == 'GPTBot'
+        assert confidence == 0.8
+
+    def test_exact_signature_gets_full_confidence(self, matcher):
+        """Test a user agent that is exactly a signature scores 1.0, case-insensitively"""
+        bot_pattern, confidence = matcher.match('claudebot')
+
+        assert bot_pattern.platform == 'anthropic'
+        assert confidence == 1.0
+
+    def test_generic_fallback(self, matcher):
+        """Test generic crawler words match at low confidence, except Googlebot"""
+        bot_pattern, confidence = matcher.match('SomeSpider/2.0')
+
+        assert bot_pattern.name == 'Unknown-AI-Bot'
+        assert confidence == 0.5
+        assert matcher.match('SomeSpider/2.0', allow_generic=False) is None
+        assert matcher.match('Mozilla/5.0 (compatible; Googlebot/2.1)') is None
+        assert matcher.match('Mozilla/5.0 (Windows NT 10.0) Firefox/120.0') is None
+
+    @pytest.mark.parametrize("user_agent, name", [
+        ('GPTBot', 'GPTBot'),
+        ('Mozilla/5.0 (compatible; GPTBot/2.0; +https://openai.com/gptbot)', 'GPTBot'),
+        ('CCBot/3.2 (https://commoncrawl.org/faq/)', 'CCBot'),
+        ('Mozilla/5.0 BingChat', 'BingChat'),
+        ('Mozilla/5.0 (compatible; YouBot/2.0)', 'YouBot'),
+    ])
+    def test_unversioned_and_new_versions_match(self, user_agent, name):
+        """Test bare bot tokens and unlisted versions are still recognised without the generic fallback"""
+        for allow_generic in (True, False):
+            bot_pattern, confidence = identify_bot(user_agent, allow_generic=allow_generic)
+            assert bot_pattern.name == name
+            assert confidence >= 0.8
+
+    def test_results_are_memoized(self, matcher):
+        """Test repeated user agents are served from the memo"""
+        for _ in range(5):
+            matcher.match(USER_AGENTS[0])
+
+        info = matcher.cache_info()
+        assert info.misses == 1
+        assert info.hits == 4
+
+class TestBotVisitSink:
+    """Test buffered, pipelined bot visit writes"""
+
+    def _visit(self, path='/products/item-1'):
+        return BotVisit(
+            timestamp=datetime(2023, 10, 10, 13, 55, 36), bot_name='GPTBot', ip_address='10.0.0.1',
+            user_agent='GPTBot/1.0', path=path, status_code=200, response_time=0.1, bytes_sent=100,
+            referer='', country=None, city=None, platform='openai'
+        )
+
+    @pytest.mark.asyncio
+    async def test_increments_collapse_and_ttl_set_once(self):
+        """Test repeated increments become one command and each key expires once"""
+        redis_client = _mock_redis()
+        pipe = redis_client.pipeline.return_value
+        sink = BotVisitSink(redis_client, batch_size=100)
+        bot_pattern = DEFAULT_LLM_BOT_PATTERNS[0]
+
+        for _ in range(50):
+            sink.add_visit(self._visit(), bot_pattern, 'item')
+        await sink.flush()
+
+        redis_client.pipeline.assert_called_once_with(transaction=False)
+        pipe.hincrby.assert_any_call('llm_bot_counter:openai:20231010', 'GPTBot', 50)
+        pipe.incrby.assert_called_once_with('brand_citation:item:openai:20231010', 50)
+        pipe.hincrby.assert_any_call('bot_rollup:daily:item:20231010', 'brand:openai', 50)
+        pipe.hincrby.assert_any_call('bot_rollup:monthly:item:202310', 'crawl_ok:openai', 50)
+        assert pipe.expire.call_count == 6
+        assert pipe.execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_splits_into_batches(self):
+        """Test commands are sent in pipelines of at most batch_size"""
+        redis_client = _mock_redis()
+        sink = BotVisitSink(redis_client, batch_size=3)
+
+        for index in range(10):
+            sink.add_visit(self._visit(f'/page-{index}'), DEFAULT_LLM_BOT_PATTERNS[0], 'brand')
+        commands = await sink.flush()
+
+        # zadd + window cap + counter + 10 paths + 3 daily and 3 monthly rollup fields, then five expiries
+        assert commands == 24
+        assert redis_client.pipeline.return_value.execute.call_count == 8
+        assert await sink.flush() == 0
+
+    @pytest.mark.asyncio
+    async def test_recent_window_capped_and_detail_spilled(self, tmp_path):
+        """Test Redis keeps a capped window per brand while every visit goes to a segment"""
+        redis_client = _mock_redis()
+        pipe = redis_client.pipeline.return_value
+        spill = SegmentSpill(str(tmp_path))
+        sink = BotVisitSink(redis_client, recent_window=100, spill=spill)
+
+        for index in range(250):
+            sink.add_visit(self._visit(f'/page-{index}'), DEFAULT_LLM_BOT_PATTERNS[0], 'Acme')
+        await sink.flush()
+
+        pipe.zremrangebyrank.assert_called_once_with('llm_bot_visit:acme:openai:20231010', 0, -101)
+        spilled = list(spill.read('bot_visits'))
+        assert len(spilled) == 250 and sink.stats['spilled'] == 250
+        assert spilled[-1]['path'] == '/page-249' and spilled[0]['brand'] == 'acme'
+
+    @pytest.mark.asyncio
+    async def test_held_commands_apply_once(self):
+        """Test a sink without auto_flush holds its writes and a replayed batch is skipped"""
+        redis_client = _mock_redis()
+        redis_client.exists = AsyncMock(side_effect=[0, 1])
+        pipe = redis_client.pipeline.return_value
+        sink = BotVisitSink(redis_client, max_pending=10, recent_window=20, auto_flush=False)
+
+        for index in range(100):
+            sink.add_visit(self._visit(f'/page-{index}'), DEFAULT_LLM_BOT_PATTERNS[0], 'item')
+        assert not sink.should_flush
+        # Members beyond twice the window are dropped before they reach Redis
+        assert len(sink._sorted_sets['llm_bot_visit:item:openai:20231010']) <= 40
+        commands = sink.drain_commands()
+
+        assert await sink.apply_once('log_job_applied:upload:0', commands) is True
+        assert await sink.apply_once('log_job_applied:upload:0', commands) is False
+
+        redis_client.pipeline.assert_called_once_with(transaction=True)
+        pipe.set.assert_called_once_with('log_job_applied:upload:0', 1, ex=7 * 24 * 3600)
+        pipe.hincrby.assert_any_call('llm_bot_counter:openai:20231010', 'GPTBot', 100)
+        assert pipe.execute.call_count == 1
+
+class TestVisitRetention:
+    """Test spill segments, the memory budget and the per-brand report"""
+
+    @staticmethod
+    def _scanning_redis(keys, usage, cards=None):
+        redis_client = Mock()
+
+        async def scan_iter(match, count):
+            prefix = match.rstrip('*')
+            for key in keys:
+                if key.startswith(prefix):
+                    yield key.encode()
+        redis_client.scan_iter = scan_iter
+
+        pipe = redis_client.pipeline.return_value
+        replies = {'memory_usage': usage, 'zcard': cards or {}}
+
+        def reply():
+            calls = pipe.method_calls
+            pipe.method_calls = []
+            return [replies.get(name, {}).get(args[0], 1) for name, args, _ in calls if name != 'execute']
+        pipe.execute = AsyncMock(side_effect=reply)
+        return redis_client
+
+    def test_segments_roll_over_and_read_back(self, tmp_path):
+        spill = SegmentSpill(str(tmp_path), segment_bytes=200)
+        for batch in range(5):
+            spill.write('visits', [{'batch': batch, 'n': n, 'pad': 'x' * 50} for n in range(20)])
+
+        assert len(os.listdir(tmp_path / 'visits')) > 1
+        records = list(spill.read('visits'))
+        assert [record['batch'] for record in records] == [batch for batch in range(5) for _ in range(20)]
+        assert spill.stats['records'] == 100
+
+    @pytest.mark.asyncio
+    async def test_segments_pruned_by_age_and_size(self, tmp_path):
+        """Test old segments go first, then the oldest until the rest fit, and usage is reported"""
+        spill = SegmentSpill(str(tmp_path), segment_bytes=200, max_age_days=30, max_bytes=10**6)
+        old_dir = tmp_path / 'visits'
+        old_dir.mkdir()
+        (old_dir / f'20200101-00000{spill.extension}').write_bytes(b'x' * 500)
+        for batch in range(5):
+            spill.write('visits', [{'batch': batch, 'n': n, 'pad': 'x' * 50} for n in range(20)])
+        spill.write('tracking', [{'n': 1}])
+
+        assert len(spill.prune()) == 1
+        usage = spill.disk_usage()
+        assert set(usage) == {'visits', 'tracking'}
+
+        spill.max_bytes = usage['visits'] // 2
+        removed = spill.prune()
+        assert removed and sum(spill.disk_usage().values()) <= spill.max_bytes
+        assert [record['batch'] for record in spill.read('visits')][-1] == 4
+
+        spill.write('visits', [{'batch': 5}])
+        assert [record['batch'] for record in spill.read('visits')][-1] == 5
+
+        report = await redis_memory_report(self._scanning_redis([], {}), spill=spill)
+        assert report['spill_total_bytes'] == sum(spill.disk_usage().values())
+        assert report['spill_limit_bytes'] == spill.max_bytes
+
+    def test_keys_attributed_to_brands(self):
+        assert key_brand('llm_bot_visit:acme:openai:20231010') == 'acme'
+        assert key_brand('bot_rollup:daily:acme:20231010') == 'acme'
+        assert key_brand('brand_citation:acme:openai:20231010') == 'acme'
+        assert key_brand('bot_tracking:openai:20231010') == '_shared'
+
+    @pytest.mark.asyncio
+    async def test_memory_report_per_brand(self):
+        keys = ['llm_bot_visit:acme:openai:20231010', 'bot_rollup:daily:acme:20231010',
+                'llm_bot_visit:globex:openai:20231010', 'bot_tracking:openai:20231010']
+        usage = dict(zip(keys, [1000, 50, 400, 300]))
+        report = await redis_memory_report(self._scanning_redis(keys, usage), spill=None)
+
+        assert report['brands'] == {'acme': 1050, 'globex': 400, '_shared': 300}
+        assert report['recent_window_bytes'] == 1700
+        assert report['total_bytes'] == 1750
+
+    @pytest.mark.asyncio
+    async def test_budget_trims_windows_proportionally(self):
+        keys = ['llm_bot_visit:acme:openai:20231010', 'bot_tracking:openai:20231010']
+        redis_client = self._scanning_redis(keys, dict(zip(keys, [3000, 1000])), dict(zip(keys, [900, 300])))
+
+        assert (await enforce_memory_budget(redis_client, budget=10_000))['trimmed'] == 0
+        result = await enforce_memory_budget(redis_client, budget=1000)
+
+        pipe = redis_client.pipeline.return_value
+        assert result['used_bytes'] == 4000
+        pipe.zremrangebyrank.assert_any_call(keys[0], 0, -(225 + 1))
+        pipe.zremrangebyrank.assert_any_call(keys[1], 0, -(75 + 1))
+
+class TestRedisPool:
+    """Test the shared async Redis layer"""
+
+    @pytest.mark.asyncio
+    async def test_clients_share_one_pool_per_loop(self):
+        first, second = get_redis('redis://pool-test:6379'), get_redis('redis://pool-test:6379')
+        assert first.connection_pool is second.connection_pool
+        assert get_redis('redis://pool-test:6379', decode_responses=True).connection_pool is not first.connection_pool
+
+        other_loop_pool = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: asyncio.run(self._pool_in_new_loop())
+        )
+        assert other_loop_pool is not first.connection_pool
+
+    @staticmethod
+    async def _pool_in_new_loop():
+        return get_redis('redis://pool-test:6379').connection_pool
+
+    @pytest.mark.asyncio
+    async def test_execute_pipelined_batches_and_keeps_order(self):
+        redis_client = Mock()
+        pipe = redis_client.pipeline.return_value
+        pipe.execute = AsyncMock(side_effect=[[1, 2], [3, 4], [5]])
+
+        results = await execute_pipelined(redis_client, [('incr', (f"k{i}",)) for i in range(5)], batch_size=2)
+
+        assert results == [1, 2, 3, 4, 5]
+        assert pipe.execute.await_count == 3
+        redis_client.pipeline.assert_called_with(transaction=False)
+
+    @pytest.mark.asyncio
+    async def test_client_tracker_writes_in_one_round_trip(self):
+        """Test a tracked beacon event is one pipelined round trip instead of ~10 commands"""
+        redis_client = _mock_redis()
+        tracker = ClientSideBotTracker(redis_client)
+
+        result = await tracker.track_bot_visit({
+            'timestamp': '2023-10-10T13:55:36', 'bot_name': 'GPTBot', 'platform': 'openai',
+            'user_agent': 'GPTBot/1.0', 'page_url': 'https://example.com/products/1'
+        })
+
+        assert result['status'] == 'tracked'
+        assert redis_client.pipeline.return_value.execute.await_count == 1
+        assert redis_client.pipeline.return_value.zadd.call_count == 2  # event and session index
+        redis_client.hset.assert_not_called()
+
+class TestRealTimeRollups:
+    """Test real-time metrics are served from pipelined rollup reads"""
+
+    @pytest.mark.asyncio
+    async def test_window_read_in_one_pipeline(self):
+        """Test a 90-day window is one HMGET batch plus one path batch"""
+        redis_client = _mock_redis()
+        pipe = redis_client.pipeline.return_value
+        days = 90
+        window = days + 1
+        fields_per_day = 4 * len(REALTIME_PLATFORMS)
+
+        # openai on every day: 10 visits, 2 brand mentions, 10 crawls, 9 successful
+        day_values = ['10', '2', '10', '9'] + [None] * (fields_per_day - 4)
+        pipe.execute.side_effect = [[day_values] * window, [{}] * (window * 5)]
+
+        analyzer = ServerLogAnalyzer(redis_client)
+        metrics = await analyzer.get_real_time_metrics('Brand', days)
+
+        assert pipe.hmget.call_count == window
+        assert pipe.execute.call_count == 2
+        redis_client.hgetall.assert_not_called()
+        assert metrics['platform_coverage'] == {'openai': 10 * window}
+        assert metrics['real_citation_frequency'] == pytest.approx(20.0)
+        assert metrics['platform_citation_rates']['openai']['brand_mentions'] == 2 * window
+        assert metrics['content_accessibility']['openai'][0]['success_rate'] == pytest.approx(90.0)
+
+class TestLogTimestamps:
+    """Test fixed-offset timestamp parsing"""
+
+    @pytest.mark.parametrize("value,log_format,expected", [
+        ('10/Oct/2023:13:55:36 +0000', 'nginx', datetime(2023, 10, 10, 13, 55, 36)),
+        ('10/Oct/2023:13:55:36 -0700', 'apache', datetime(2023, 10, 10, 20, 55, 36)),
+        ('2023-10-10T13:55:36Z', 'cloudflare', datetime(2023, 10, 10, 13, 55, 36)),
+        ('2023-10-10T13:55:36.250+05:30', 'cloudflare', datetime(2023, 10, 10, 8, 25, 36, 250000)),
+        ('1696946136000000000', 'cloudflare', datetime(2023, 10, 10, 13, 55, 36)),
+    ])
+    def test_offsets_are_converted_to_utc(self, value, log_format, expected):
+        """Test timezone offsets are applied instead of discarded"""
+        assert TimestampParser().parse(value, log_format) == expected
+
+    @pytest.mark.parametrize("value,log_format", [
+        ('not a timestamp', 'nginx'),
+        ('10/Foo/2023:13:55:36 +0000', 'nginx'),
+        ('2023-13-10T13:55:36Z', 'cloudflare'),
+    ])
+    def test_unparseable_timestamps_return_none(self, value, log_format):
+        """Test bad timestamps are reported as None instead of the current time"""
+        assert TimestampParser().parse(value, log_format) is None
+
+    def test_unparseable_lines_are_skipped(self):
+        """Test lines with bad timestamps are counted but not attributed"""
+        aggregate = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+        aggregate.process_line(
+            '10.0.0.1 - - [99/Xyz/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "GPTBot/1.0" 0.1'
+        )
+
+        assert aggregate.total_visits == 1
+        assert aggregate.unparseable_timestamps == 1
+        assert len(aggregate.visits) == 0
+
+    def test_bot_lines_go_straight_into_the_columns(self):
+        """Test a bot hit is appended to the columnar store and reported as a visit"""
+        aggregate = LogAnalysisAggregate("item", "nginx", DEFAULT_LLM_BOT_PATTERNS)
+
+        assert aggregate.process_line(
+            '10.0.0.1 - - [10/Oct/2023:13:55:36 +0000] "GET /item HTTP/1.1" 200 1 "-" "GPTBot/1.0" 0.1'
+        ) is True
+        assert aggregate.process_line(
+            '10.0.0.2 - - [10/Oct/2023:13:55:37 +0000] "GET / HTTP/1.1" 200 1 "-" "Mozilla/5.0" 0.1'
+        ) is False
+
+        assert len(aggregate.visits) == 1
+        row = aggregate.visits.row(0)
+        assert (row['ip_address'], row['path'], row['brand_mentioned']) == ('10.0.0.1', '/item', True)
+        assert row['country'] is None
+
+    @pytest.mark.performance
+    def test_parse_throughput_vs_strptime(self):
+        """Microbenchmark: lines/sec for strptime vs fixed-offset slicing with the per-second memo"""
+        # Five consecutive lines per second, as in a busy access log
+        values = [
+            f'{day:02d}/Oct/2023:{hour:02d}:{minute:02d}:{second:02d} +0000'
+            for day in range(1, 3) for hour in range(24) for minute in range(0, 60, 4) for second in range(60)
+            for _ in range(5)
+        ]
+
+        start = time.perf_counter()
+        for value in values:
+            datetime.strptime(value.split()[0], '%d/%b/%Y:%H:%M:%S')
+        strptime_rate = len(values) / (time.perf_counter() - start)
+
+        parser = TimestampParser()
+        start = time.perf_counter()
+        for value in values:
+            parser.parse(value, 'nginx')
+        fast_rate = len(values) / (time.perf_counter() - start)
+
+        print(f"Timestamp parsing: strptime={strptime_rate:,.0f} lines/s, fast={fast_rate:,.0f} lines/s "
+              f"({fast_rate / strptime_rate:.1f}x)")
+        assert fast_rate > strptime_rate
+
+class TestGeoIPService:
+    """Test memoized GeoIP lookups"""
+
+    def _service(self, prefix_len=16, cache_size=100):
+        service = GeoIPService(cache_size=cache_size)
+
+        def city(ip_address):
+            network = ipaddress.ip_network(f"{ip_address}/{prefix_len}", strict=False)
+            return Mock(country=Mock(), city=Mock(), traits=Mock(network=network))
+
+        service.reader = Mock()
+        service.reader.city.side_effect = city
+        return service
+
+    def test_prefix_memo_covers_the_slash_24(self):
+        """Test one query answers a whole /24 when the record covers it"""
+        service = self._service(prefix_len=16)
+        locations = service.lookup_many(['203.0.113.7', '203.0.113.8', '203.0.113.7', '198.51.100.1'])
+
+        assert len(locations) == 3
+        assert service.reader.city.call_count == 2
+        assert locations['203.0.113.7'] == locations['203.0.113.8']
+
+    def test_finer_records_are_cached_per_ip(self):
+        """Test records narrower than /24 never answer for their neighbours"""
+        service = self._service(prefix_len=28)
+        service.lookup_many(['203.0.113.7', '203.0.113.200'])
+        service.lookup('203.0.113.7')
+
+        assert service.reader.city.call_count == 2
+        assert service.hits == 1
+
+    def test_lru_evicts_oldest(self):
+        service = self._service(prefix_len=32, cache_size=2)
+        for ip_address in ('10.0.0.1', '10.0.1.1', '10.0.2.1', '10.0.0.1'):
+            service.lookup(ip_address)
+        assert service.reader.city.call_count == 4
+
+    def test_concurrent_lookups_share_the_cache(self):
+        """Test executor threads can look up through one small cache without corrupting it"""
+        from concurrent.futures import ThreadPoolExecutor
+        service = self._service(prefix_len=32, cache_size=8)
+        addresses = [f'10.0.{i % 32}.1' for i in range(4000)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(service.lookup_many, [addresses[i::8] for i in range(8)]))
+
+        assert all(len(result) == 4 for result in results)  # each slice holds 4 distinct addresses
+        assert len(service._ips) <= 8
+
+    def test_invalid_addresses_and_disabled_reader(self):
+        service = self._service()
+        assert service.lookup('not-an-ip') == (None, None)
+        assert service.reader.city.call_count == 0
+        assert GeoIPService().lookup('203.0.113.7') == (None, None)
+
+    @pytest.mark.asyncio
+    async def test_visits_are_geolocated_in_one_batch(self, tmp_path):
+        """Test every bot visit gets a location from one lookup per unique IP"""
+        log_file = _write_nginx_log(tmp_path / "access.log", 1000)
+        analyzer = ServerLogAnalyzer(_mock_redis())
+        analyzer.geoip = Mock(enabled=True)
+        analyzer.geoip.lookup_many.side_effect = lambda ips: {ip: ('Testland', ip) for ip in ips}
+
+        results = await analyzer.analyze_log_file(str(log_file), "item", workers=1)
+
+        assert analyzer.geoip.lookup_many.call_count == 1
+        (ips,), _ = analyzer.geoip.lookup_many.call_args
+        assert len(ips) == len(set(ips)) == results['unique_bot_ips']
+        assert all(visit['country'] == 'Testland' and visit['city'] == visit['ip_address']
+                   for visit in results['bot_visits_detail'])
+
+class TestBotVisitColumns:
+    """Test columnar visit storage and group-bys"""
+
+    def _append(self, columns, platform, status, country=None, response_time=0.5, ip='10.0.0.1'):
+        columns.append(
+            timestamp=datetime(2023, 10, 10, 13, 55, 36, 123456), bot_name='Bot', ip_address=ip,
+            user_agent='Bot/1.0', path='/', status_code=status, response_time=response_time,
+            bytes_sent=10, referer=None, country=country, city=None, platform=platform
+        )
+
+    def test_rows_round_trip(self):
+        """Test a row decodes back to the appended values"""
+        columns = BotVisitColumns()
+        self._append(columns, 'openai', 200, country='US')
+
+        row = columns.row(0)
+
+        assert row['timestamp'] == datetime(2023, 10, 10, 13, 55, 36, 123456)
+        assert row['platform'] == 'openai'
+        assert row['country'] == 'US'
+        assert row['referer'] is None
+        assert row['response_time'] == pytest.approx(0.5)
+
+    def test_extend_reencodes_strings(self):
+        """Test merging buffers with different string tables keeps values intact"""
+        first, second = BotVisitColumns(), BotVisitColumns()
+        self._append(first, 'openai', 200)
+        self._append(second, 'anthropic', 404, country='DE')
+        self._append(second, 'openai', 200)
+
+        first.extend(second)
+
+        assert [row['platform'] for row in first.tail(3)] == ['openai', 'anthropic', 'openai']
+        assert first.row(1)['country'] == 'DE'
+        assert first.group_counts('platform', 'status_code') == {'openai': {200: 2}, 'anthropic': {404: 1}}
+
+    def test_statistics_from_columns(self):
+        """Test per-platform statistics are computed from the columns"""
+        columns = BotVisitColumns()
+        self._append(columns, 'openai', 200, country='US', response_time=0.2)
+        self._append(columns, 'openai', 500, country='US', response_time=0.4, ip='10.0.0.2')
+        self._append(columns, 'google', 301, response_time=0)
+        analyzer = ServerLogAnalyzer(_mock_redis())
+
+        summary = VisitSummary.from_columns(columns)
+
+        assert columns.unique_count('ip_address') == len(summary.ip_addresses) == 2
+        assert analyzer._calculate_geographic_distribution(summary) == {'openai': {'US': 2}}
+        assert analyzer._calculate_error_rates(summary)['openai']['error_count'] == 1
+        assert analyzer._calculate_crawl_success_rate(summary)['google']['success_rate'] == 100
+        response_times = analyzer._analyze_response_times(summary)
+        assert set(response_times) == {'openai'}
+        assert response_times['openai']['average'] == pytest.approx(0.3)
+
+class TestBotVisitLoader:
+    """Test bulk loading parsed visits into bot_visits"""
+
+    def _visits(self, count=3, path='/blog/post'):
+        columns = BotVisitColumns()
+        for i in range(count):
+            columns.append(
+                timestamp=datetime(2023, 10, 10, 13, 55, i), bot_name='GPTBot', ip_address='10.0.0.1',
+                user_agent='GPTBot/1.0', path=path, status_code=200, response_time=0.25,
+                bytes_sent=10, referer=None, country=None, city=None, platform='openai',
+                brand_mentioned=i == 0, content_type=classify_content_type(path)
+            )
+        return columns
+
+    def test_copy_lines_escape_and_null(self):
+        """Test COPY text lines escape separators and write missing values as NULL"""
+        columns = self._visits(1, path='/a\tb\\c')
+        columns.append(
+            timestamp=datetime(2023, 10, 10), bot_name='ClaudeBot', ip_address='10.0.0.2', user_agent='ClaudeBot/1.0',
+            path='/', status_code=404, response_time=0, bytes_sent=0, referer=None, country=None,
+            city=None, platform='anthropic'
+        )
+        columns.append(
+            timestamp=datetime(2023, 10, 10), bot_name='ClaudeBot', ip_address='10.0.0.3',
+            user_agent='Claude\x00Bot/1.0', path='/nul\x00', status_code=200, response_time=0, bytes_sent=0,
+            referer=None, country=None, city=None, platform='anthropic'
+        )
+
+        lines = list(copy_lines(columns, 'brand-1', 'upload-1', 4096))
+
+        first = lines[0].rstrip('\n').split('\t')
+        assert len(first) == len(COPY_COLUMNS)
+        assert first[1:4] == ['brand-1', 'upload-1', '4096']
+        assert first[7] == '2023-10-10T13:55:00.000000'
+        assert first[9] == '/a\\tb\\\\c'
+        assert first[12:] == ['t', 'other']  # '/a\tb\\c' matches no category
+        second = lines[1].rstrip('\n').split('\t')
+        assert second[13] == '\\N'
+        assert second[12] == 'f'
+        third = lines[2].rstrip('\n').split('\t')
+        assert '\x00' not in lines[2] and third[6] == 'ClaudeBot/1.0' and third[9] == '/nul'
+
+    def test_copy_streams_in_batches(self):
+        """Test Postgres loads delete the segment's rows then COPY in batch_rows chunks"""
+        cursor = Mock(spec=['copy_expert', 'close'])
+        batches = []
+        cursor.copy_expert.side_effect = lambda sql, data: batches.append(data.getvalue().count('\n'))
+        db = Mock()
+        db.get_bind.return_value.dialect.name = 'postgresql'
+        db.connection.return_value.connection.cursor.return_value = cursor
+        loader = BotVisitLoader(session_factory=lambda: db, batch_rows=2, partitions=Mock())
+
+        assert loader.load_segment(self._visits(5), 'brand-1', 'upload-1', 0) == 5
+
+        assert batches == [2, 2, 1]
+        assert cursor.copy_expert.call_args[0][0] == COPY_SQL
+        db.execute.assert_called_once()
+        db.commit.assert_called_once()
+        assert loader.stats['rows'] == 5
+
+    def test_reloading_a_segment_is_idempotent(self):
+        """Test replaying segments replaces their rows instead of duplicating them"""
+        from sqlalchemy import create_engine, func, select
+        from sqlalchemy.orm import sessionmaker
+        from db_models import BotVisit as BotVisitRow
+
+        table = BotVisitRow.__table__
+        engine = create_engine('sqlite://')
+        table.create(engine)
+        session_factory = sessionmaker(bind=engine)
+        loader = BotVisitLoader(session_factory=session_factory, batch_rows=2)
+        brand_id, upload_id = uuid.uuid4(), uuid.uuid4()
+
+        loader.load_segment(self._visits(3), brand_id, upload_id, 0)
+        loader.load_segment(self._visits(2), brand_id, upload_id, 1000)
+        # Crash after the second load, before its checkpoint: the job resumes at segment 1000
+        loader.load_segment(self._visits(2), brand_id, upload_id, 1000)
+
+        with session_factory() as db:
+            counts = dict(db.execute(
+                select(table.c.upload_segment, func.count()).group_by(table.c.upload_segment)
+            ).all())
+            mentioned = db.scalar(select(func.count()).where(table.c.brand_mentioned.is_(True)))
+        assert counts == {0: 3, 1000: 2}
+        assert mentioned == 2
+
+    def test_classify_content_type(self):
+        """Test paths are bucketed into content categories"""
+        assert classify_content_type('/blog/launch') == 'blog_posts'
+        assert classify_content_type('/products/widget') == 'product_pages'
+        assert classify_content_type('/') == 'home_page'
+        assert classify_content_type('/pricing-plans') == 'other'
+
+class TestPartitionManager:
+    """Test monthly partition creation and retention"""
+
+    def _session(self, existing=()):
+        db = Mock()
+        db.get_bind.return_value.dialect.name = 'postgresql'
+        statements = []
+
+        def execute(statement, params=None):
+            statements.append(str(statement))
+            return [(name,) for name in existing] if params else None
+
+        db.execute.side_effect = execute
+        return db, statements
+
+    def test_ensure_range_creates_missing_months_once(self):
+        """Test partitions are created for every month in range and then cached"""
+        db, statements = self._session(existing=['bot_visits_p202311'])
+        manager = PartitionManager(session_factory=lambda: db)
+
+        created = manager.ensure_range('bot_visits', datetime(2023, 11, 30), datetime(2024, 1, 2))
+        assert created == ['bot_visits_p202312', 'bot_visits_p202401']
+        assert statements[-1] == (
+            "CREATE TABLE IF NOT EXISTS bot_visits_p202401 PARTITION OF bot_visits "
+            "FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')"
+        )
+
+        statements.clear()
+        assert manager.ensure_range('bot_visits', datetime(2023, 12, 5), datetime(2023, 12, 6)) == []
+        assert statements == []
+
+    def test_ensure_range_refuses_spans_beyond_retention(self):
+        """Test one bad timestamp can't create a partition for every month back to year 1"""
+        db, statements = self._session()
+        manager = PartitionManager(session_factory=lambda: db, retention_months={'tracking_events': 6},
+                                   months_ahead=3)
+
+        with pytest.raises(ValueError):
+            manager.ensure_range('tracking_events', datetime(1, 1, 1), datetime(2024, 6, 1))
+        assert statements == []
+        assert len(manager.ensure_range('tracking_events', datetime(2024, 1, 1), datetime(2024, 9, 1))) == 9
+
+    def test_maintain_drops_expired_partitions(self):
+        """Test retention drops whole partitions older than the window"""
+        db, statements = self._session(existing=[
+            'tracking_events_p202401', 'tracking_events_p202405', 'tracking_events_p202406', 'tracking_events_old'
+        ])
+        manager = PartitionManager(session_factory=lambda: db, retention_months={'tracking_events': 2},
+                                   months_ahead=1)
+
+        report = manager.maintain(now=datetime(2024, 6, 15))
+
+        assert report['tracking_events'] == {
+            'created': ['tracking_events_p202407'],
+            'dropped': ['tracking_events_p202401'],
+        }
+        assert "ALTER TABLE tracking_events DETACH PARTITION tracking_events_p202401" in statements
+        assert "DROP TABLE tracking_events_p202401" in statements
+
+    def test_noop_without_postgres(self):
+        """Test SQLite development databases are left alone"""
+        db = Mock()
+        db.get_bind.return_value.dialect.name = 'sqlite'
+        manager = PartitionManager(session_factory=lambda: db)
+
+        assert manager.maintain(now=datetime(2024, 6, 15)) == {
+            table: {'created': [], 'dropped': []} for table in manager.retention_months
+        }
+        db.execute.assert_not_called()
+
+    def test_loader_ensures_partitions_for_its_visits(self):
+        """Test a historical load creates the partitions its timestamps need first"""
+        partitions = Mock()
+        db = Mock()
+        db.get_bind.return_value.dialect.name = 'sqlite'
+        loader = BotVisitLoader(session_factory=lambda: db, partitions=partitions)
+
+        loader.load_segment(TestBotVisitLoader()._visits(3), 'brand-1', 'upload-1', 0)
+
+        partitions.ensure_range.assert_called_once_with(
+            'bot_visits', datetime(2023, 10, 10, 13, 55, 0), datetime(2023, 10, 10, 13, 55, 2)
+        )
+
+def _old_bot_activity(rows):
+    """The Python aggregation get_bot_activity used before it moved to SQL (without its row cap)"""
+    platform_stats, hourly, paths = {}, {}, {}
+    for row in rows:
+        stats = platform_stats.setdefault(row['platform'], {'total': 0, 'mentions': 0, 'paths': set(), 'ok': 0})
+        stats['total'] += 1
+        stats['mentions'] += bool(row['brand_mentioned'])
+        stats['paths'].add(row['path'])
+        stats['ok'] += row['status_code'] < 400
+        hourly[row['timestamp'].hour] = hourly.get(row['timestamp'].hour, 0) + 1
+        path = paths.setdefault(row['path'], {'count': 0, 'mentions': 0})
+        path['count'] += 1
+        path['mentions'] += bool(row['brand_mentioned'])
+    return {
+        'total_bot_visits': len(rows),
+        'platform_breakdown': {
+            platform: {
+                'total_visits': stats['total'], 'brand_mentions': stats['mentions'],
+                'citation_rate': stats['mentions'] / stats['total'] * 100,
+                'unique_paths': len(stats['paths']), 'success_rate': stats['ok'] / stats['total'] * 100
+            }
+            for platform, stats in platform_stats.items()
+        },
+        'hourly_distribution': hourly,
+        'top_paths': [
+            {'path': path, 'visits': data['count'], 'brand_mentions': data['mentions'],
+             'citation_rate': data['mentions'] / data['count'] * 100}
+            for path, data in sorted(paths.items(), key=lambda item: (-item[1]['count'], item[0]))[:20]
+        ],
+    }
+
+class TestBotActivity:
+    """Test the SQL aggregates behind /logs/bot-activity"""
+
+    @pytest.fixture
+    def db(self):
+        from sqlalchemy import create_engine, insert
+        from sqlalchemy.orm import sessionmaker
+        from bot_activity import BOT_VISITS
+
+        engine = create_engine('sqlite://')
+        BOT_VISITS.create(engine)
+        brand_id, other_brand = uuid.uuid4(), uuid.uuid4()
+        now = datetime(2024, 6, 15, 12, 0)
+        rows = []
+        for i in range(2500):  # more than the 1000 rows the old endpoint looked at
+            rows.append({
+                'id': uuid.uuid4(), 'brand_id': brand_id, 'bot_name': 'GPTBot',
+                'platform': ('openai', 'anthropic', 'google')[i % 3],
+                'timestamp': now - timedelta(minutes=37 * i), 'path': f'/page/{i % 45}',
+                'status_code': (200, 200, 404, 301, 500)[i % 5], 'brand_mentioned': i % 4 == 0,
+            })
+        rows.append(dict(rows[0], id=uuid.uuid4(), brand_id=other_brand))
+        session = sessionmaker(bind=engine)()
+        session.execute(insert(BOT_VISITS), rows)
+        session.commit()
+        yield session, brand_id, rows[:-1], now
+        session.close()
+
+    @pytest.mark.parametrize("platform", [None, 'anthropic'])
+    def test_sql_aggregates_match_python_aggregation(self, db, platform):
+        """Test totals and breakdowns equal the old per-row aggregation over every visit in the window"""
+        from bot_activity import bot_activity_summary
+        session, brand_id, rows, now = db
+        since = now - timedelta(days=7)
+        expected = _old_bot_activity([
+            row for row in rows if row['timestamp'] >= since and (platform is None or row['platform'] == platform)
+        ])
+
+        summary = bot_activity_summary(session, str(brand_id), since, platform)
+
+        assert summary['total_bot_visits'] == expected['total_bot_visits'] > 0
+        assert summary['hourly_distribution'] == expected['hourly_distribution']
+        assert summary['top_paths'] == pytest.approx(expected['top_paths'])
+        assert summary['platform_breakdown'].keys() == expected['platform_breakdown'].keys()
+        for name, stats in expected['platform_breakdown'].items():
+            assert summary['platform_breakdown'][name] == pytest.approx(stats)
@@ -9,6 +9,9 @@ import numpy as np
 import time
 
 from optimization_engine import AIOptimizationEngine, OptimizationMetrics, ContentChunk
+from embedding_cache import EmbeddingCache
+import model_registry
+from model_registry import ModelRegistry
 
 class TestOptimizationMetrics:
     """Test the 12-metric system as specified in FRD"""
@@ -216,6 +219,35 @@ class TestAIOptimizationEngine:
         assert isinstance(chunk.semantic_tags, list)
         assert isinstance(chunk.has_structure, bool)
     
+    def test_content_chunking_batches_embeddings(self, mock_engine):
+        """Test all paragraphs are embedded in one encode call into one float32 matrix"""
+        mock_engine.model.encode.side_effect = lambda texts, **kwargs: np.random.rand(len(texts), 384)
+        content = "\n\n".join(
+            f"Paragraph {i} describes TestBrand products and services in detail." for i in range(25)
+        )
+
+        chunks = mock_engine._create_content_chunks(content)
+
+        assert len(chunks) == 25
+        assert mock_engine.model.encode.call_count == 1
+        assert mock_engine.model.encode.call_args.kwargs['batch_size'] == mock_engine.embedding_batch_size
+
+        base = chunks[0].embedding.base
+        assert base is not None and base.flags['C_CONTIGUOUS']
+        assert base.dtype == np.float32
+        assert all(chunk.embedding.base is base for chunk in chunks)
+
+    @pytest.mark.asyncio
+    async def test_content_chunking_async(self, mock_engine):
+        """Test async chunking runs on the embedding pool and matches the sync result"""
+        mock_engine.model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 384))
+        content = "TestBrand builds laptops for creators.\n\nTestBrand also sells phones worldwide."
+
+        chunks = await mock_engine._create_content_chunks_async(content)
+
+        assert len(chunks) == 2
+        assert all(chunk.embedding.shape == (384,) for chunk in chunks)
+
     @pytest.mark.asyncio
     @patch('optimization_engine.anthropic.AsyncAnthropic')
     async def test_llm_testing(self, mock_anthropic, mock_engine):
@@ -418,6 +450,32 @@ class TestMetricCalculations:
             assert 0 <= score <= 1
             assert score > 0.5  # Should be high with good similarity
     
+    def test_similarity_matrix_matches_pairwise(self, mock_engine):
+        """Test the matrix kernel returns the same scores as pairwise cosine similarity"""
+        rng = np.random.default_rng(42)
+        chunk_embeddings = rng.normal(size=(7, 384)).astype(np.float32)
+        query_embeddings = rng.normal(size=(4, 384)).astype(np.float32)
+
+        matrix = mock_engine._cosine_similarity_matrix(chunk_embeddings, query_embeddings)
+
+        assert matrix.shape == (7, 4)
+        for i, chunk_emb in enumerate(chunk_embeddings):
+            for j, query_emb in enumerate(query_embeddings):
+                expected = np.dot(chunk_emb, query_emb) / (np.linalg.norm(chunk_emb) * np.linalg.norm(query_emb))
+                assert matrix[i, j] == pytest.approx(expected, abs=1e-5)
+
+    @pytest.mark.asyncio
+    async def test_answer_coverage_encodes_question_types_once(self, mock_engine):
+        """Test question types are encoded in a single batch and reused"""
+        mock_engine.model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 384))
+        chunks = [ContentChunk(text="test", word_count=10, embedding=np.ones(384))]
+
+        score = await mock_engine._calculate_answer_coverage(chunks, ["What is TestBrand?"])
+        await mock_engine._calculate_answer_coverage(chunks, ["What is TestBrand?"])
+
+        assert score == 1.0  # identical vectors answer every question type
+        assert mock_engine.model.encode.call_count == 1
+
     @pytest.mark.asyncio
     async def test_semantic_density_calculation(self, mock_engine):
         """Test semantic density score calculation (Metric 10) - FIXED async issue"""
@@ -581,4 +639,171 @@ class TestEngineIntegration:
             assert "What is TestBrand?" in journey['awareness']
             assert "Compare TestBrand vs Apple" in journey['consideration']
             assert "Buy TestBrand smartphone" in journey['decision']
-            assert "TestBrand customer support" in journey['retention']
\ No newline at end of file
+            assert "TestBrand customer support" in journey['retention']
+class TestEmbeddingCache:
+    """Test the two-tier embedding cache"""
+    
+    def test_repeated_text_is_encoded_once(self):
+        """Test normalized duplicates hit the memory tier instead of the model"""
+        cache = EmbeddingCache('test-model')
+        encode_fn = Mock(side_effect=lambda texts: np.random.rand(len(texts), 8))
+        
+        first = cache.get_or_encode(["Free shipping on all orders", "Returns within 30 days"], encode_fn)
+        second = cache.get_or_encode(["Free  shipping on all orders\n", "New paragraph"], encode_fn)
+        
+        assert first.dtype == np.float32
+        assert np.array_equal(first[0], second[0])
+        assert encode_fn.call_count == 2
+        assert encode_fn.call_args.args[0] == ["New paragraph"]
+        
+        stats = cache.get_stats()
+        assert stats['memory_hits'] == 1
+        assert stats['misses'] == 3
+    
+    def test_memory_tier_respects_byte_budget(self):
+        """Test least recently used vectors are evicted past the byte budget"""
+        cache = EmbeddingCache('test-model', max_bytes=2 * 8 * 4)
+        encode_fn = lambda texts: np.ones((len(texts), 8))
+        
+        cache.get_or_encode(["a", "b", "c"], encode_fn)
+        
+        stats = cache.get_stats()
+        assert stats['entries'] == 2
+        assert stats['memory_bytes'] <= cache.max_bytes
+    
+    def test_cached_rows_do_not_pin_the_batch(self):
+        """Test memory-tier vectors own their data rather than viewing the encode batch"""
+        cache = EmbeddingCache('test-model')
+        cache.get_or_encode(["a", "b", "c"], lambda texts: np.ones((len(texts), 8), dtype=np.float32))
+        
+        for vector in cache._entries.values():
+            assert vector.base is None
+            assert vector.nbytes == 8 * 4
+    
+    def test_redis_tier_round_trips_float32(self):
+        """Test vectors are written to Redis as float32 bytes and served from it by a fresh cache"""
+        store = {}
+        redis_client = Mock()
+        redis_client.mget.side_effect = lambda keys: [store.get(key) for key in keys]
+        pipe = redis_client.pipeline.return_value
+        pipe.setex.side_effect = lambda key, ttl, value: store.__setitem__(key, value)
+        
+        writer = EmbeddingCache('test-model', redis_url='redis://cache')
+        writer._redis = redis_client
+        vectors = writer.get_or_encode(["Free shipping"], lambda texts: np.arange(8, dtype=np.float64)[None, :])
+        
+        assert len(store) == 1
+        assert len(next(iter(store.values()))) == 8 * 4
+        pipe.execute.assert_called_once()
+        
+        reader = EmbeddingCache('test-model', redis_url='redis://cache')
+        reader._redis = redis_client
+        encode_fn = Mock()
+        cached = reader.get_or_encode(["Free  shipping "], encode_fn)
+        
+        encode_fn.assert_not_called()
+        assert cached.dtype == np.float32
+        assert np.array_equal(cached, vectors)
+        assert reader.get_stats()['redis_hits'] == 1
+    
+    def test_redis_errors_fall_back_to_encoding(self):
+        """Test a failing Redis tier is skipped and the texts are encoded"""
+        redis_client = Mock()
+        redis_client.mget.side_effect = ConnectionError("down")
+        cache = EmbeddingCache('test-model', redis_url='redis://cache')
+        cache._redis = redis_client
+        
+        result = cache.get_or_encode(["a"], lambda texts: np.ones((len(texts), 4)))
+        
+        assert result.shape == (1, 4)
+        assert cache.get_stats()['misses'] == 1
+        assert cache._get_redis() is None
+
+class _StubTensor:
+    def __init__(self, count):
+        self.count = count
+    
+    def numel(self):
+        return self.count
+    
+    def element_size(self):
+        return 4
+
+class _StubModel:
+    """Stands in for a SentenceTransformer: 4000 bytes of weights and a counted encode"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.encode_calls = 0
+    
+    def parameters(self):
+        return [_StubTensor(1000)]
+    
+    def encode(self, texts, show_progress_bar=True):
+        self.encode_calls += 1
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+class TestModelRegistry:
+    """Test the process-wide shared model registry"""
+    
+    def _loader(self, delay=0.0):
+        loads = []
+        
+        def loader(model_name):
+            loads.append(model_name)
+            time.sleep(delay)  # widen the window concurrent first requests race in
+            return _StubModel(model_name)
+        
+        return loader, loads
+    
+    def test_concurrent_gets_load_once_per_loader_and_name(self):
+        """Test racing first requests share one load per (loader, model name)"""
+        from concurrent.futures import ThreadPoolExecutor
+        registry = ModelRegistry()
+        loader, loads = self._loader(delay=0.05)
+        other_loader, other_loads = self._loader()
+        
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            models = list(pool.map(lambda _: registry.get('model-a', loader), range(32)))
+            other = list(pool.map(lambda _: registry.get('model-b', loader), range(8)))
+        
+        assert loads.count('model-a') == 1 and loads.count('model-b') == 1
+        assert all(model is models[0] for model in models)
+        assert all(model is other[0] for model in other)
+        # A different model class under the same name is a separate entry
+        assert registry.get('model-a', other_loader) is not models[0]
+        assert other_loads == ['model-a']
+    
+    def test_warm_up_encodes_and_reports_load_stats(self, monkeypatch):
+        """Test warm-up loads through the default loader, runs one encode and reports load stats"""
+        loader, loads = self._loader()
+        monkeypatch.setattr(model_registry, '_default_loader', lambda: loader)
+        registry = ModelRegistry()
+        
+        stats = registry.warm_up(['model-a'])
+        
+        assert loads == ['model-a']
+        assert registry.get('model-a').encode_calls == 1
+        assert set(stats) == {'model-a'}
+        assert stats['model-a']['memory_bytes'] == 4000
+        assert stats['model-a']['load_time_seconds'] >= 0
+        # Stats are copies, not the registry's own dicts
+        stats['model-a']['memory_bytes'] = 0
+        assert registry.get_load_stats()['model-a']['memory_bytes'] == 4000
+        
+        registry.clear()
+        assert registry.get_load_stats() == {}
+    
+    def test_load_reports_prometheus_gauges(self, monkeypatch):
+        """Test each load sets the load-time and memory gauges for its model"""
+        import monitoring
+        metrics = Mock()
+        monkeypatch.setattr(monitoring, 'get_prometheus_metrics', lambda: metrics)
+        loader, _ = self._loader()
+        
+        ModelRegistry().get('model-a', loader)
+        
+        metrics.model_load_time.labels.assert_called_once_with(model='model-a')
+        assert metrics.model_load_time.labels.return_value.set.call_args.args[0] >= 0
+        metrics.model_memory_bytes.labels.assert_called_once_with(model='model-a')
+        metrics.model_memory_bytes.labels.return_value.set.assert_called_once_with(4000)
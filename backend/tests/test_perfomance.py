@@ -343,20 +343,21 @@ class TestResourceUtilization:
         connection_increase = final_connections - initial_connections
         assert connection_increase <= 2, f"Too many new connections: {connection_increase}"
 
-    def test_cache_performance(self, cache_client):
+    @pytest.mark.asyncio
+    async def test_cache_performance(self, cache_client):
         """Test Redis cache performance"""
         # Test cache write performance
         write_times = []
         for i in range(100):
             start_time = time.time()
-            cache_client.set(f"test_key_{i}", {"data": f"test_value_{i}"})
+            await cache_client.set(f"test_key_{i}", {"data": f"test_value_{i}"})
             write_times.append(time.time() - start_time)
         
         # Test cache read performance
         read_times = []
         for i in range(100):
             start_time = time.time()
-            value = cache_client.get(f"test_key_{i}")
+            value = await cache_client.get(f"test_key_{i}")
             read_times.append(time.time() - start_time)
             assert value is not None
         
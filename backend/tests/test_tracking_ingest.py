@@ -0,0 +1,371 @@
+"""
+Tracking Beacon Ingest Tests
+"""
+
+import gzip
+import json
+import time
+import uuid
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import tracking_route
+from beacon_protocol import BeaconError, BeaconTooLarge, decode_beacon, expand_beacon
+from bot_tracker import ClientSideBotTracker
+from session_index import SESSION_INDEX_KEY, session_index_commands
+from visit_retention import SegmentSpill
+from tracking_ingest import EventRingBuffer, TrackingIngestor, redis_commands, validate_event
+
+def _pageview(index: int = 0, **overrides):
+    event = {
+        'event_type': 'pageview', 'session_id': f'llm_{index % 7}', 'timestamp': '2023-10-10T13:55:36.000Z',
+        'bot_name': 'GPTBot', 'platform': 'openai', 'user_agent': 'GPTBot/1.0',
+        'page_url': f'https://example.com/products/{index}', 'page_title': 'Product',
+        'structured_data': [{'brand': 'Acme', 'name': 'Widget'}], 'page_load_time': 120
+    }
+    event.update(overrides)
+    return event
+
+def _compact_batch(**overrides):
+    batch = {
+        'v': 2, 'sid': 'llm_1', 't0': 1696946136000,
+        'c': {'bn': 'GPTBot', 'p': 'openai', 'ua': 'GPTBot/1.0'},
+        'k': ['https://example.com/a', 'Page A', 'Acme', 'download'],
+        'e': [
+            [0, 0, {'u': 0, 'ti': 1, 'lt': 120, 'br': [2]}],
+            [0, 1500, {'u': 0, 'ti': 1}],
+            [1, 30000, {'top': 30, 'sd': 75}],
+            [3, 31000, {'n': 3, 'ed': {'file': 'spec.pdf'}}],
+            [2, 32000, {'top': 32, 'pv': 2}],
+        ]
+    }
+    batch.update(overrides)
+    return batch
+
+# Shortly after the fixtures' 2023-10-10T13:55:36Z, so their timestamps are kept
+RECEIVED_AT = 1696946400
+
+def _redis_mock():
+    redis_client = Mock()
+    redis_client.pipeline.return_value.execute = AsyncMock(return_value=[])
+    return redis_client
+
+class TestEventRingBuffer:
+    """Test the fixed-size event buffer"""
+
+    def test_fifo_with_wraparound(self):
+        buffer = EventRingBuffer(capacity=4)
+        assert buffer.offer([{'n': 1}, {'n': 2}, {'n': 3}])
+        assert buffer.drain(2) == [{'n': 1}, {'n': 2}]
+        assert buffer.offer([{'n': 4}, {'n': 5}, {'n': 6}])
+        assert buffer.drain(10) == [{'n': 3}, {'n': 4}, {'n': 5}, {'n': 6}]
+        assert len(buffer) == 0
+
+    def test_offer_is_all_or_nothing(self):
+        """Test a batch that doesn't fit is rejected whole"""
+        buffer = EventRingBuffer(capacity=3)
+        assert buffer.offer([{'n': 1}, {'n': 2}])
+        assert not buffer.offer([{'n': 3}, {'n': 4}])
+        assert buffer.drain(10) == [{'n': 1}, {'n': 2}]
+
+class TestEventValidation:
+    """Test beacon payload validation"""
+
+    def test_pageview_is_normalized(self):
+        event = validate_event(_pageview(brand_id=str(uuid.UUID(int=1)), page_title='x' * 900), RECEIVED_AT)
+        assert event['timestamp'].isoformat() == '2023-10-10T13:55:36'
+        assert len(event['page_title']) == 500
+        assert event['brand_id'] == uuid.UUID(int=1)
+        assert event['metadata'] == {'page_load_time': 120, 'brands': ['Acme']}
+
+    @pytest.mark.parametrize("payload", [
+        'not an object',
+        {'event_type': 'pageview', 'bot_name': 'GPTBot'},
+        _pageview(event_type='delete_everything'),
+        _pageview(page_url=None),
+        _pageview(session_id='x' * 500),
+    ])
+    def test_unusable_events_are_rejected(self, payload):
+        assert validate_event(payload) is None
+
+    @pytest.mark.parametrize("timestamp", ['yesterday', '2024-13-01T00:00:00Z', 'abcd-ef-ghT00:00:00Z'])
+    def test_bad_timestamp_falls_back_to_receipt_time(self, timestamp):
+        event = validate_event(_pageview(timestamp=timestamp), received_at=0)
+        assert event['timestamp'].year == 1970
+
+    @pytest.mark.parametrize("timestamp", ['0001-01-01T00:00:00Z', '2023-01-01T00:00:00Z', '2023-10-10T16:00:00Z'])
+    def test_out_of_window_timestamp_falls_back_to_receipt_time(self, timestamp):
+        """Test timestamps before tracking_events retention or ahead of the clock are replaced"""
+        event = validate_event(_pageview(timestamp=timestamp), received_at=RECEIVED_AT)
+        assert event['timestamp'] == datetime.utcfromtimestamp(RECEIVED_AT)
+
+    def test_redis_writes_collapse_per_batch(self):
+        """Test a batch becomes one command per key rather than ~10 per event"""
+        events = [validate_event(_pageview(index), RECEIVED_AT) for index in range(50)]
+        commands = redis_commands(events)
+        methods = [method for method, _ in commands]
+
+        assert methods.count('zadd') == 2  # the day's events and the session index
+        assert ('hincrby', ('hourly_stats:openai:20231010', '13', 50)) in commands
+        assert ('hincrby', ('realtime_bot_counter:openai:20231010', 'GPTBot', 50)) in commands
+        assert methods.count('hset') == 7  # one per session
+        assert len(commands) < 50
+
+class TestBeaconProtocol:
+    """Test the compact batched beacon format"""
+
+    def test_compact_batch_expands_to_plain_events(self):
+        events = expand_beacon(_compact_batch())
+        assert [event['event_type'] for event in events] == [
+            'pageview', 'pageview', 'engagement', 'custom', 'session_end'
+        ]
+        assert events[1]['page_url'] == 'https://example.com/a'
+        assert events[1]['timestamp'] == '2023-10-10T13:55:37.500000Z'
+        assert events[0]['structured_data'] == [{'brand': 'Acme'}]
+        assert events[2]['max_scroll_depth'] == 75 and events[2]['bot_name'] == 'GPTBot'
+        assert events[3]['event_name'] == 'download'
+        assert all(validate_event(event) for event in events)
+
+    def test_gzipped_and_plain_bodies_decode_alike(self):
+        body = json.dumps(_compact_batch()).encode()
+        assert decode_beacon(gzip.compress(body)) == decode_beacon(body)
+        assert decode_beacon(json.dumps(_pageview()).encode()) == [_pageview()]
+
+    @pytest.mark.parametrize("body,error", [
+        (json.dumps(_compact_batch(e=[[0, 0, {'u': 99}]])).encode(), BeaconError),
+        (json.dumps(_compact_batch(e=[[9, 0, {}]])).encode(), BeaconError),
+        (json.dumps(_compact_batch(t0='now')).encode(), BeaconError),
+        (json.dumps(_compact_batch(e=[[3, 0, {}]] * 101)).encode(), BeaconTooLarge),
+        (gzip.compress(b' ' * (3 * 1024 * 1024)), BeaconTooLarge),
+        (b'\x1f\x8bnot gzip', BeaconError),
+    ])
+    def test_bad_batches_are_rejected(self, body, error):
+        with pytest.raises(error):
+            decode_beacon(body)
+
+    @pytest.mark.asyncio
+    async def test_engagement_batch_reads_missing_platforms_once(self):
+        redis_client = _redis_mock()
+        pipe = redis_client.pipeline.return_value
+        pipe.execute.side_effect = [[b'openai', None], []]
+        tracker = ClientSideBotTracker(redis_client)
+
+        results = await tracker.track_engagements([
+            {'session_id': 'a', 'time_on_page': 10}, {'session_id': 'b', 'time_on_page': 5},
+            {'session_id': 'a', 'time_on_page': 20}, {'time_on_page': 1},
+        ])
+
+        assert [result['status'] for result in results] == ['tracked'] * 3 + ['error']
+        assert pipe.hget.call_count == 2 and pipe.execute.await_count == 2
+        assert pipe.hincrby.call_count == 6  # sessions a (twice) had a platform, b didn't
+
+class TestSessionIndex:
+    """Test active and unique session counts come from the index, not a keyspace scan"""
+
+    def test_index_commands_dedupe_and_trim(self):
+        now = 1_696_946_136.0
+        commands = dict(session_index_commands(['a', 'b', 'a'], now))
+        assert commands['zadd'] == (SESSION_INDEX_KEY, {'a': now, 'b': now})
+        assert commands['zremrangebyscore'] == (SESSION_INDEX_KEY, '-inf', f"({now - 86400}")
+        assert commands['pfadd'][1:] == ('a', 'b')
+        assert session_index_commands([]) == []
+
+    def test_ingested_batches_update_the_index(self):
+        events = [validate_event(_pageview(index)) for index in range(20)]
+        commands = redis_commands(events, now=100.0)
+        index_update = next(args for method, args in commands if method == 'zadd' and args[0] == SESSION_INDEX_KEY)
+        assert len(index_update[1]) == 7
+
+    @pytest.mark.asyncio
+    async def test_dashboard_counts_windows_in_the_same_round_trip(self):
+        redis_client = _redis_mock()
+        redis_client.scan_iter = Mock(side_effect=AssertionError("keyspace scan"))
+        pipe = redis_client.pipeline.return_value
+        pipe.execute.side_effect = lambda: (
+            [[]] + [[None] * len(call.args[1]) for call in pipe.hmget.call_args_list] + [{}]
+            + [0, 3, 10, 40, 38, 120]
+        )
+
+        data = await ClientSideBotTracker(redis_client).get_real_time_dashboard_data(['openai'])
+
+        assert pipe.execute.await_count == 1
+        assert data['active_sessions'] == 40
+        assert data['active_session_windows'] == {'5m': 3, '1h': 10, '24h': 40}
+        assert data['unique_sessions'] == {'24h': 38, '7d': 120}
+        assert len(pipe.pfcount.call_args_list[1].args) == 7 * 24
+
+    @pytest.mark.asyncio
+    async def test_tracked_visits_touch_the_index(self):
+        redis_client = _redis_mock()
+        await ClientSideBotTracker(redis_client).track_bot_visits([_pageview(0), _pageview(7), _pageview(1)])
+
+        pipe = redis_client.pipeline.return_value
+        index_call = next(call for call in pipe.zadd.call_args_list if call.args[0] == SESSION_INDEX_KEY)
+        assert set(index_call.args[1]) == {'llm_0', 'llm_1'}
+        assert pipe.pfadd.call_args.args[0].startswith('bot_sessions:unique:')
+        assert pipe.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_dashboard_trend_reads_daily_hashes(self):
+        """Test the 24-hour trend is one HMGET per day touched instead of 24 GETs per platform"""
+        redis_client = _redis_mock()
+        pipe = redis_client.pipeline.return_value
+        platforms = ['openai', 'anthropic', 'google', 'perplexity', 'microsoft']
+        pipe.execute.side_effect = lambda: [
+            reply for platform in platforms for reply in (
+                [[]] + [[b'5'] * len(call.args[1]) for call in pipe.hmget.call_args_list
+                        if call.args[0].startswith(f"hourly_stats:{platform}:")] + [{}]
+            )
+        ] + [0, 0, 0, 0, 0, 0]
+
+        data = await ClientSideBotTracker(redis_client).get_real_time_dashboard_data()
+
+        assert pipe.execute.await_count == 1
+        assert pipe.hmget.call_count <= 2 * len(platforms)
+        assert sum(len(call.args[1]) for call in pipe.hmget.call_args_list) == 24 * len(platforms)
+        pipe.get.assert_not_called()
+        assert all(len(trend) == 24 and all(hour['count'] == 5 for hour in trend)
+                   for trend in data['hourly_trends'].values())
+
+class TestTrackingIngestor:
+    """Test buffering, flushing and backpressure"""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_redis_and_rows(self, tmp_path):
+        session = Mock()
+        session.execute.return_value.scalars.return_value.all.return_value = [uuid.UUID(int=7)]
+        spill = SegmentSpill(str(tmp_path))
+        ingestor = TrackingIngestor(batch_size=100, redis_client=_redis_mock(), session_factory=lambda: session,
+                                    spill=spill)
+        brand_id = str(uuid.UUID(int=7))
+        ingestor.submit([validate_event(_pageview(index, brand_id=brand_id if index % 2 else None))
+                         for index in range(10)])
+
+        assert await ingestor.flush() == 10
+        assert ingestor.redis_client.pipeline.return_value.execute.await_count == 1
+        (_, rows), _ = session.execute.call_args
+        assert len(rows) == 5 and all(row['brand_id'] == uuid.UUID(int=7) for row in rows)
+        session.commit.assert_called_once()
+        assert ingestor.stats['flushed'] == 10 and len(ingestor.buffer) == 0
+        # Events without a brand have no row, so their detail goes to the spill instead
+        assert [event['brand_id'] for event in spill.read('tracking_events')] == [None] * 5
+
+    @pytest.mark.asyncio
+    async def test_unknown_brands_and_failed_inserts_are_spilled(self, tmp_path):
+        """Test a forged brand_id doesn't fail the batch and a failed insert doesn't cost the spill"""
+        session = Mock()
+        session.execute.return_value.scalars.return_value.all.return_value = [uuid.UUID(int=7)]
+        spill = SegmentSpill(str(tmp_path))
+        ingestor = TrackingIngestor(batch_size=100, redis_client=_redis_mock(), session_factory=lambda: session,
+                                    spill=spill)
+        ingestor.submit([validate_event(_pageview(index, brand_id=str(uuid.UUID(int=7 + index % 2))))
+                         for index in range(10)])
+
+        assert await ingestor.flush() == 10
+        (_, rows), _ = session.execute.call_args
+        assert len(rows) == 5 and all(row['brand_id'] == uuid.UUID(int=7) for row in rows)
+        assert ingestor.stats['unknown_brands'] == 5 and ingestor.stats['spilled'] == 5
+
+        def failing_execute(statement, *args):
+            if args:
+                raise ConnectionError("insert failed")
+            return Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=[uuid.UUID(int=7)]))))
+        session.execute.side_effect = failing_execute
+        ingestor.submit([validate_event(_pageview(index, brand_id=str(uuid.UUID(int=7)))) for index in range(4)])
+
+        assert await ingestor.flush() == 4
+        assert ingestor.stats['failed_rows'] == 4 and ingestor.stats['failed'] == 0
+        assert ingestor.stats['flushed'] == 14 and len(list(spill.read('tracking_events'))) == 9
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_counted_not_raised(self):
+        redis_client = _redis_mock()
+        redis_client.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        ingestor = TrackingIngestor(redis_client=redis_client)
+        ingestor.submit([validate_event(_pageview())])
+
+        assert await ingestor.flush() == 1
+        assert ingestor.stats['failed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_the_buffer(self):
+        ingestor = TrackingIngestor(batch_size=3, redis_client=_redis_mock(), session_factory=Mock())
+        ingestor.start()
+        ingestor.submit([validate_event(_pageview(index)) for index in range(10)])
+        await ingestor.stop()
+        assert len(ingestor.buffer) == 0
+        assert ingestor.stats['flushed'] == 10
+
+    @pytest.mark.performance
+    def test_validate_and_buffer_throughput(self):
+        """Microbenchmark: events/sec through validation and the ring buffer"""
+        ingestor = TrackingIngestor(capacity=50_000)
+        payloads = [_pageview(index) for index in range(50_000)]
+
+        start = time.perf_counter()
+        for offset in range(0, len(payloads), 20):
+            ingestor.submit([validate_event(raw) for raw in payloads[offset:offset + 20]])
+        rate = len(payloads) / (time.perf_counter() - start)
+
+        print(f"Ingest validation: {rate:,.0f} events/s")
+        assert rate > 20_000
+
+class TestTrackingRoute:
+    """Test the beacon endpoint"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        ingestor = TrackingIngestor(capacity=5)
+        monkeypatch.setattr(tracking_route, 'tracking_ingestor', ingestor)
+        app = FastAPI()
+        app.include_router(tracking_route.router)
+        return TestClient(app), ingestor
+
+    def test_single_and_batched_beacons(self, client):
+        client, ingestor = client
+        response = client.post("/api/track-bot", content=json.dumps(_pageview()),
+                               headers={"Content-Type": "text/plain"})
+        assert response.status_code == 202 and response.json()['accepted'] == 1
+
+        response = client.post("/api/track-bot", json={"events": [_pageview(1), {"bogus": True}]})
+        assert response.json() == {'accepted': 1, 'invalid': 1}
+        assert len(ingestor.buffer) == 2
+
+    def test_malformed_timestamp_in_batch(self, client):
+        client, ingestor = client
+        batch = [
+            _pageview(0), _pageview(1, timestamp='2024-13-01T00:00:00Z'), _pageview(2, timestamp='abcd-ef-ghT00:00:00Z')
+        ]
+        response = client.post("/api/track-bot", json={"events": batch})
+        assert response.status_code == 202
+        assert response.json() == {'accepted': 3, 'invalid': 0}
+        assert len(ingestor.buffer) == 3
+
+    def test_session_end_beacon(self, client):
+        client, ingestor = client
+        response = client.post("/api/track-bot/engagement", json={'session_id': 'llm_1', 'time_on_page': 42})
+        assert response.status_code == 202
+        assert ingestor.buffer.drain(1)[0]['event_type'] == 'session_end'
+
+    def test_full_buffer_returns_429(self, client):
+        client, _ = client
+        assert client.post("/api/track-bot", json=[_pageview(i) for i in range(5)]).status_code == 202
+        response = client.post("/api/track-bot", json=_pageview())
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+
+    def test_gzipped_compact_batch(self, client):
+        client, ingestor = client
+        body = gzip.compress(json.dumps(_compact_batch(e=_compact_batch()['e'][:3])).encode())
+        response = client.post("/api/track-bot", content=body, headers={"Content-Type": "text/plain"})
+        assert response.json() == {'accepted': 3, 'invalid': 0}
+        assert [event['event_type'] for event in ingestor.buffer.drain(3)] == ['pageview', 'pageview', 'engagement']
+
+    def test_malformed_bodies(self, client):
+        client, _ = client
+        assert client.post("/api/track-bot", content=b"{not json").status_code == 400
+        assert client.post("/api/track-bot", json={"event_type": "pageview"}).status_code == 400
+        assert client.post("/api/track-bot", content=b"x" * (300 * 1024)).status_code == 413
@@ -0,0 +1,471 @@
+"""
+Tracking Ingest
+Buffered ingestion of llm-tracker.js beacon events: requests only validate events and put them
+in a fixed-size ring buffer, and a background flusher drains it to Redis (one pipeline per
+batch, counters collapsed) and Postgres (one multi-row insert per batch). Redis only keeps a
+capped recent window of events; events without a known brand or whose insert failed (no Postgres
+row) are spilled to segment files instead. A full buffer is reported to the caller so the route can answer 429 instead of
+queueing without bound.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import structlog
+from sqlalchemy import insert, select
+
+from beacon_protocol import EVENT_TYPES, MAX_EVENTS_PER_BATCH
+from db_models import Brand, TrackingEvent
+from log_timestamps import parse_iso_timestamp
+from partition_manager import PARTITION_RETENTION_MONTHS, PartitionManager, add_months, month_start, partition_manager
+from redis_pool import execute_pipelined, get_redis
+from session_index import session_index_commands
+from visit_retention import RECENT_WINDOW_SIZE, SegmentSpill, cap_command, enforce_memory_budget, visit_spill
+
+logger = structlog.get_logger()
+
+MAX_EVENTS_PER_REQUEST = MAX_EVENTS_PER_BATCH
+MAX_BODY_BYTES = 256 * 1024
+
+BUFFER_CAPACITY = 100_000
+FLUSH_BATCH_SIZE = 2000
+FLUSH_INTERVAL_SECONDS = 0.5
+BUDGET_CHECK_INTERVAL_SECONDS = 300
+# How long the set of brand ids beacons are checked against is reused
+BRAND_REFRESH_INTERVAL_SECONDS = 60
+SPILL_STREAM = 'tracking_events'
+# How far ahead of the server clock a beacon timestamp may be before it is replaced
+MAX_CLIENT_CLOCK_SKEW = timedelta(hours=1)
+
+# Column limits from tracking_events, applied while validating so buffered events stay small
+FIELD_LIMITS = {
+    'session_id': 100, 'bot_name': 100, 'platform': 50, 'page_url': 1000, 'page_title': 500,
+    'user_agent': 512, 'referrer': 1000, 'event_name': 100,
+}
+MAX_METADATA_BYTES = 2048
+
+def _text(value: Any, limit: int) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = str(value)
+    return value[:limit]
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _client_timestamp(value: Any, received: datetime) -> Optional[datetime]:
+    """
+    Beacon timestamp, or None if missing, unparseable (impossible dates raise in the parser) or
+    outside [start of tracking_events retention, received + MAX_CLIENT_CLOCK_SKEW]. The bound
+    keeps one beacon from creating partitions far in the past or future.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        timestamp = parse_iso_timestamp(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if timestamp is None:
+        return None
+    earliest = add_months(month_start(received), 1 - PARTITION_RETENTION_MONTHS['tracking_events'])
+    if not earliest <= timestamp <= received + MAX_CLIENT_CLOCK_SKEW:
+        return None
+    return timestamp
+
+def validate_event(raw: Any, received_at: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Normalized event from a beacon payload, or None if it is unusable
+    Strings are cut to their column sizes and bulky page metadata is reduced to brand names
+    """
+    if not isinstance(raw, dict):
+        return None
+    event_type = raw.get('event_type') or 'pageview'
+    session_id = raw.get('session_id')
+    if event_type not in EVENT_TYPES or not isinstance(session_id, str) or not session_id:
+        return None
+    if len(session_id) > FIELD_LIMITS['session_id']:
+        return None
+
+    event = {field: _text(raw.get(field), limit) for field, limit in FIELD_LIMITS.items()}
+    if event_type == 'pageview' and not (event['bot_name'] and event['platform'] and event['page_url']):
+        return None
+
+    received = datetime.utcfromtimestamp(time.time() if received_at is None else received_at)
+    event['timestamp'] = _client_timestamp(raw.get('timestamp'), received) or received
+    event['event_type'] = event_type
+    event['time_on_page'] = _int(raw.get('time_on_page'))
+    event['scroll_depth'] = _int(raw.get('max_scroll_depth'))
+
+    brand_id = raw.get('brand_id')
+    try:
+        event['brand_id'] = uuid.UUID(brand_id) if isinstance(brand_id, str) else None
+    except ValueError:
+        event['brand_id'] = None
+
+    metadata = {
+        key: raw[key] for key in ('page_load_time', 'content_length', 'word_count', 'page_views')
+        if isinstance(raw.get(key), (int, float))
+    }
+    brands = _structured_data_brands(raw.get('structured_data'))
+    if brands:
+        metadata['brands'] = brands
+    if event_type == 'custom' and raw.get('event_data') is not None:
+        encoded = json.dumps(raw['event_data'], default=str)
+        if len(encoded) <= MAX_METADATA_BYTES:
+            metadata['event_data'] = raw['event_data']
+    event['metadata'] = metadata or None
+    return event
+
+def _structured_data_brands(structured_data: Any) -> List[str]:
+    """Brand names from JSON-LD blocks (what ClientSideBotTracker extracts), capped"""
+    if not isinstance(structured_data, list):
+        return []
+    brands = []
+    for data in structured_data[:20]:
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if 'brand' in key.lower() and isinstance(value, str):
+                    brands.append(value[:100])
+    return sorted(set(brands))[:10]
+
+class EventRingBuffer:
+    """
+    Fixed-capacity FIFO of events in preallocated slots
+    Writes are all-or-nothing so a batched beacon is never half accepted
+    """
+
+    def __init__(self, capacity: int = BUFFER_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._slots: List[Optional[Dict]] = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self._size
+
+    def offer(self, events: List[Dict]) -> bool:
+        """Append all events, or none of them (returns False) if they don't fit"""
+        if len(events) > self.free:
+            return False
+        tail = (self._head + self._size) % self.capacity
+        for event in events:
+            self._slots[tail] = event
+            tail = tail + 1 if tail + 1 < self.capacity else 0
+        self._size += len(events)
+        return True
+
+    def drain(self, max_items: int) -> List[Dict]:
+        """Remove and return up to max_items of the oldest events"""
+        count = min(max_items, self._size)
+        events = []
+        head = self._head
+        for _ in range(count):
+            events.append(self._slots[head])
+            self._slots[head] = None
+            head = head + 1 if head + 1 < self.capacity else 0
+        self._head = head
+        self._size -= count
+        return events
+
+def redis_commands(events: List[Dict], now: Optional[float] = None) -> List[Tuple[str, tuple]]:
+    """
+    Redis writes for a batch, using ClientSideBotTracker's key layout and session index
+    Counter increments on the same key collapse and each key's TTL is set once
+    """
+    sorted_sets: Dict[str, Dict[str, float]] = defaultdict(dict)
+    hashes: Dict[str, Dict[str, Any]] = {}
+    hash_increments: Dict[Tuple[str, str], int] = defaultdict(int)
+    lists: Dict[str, List[str]] = defaultdict(list)
+    list_caps: Dict[str, int] = {}
+    expiring: Dict[str, int] = {}
+
+    for event in events:
+        timestamp = event['timestamp']
+        day = timestamp.strftime('%Y%m%d')
+        platform = event['platform']
+        event_type = event['event_type']
+
+        if event_type == 'pageview':
+            key = f"bot_tracking:{platform}:{day}"
+            sorted_sets[key][json.dumps({
+                'timestamp': timestamp.isoformat(), 'bot_name': event['bot_name'], 'platform': platform,
+                'user_agent': event['user_agent'], 'page_url': event['page_url'],
+                'page_title': event['page_title'], 'referrer': event['referrer'],
+                'session_id': event['session_id'], 'event_type': event_type
+            })] = timestamp.replace(tzinfo=timezone.utc).timestamp()
+            expiring[key] = 90 * 86400
+
+            session_key = f"bot_session:{event['session_id']}"
+            hashes[session_key] = {
+                'platform': platform, 'bot_name': event['bot_name'],
+                'start_time': timestamp.isoformat(), 'last_seen': timestamp.isoformat(), 'page_count': 1
+            }
+            expiring[session_key] = 86400
+
+            counter_key = f"realtime_bot_counter:{platform}:{day}"
+            hash_increments[(counter_key, event['bot_name'])] += 1
+            expiring[counter_key] = 90 * 86400
+
+            activity_key = f"realtime_activity:{platform}"
+            lists[activity_key].append(json.dumps({
+                'timestamp': timestamp.isoformat(), 'bot_name': event['bot_name'],
+                'page_url': event['page_url'], 'page_title': event['page_title']
+            }))
+            list_caps[activity_key] = 100
+
+            hour_key = f"hourly_stats:{platform}:{day}"
+            hash_increments[(hour_key, timestamp.strftime('%H'))] += 1
+            expiring[hour_key] = 8 * 86400
+
+        elif event_type in ('engagement', 'session_end'):
+            engagement_key = f"bot_engagement:{event['session_id']}"
+            hashes[engagement_key] = {
+                'time_on_page': event['time_on_page'] or 0,
+                'max_scroll_depth': event['scroll_depth'] or 0,
+                'timestamp': timestamp.isoformat()
+            }
+            expiring[engagement_key] = 86400
+            if platform:
+                metrics_key = f"engagement_metrics:{platform}:{day}"
+                hash_increments[(metrics_key, 'total_sessions')] += 1
+                hash_increments[(metrics_key, 'total_time')] += event['time_on_page'] or 0
+                hash_increments[(metrics_key, 'total_scroll')] += event['scroll_depth'] or 0
+                expiring[metrics_key] = 90 * 86400
+
+        else:
+            custom_key = f"bot_custom_events:{platform or 'unknown'}:{day}"
+            lists[custom_key].append(json.dumps({
+                'timestamp': timestamp.isoformat(), 'event_type': event['event_name'] or 'custom',
+                'event_data': (event['metadata'] or {}).get('event_data', {}), 'page_url': event['page_url'] or ''
+            }))
+            list_caps[custom_key] = 1000
+            expiring[custom_key] = 30 * 86400
+
+    commands: List[Tuple[str, tuple]] = []
+    for key, members in sorted_sets.items():
+        commands.append(('zadd', (key, members)))
+        commands.append(cap_command(key, RECENT_WINDOW_SIZE))
+    for key, mapping in hashes.items():
+        commands.append(('hset', (key, None, None, mapping)))
+    for (key, field), amount in hash_increments.items():
+        commands.append(('hincrby', (key, field, amount)))
+    for key, values in lists.items():
+        commands.append(('lpush', (key, *values)))
+        commands.append(('ltrim', (key, 0, list_caps[key] - 1)))
+    for key, ttl in expiring.items():
+        commands.append(('expire', (key, ttl)))
+    commands.extend(session_index_commands(
+        (event['session_id'] for event in events if event['event_type'] != 'custom'), now
+    ))
+    return commands
+
+def tracking_event_rows(events: List[Dict]) -> List[Dict]:
+    """tracking_events rows for the events that name a brand"""
+    return [
+        {
+            'id': uuid.uuid4(), 'brand_id': event['brand_id'], 'event_type': event['event_type'],
+            'session_id': event['session_id'], 'bot_name': event['bot_name'], 'platform': event['platform'],
+            'page_url': event['page_url'], 'page_title': event['page_title'],
+            'time_on_page': event['time_on_page'], 'scroll_depth': event['scroll_depth'],
+            'event_metadata': event['metadata'], 'timestamp': event['timestamp']
+        }
+        for event in events if event['brand_id'] is not None
+    ]
+
+class TrackingIngestor:
+    """Owns the ring buffer and the background task that drains it in batches"""
+
+    def __init__(
+        self,
+        capacity: int = BUFFER_CAPACITY,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        redis_client=None,
+        session_factory: Optional[Callable] = None,
+        spill: Optional[SegmentSpill] = visit_spill,
+        partitions: Optional[PartitionManager] = None
+    ):
+        self.buffer = EventRingBuffer(capacity)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._redis_client = redis_client
+        self._session_factory = session_factory
+        self.partitions = partitions or (PartitionManager(session_factory) if session_factory else partition_manager)
+        self.spill = spill
+        self._next_budget_check = 0.0
+        self._brand_ids: Set[uuid.UUID] = set()
+        self._next_brand_refresh = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            'accepted': 0, 'rejected': 0, 'invalid': 0, 'flushed': 0, 'failed': 0, 'rows': 0, 'failed_rows': 0,
+            'unknown_brands': 0, 'spilled': 0
+        }
+
+    @property
+    def redis_client(self):
+        return self._redis_client or get_redis()
+
+    def submit(self, events: List[Dict]) -> bool:
+        """Buffer validated events; False means the buffer is full and the caller should back off"""
+        if not self.buffer.offer(events):
+            self.stats['rejected'] += len(events)
+            return False
+        self.stats['accepted'] += len(events)
+        if self._wake is not None and len(self.buffer) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def retry_after_seconds(self) -> int:
+        """Rough time for the flusher to make room, for Retry-After"""
+        batches = len(self.buffer) / self.batch_size
+        return max(1, int(batches * self.flush_interval + 0.999))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while len(self.buffer):
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while len(self.buffer):
+                await self.flush()
+                if len(self.buffer) < self.batch_size:
+                    break
+            await self._check_memory_budget()
+
+    async def _check_memory_budget(self):
+        """
+        Every BUDGET_CHECK_INTERVAL_SECONDS, trim the Redis recent windows back under budget and
+        prune the spill segments to their age and size limits
+        """
+        if time.monotonic() < self._next_budget_check:
+            return
+        self._next_budget_check = time.monotonic() + BUDGET_CHECK_INTERVAL_SECONDS
+        try:
+            await enforce_memory_budget(self.redis_client)
+        except Exception as e:
+            logger.error("Redis memory budget check failed", error=str(e))
+        if self.spill is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.spill.prune)
+            except Exception as e:
+                logger.error("Spill pruning failed", error=str(e))
+
+    async def flush(self) -> int:
+        """Write one batch to Redis and Postgres; returns the number of events taken"""
+        events = self.buffer.drain(self.batch_size)
+        if not events:
+            return 0
+        try:
+            await execute_pipelined(self.redis_client, redis_commands(events))
+        except Exception as e:
+            # Beacons are best effort: a failed batch is dropped rather than retried into a full buffer
+            self.stats['failed'] += len(events)
+            logger.error("Tracking event flush failed", events=len(events), error=str(e))
+            return len(events)
+
+        # Each store fails on its own: a failed insert leaves its events to the spill
+        loop = asyncio.get_running_loop()
+        unstored = await loop.run_in_executor(None, self._store_rows, events)
+        if unstored and self.spill is not None:
+            try:
+                await loop.run_in_executor(None, self.spill.write, SPILL_STREAM, unstored)
+                self.stats['spilled'] += len(unstored)
+            except Exception as e:
+                logger.error("Tracking event spill failed", events=len(unstored), error=str(e))
+        self.stats['flushed'] += len(events)
+        return len(events)
+
+    def _store_rows(self, events: List[Dict]) -> List[Dict]:
+        """Insert the events of known brands (blocking); returns the events that got no row"""
+        branded = [event for event in events if event['brand_id'] is not None]
+        if not branded:
+            return events
+        try:
+            known = self._known_brand_ids()
+        except Exception as e:
+            logger.error("Loading brand ids failed", error=str(e))
+            return events
+
+        # brand_id comes from the client; an unknown one would fail the foreign key for the whole batch
+        for event in branded:
+            if event['brand_id'] not in known:
+                event['brand_id'] = None
+                self.stats['unknown_brands'] += 1
+        rows = tracking_event_rows(events)
+        if rows:
+            try:
+                self._insert_rows(rows)
+            except Exception as e:
+                self.stats['failed_rows'] += len(rows)
+                logger.error("Tracking event insert failed", rows=len(rows), error=str(e))
+                return events
+            self.stats['rows'] += len(rows)
+        return [event for event in events if event['brand_id'] is None]
+
+    def _known_brand_ids(self) -> Set[uuid.UUID]:
+        """Ids in brands, reloaded every BRAND_REFRESH_INTERVAL_SECONDS"""
+        if time.monotonic() >= self._next_brand_refresh:
+            db = self._session()
+            try:
+                self._brand_ids = set(db.execute(select(Brand.__table__.c.id)).scalars().all())
+            finally:
+                db.close()
+            self._next_brand_refresh = time.monotonic() + BRAND_REFRESH_INTERVAL_SECONDS
+        return self._brand_ids
+
+    def _session(self):
+        session_factory = self._session_factory
+        if session_factory is None:
+            # Imported on first write so the buffer and validation load without a DB driver
+            from database import SessionLocal
+            session_factory = SessionLocal
+        return session_factory()
+
+    def _insert_rows(self, rows: List[Dict]):
+        # Client clocks can be off by months; make sure every row has a partition to land in
+        timestamps = [row['timestamp'] for row in rows]
+        self.partitions.ensure_range(TrackingEvent.__tablename__, min(timestamps), max(timestamps))
+        db = self._session()
+        try:
+            db.execute(insert(TrackingEvent), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+# Process-wide ingestor used by the tracking route and API startup
+tracking_ingestor = TrackingIngestor()
@@ -9,7 +9,7 @@ from typing import Dict, List, Optional, Tuple
 import logging
 from log_analyzer import ServerLogAnalyzer
 from bot_tracker import ClientSideBotTracker
-import redis
+from redis_pool import get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +20,8 @@ class TrackingManager:
     """
     
     def __init__(self, redis_url: str = "redis://localhost:6379", geoip_path: Optional[str] = None):
-        self.redis_client = redis.from_url(redis_url)
+        # Async client on the process-wide pool, shared with the analyzer and client tracker
+        self.redis_client = get_redis(redis_url)
         self.log_analyzer = ServerLogAnalyzer(self.redis_client, geoip_path)
         self.client_tracker = ClientSideBotTracker(self.redis_client)
         
@@ -0,0 +1,81 @@
+"""
+Tracking Beacon Routes
+Ingest endpoint for llm-tracker.js: accepts single events, plain batches or compact (optionally
+gzipped) v2 batches, validates them and hands them to the buffered ingestor. Responds 429 with
+Retry-After when the buffer is full.
+"""
+
+import time
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse, Response
+import structlog
+
+from beacon_protocol import BeaconError, BeaconTooLarge, decode_beacon
+from tracking_ingest import MAX_BODY_BYTES, MAX_EVENTS_PER_REQUEST, tracking_ingestor, validate_event
+
+logger = structlog.get_logger()
+
+router = APIRouter(prefix="/api/track-bot", tags=["Bot Tracking"])
+
+PAYLOAD_TOO_LARGE = 413  # Starlette renamed the constant between versions
+
+def _error(status_code: int, detail: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"success": False, "error": detail}, headers=headers)
+
+async def _ingest(request: Request, default_event_type: str) -> Response:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        return _error(PAYLOAD_TOO_LARGE, "Payload too large")
+
+    body = await request.body()
+    if len(body) > MAX_BODY_BYTES:
+        return _error(PAYLOAD_TOO_LARGE, "Payload too large")
+
+    # sendBeacon posts text/plain (or a gzipped blob), so the body is parsed whatever its content type
+    try:
+        raw_events = decode_beacon(body, MAX_EVENTS_PER_REQUEST)
+    except BeaconTooLarge as e:
+        return _error(PAYLOAD_TOO_LARGE, str(e))
+    except BeaconError as e:
+        return _error(status.HTTP_400_BAD_REQUEST, str(e))
+
+    received_at = time.time()
+    events = []
+    for raw in raw_events:
+        if isinstance(raw, dict) and not raw.get("event_type"):
+            raw["event_type"] = default_event_type
+        event = validate_event(raw, received_at)
+        if event is not None:
+            events.append(event)
+    invalid = len(raw_events) - len(events)
+    tracking_ingestor.stats['invalid'] += invalid
+
+    if not events:
+        return _error(status.HTTP_400_BAD_REQUEST, "No valid events")
+    if not tracking_ingestor.submit(events):
+        return _error(
+            status.HTTP_429_TOO_MANY_REQUESTS, "Tracking ingest is busy, retry later",
+            headers={"Retry-After": str(tracking_ingestor.retry_after_seconds())}
+        )
+
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"accepted": len(events), "invalid": invalid})
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def track_bot_events(request: Request):
+    """Page views, engagement and custom events from llm-tracker.js (one event, a list, {"events": [...]} or a v2 batch)"""
+    return await _ingest(request, "pageview")
+
+@router.post("/engagement", status_code=status.HTTP_202_ACCEPTED)
+async def track_bot_engagement(request: Request):
+    """Session-end beacons sent on page unload"""
+    return await _ingest(request, "session_end")
+
+@router.get("/stats")
+async def tracking_ingest_stats():
+    """Ingest counters and current buffer depth for this worker"""
+    return {
+        **tracking_ingestor.stats,
+        "buffered": len(tracking_ingestor.buffer),
+        "capacity": tracking_ingestor.buffer.capacity
+    }
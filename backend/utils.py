@@ -14,7 +14,6 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any, Tuple
 import jwt
 from passlib.context import CryptContext
-import redis
 import logging
 from functools import wraps
 from urllib.parse import urlparse
@@ -22,6 +21,9 @@ import requests
 import psutil
 import os
 
+from bot_signatures import identify_bot
+from redis_pool import get_redis
+
 logger = logging.getLogger(__name__)
 
 # Password hashing configuration
@@ -146,7 +148,7 @@ class SecurityRateLimiter:
     """Rate limiting implementation as per FRD Section 11.1"""
     
     def __init__(self, redis_client):
-        self.redis = redis_client
+        self.redis = redis_client  # redis.asyncio client
     
     async def check_rate_limit(
         self, 
@@ -169,7 +171,7 @@ class SecurityRateLimiter:
             pipe.get(window_key)
             pipe.incr(window_key)
             pipe.expire(window_key, window)
-            results = pipe.execute()
+            results = await pipe.execute()
             
             current_count = int(results[0]) if results[0] else 0
             new_count = int(results[1])
@@ -177,9 +179,7 @@ class SecurityRateLimiter:
             # Check if limit exceeded
             if new_count > limit:
                 # Rollback the increment
-                pipe = self.redis.pipeline()
-                pipe.decr(window_key)
-                pipe.execute()
+                await self.redis.decr(window_key)
                 
                 return False, {
                     'limit': limit,
@@ -233,7 +233,7 @@ class SecurityRateLimiter:
             pipe = self.redis.pipeline()
             pipe.incr(key)
             pipe.expire(key, 86400)  # 24 hours
-            pipe.execute()
+            await pipe.execute()
             
             return True
             
@@ -242,39 +242,43 @@ class SecurityRateLimiter:
             return True  # Allow on error
 
 class CacheUtils:
-    """Redis cache utilities with enhanced tracking support"""
+    """Redis cache utilities with enhanced tracking support (async, on the shared pool)"""
     
     def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        self.redis_url = redis_url
         self.default_ttl = 3600  # 1 hour
     
-    def get(self, key: str) -> Optional[Any]:
+    @property
+    def redis_client(self):
+        return get_redis(self.redis_url, decode_responses=True)
+    
+    async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         try:
-            value = self.redis_client.get(key)
+            value = await self.redis_client.get(key)
             if value:
                 return json.loads(value)
         except json.JSONDecodeError:
             logger.error(f"Failed to decode JSON for cache key: {key}")
-            self.redis_client.delete(key)  # Remove corrupted data
+            await self.redis_client.delete(key)  # Remove corrupted data
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
         return None
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """Set value in cache"""
         try:
             ttl = ttl or self.default_ttl
-            self.redis_client.setex(key, ttl, json.dumps(value, default=str))
+            await self.redis_client.setex(key, ttl, json.dumps(value, default=str))
             return True
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
         return False
     
-    def delete(self, key: str) -> bool:
+    async def delete(self, key: str) -> bool:
         """Delete value from cache"""
         try:
-            self.redis_client.delete(key)
+            await self.redis_client.delete(key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
@@ -288,39 +292,47 @@ class CacheUtils:
         key_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
         return f"{prefix}:{key_hash}"
     
-    def increment(self, key: str, amount: int = 1) -> int:
+    async def increment(self, key: str, amount: int = 1) -> int:
         """Increment a counter"""
-        return self.redis_client.incrby(key, amount)
+        return await self.redis_client.incrby(key, amount)
     
-    def get_pattern(self, pattern: str) -> Dict[str, Any]:
+    async def get_pattern(self, pattern: str) -> Dict[str, Any]:
         """Get all keys matching pattern"""
         results = {}
         try:
-            for key in self.redis_client.scan_iter(match=pattern):
-                value = self.get(key)
-                if value:
-                    results[key] = value
+            client = self.redis_client
+            keys = [key async for key in client.scan_iter(match=pattern)]
+            values = await client.mget(keys) if keys else []
+            for key, value in zip(keys, values):
+                try:
+                    decoded = json.loads(value) if value else None
+                except json.JSONDecodeError:
+                    continue
+                if decoded:
+                    results[key] = decoded
         except Exception as e:
             logger.error(f"Pattern scan error for {pattern}: {e}")
         return results
     
-    def set_hash(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+    async def set_hash(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         """Set hash values in cache"""
         try:
             # Convert all values to strings
             string_mapping = {k: json.dumps(v, default=str) for k, v in mapping.items()}
-            self.redis_client.hset(key, mapping=string_mapping)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(key, mapping=string_mapping)
             if ttl:
-                self.redis_client.expire(key, ttl)
+                pipe.expire(key, ttl)
+            await pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Hash set error for key {key}: {e}")
         return False
     
-    def get_hash(self, key: str) -> Dict[str, Any]:
+    async def get_hash(self, key: str) -> Dict[str, Any]:
         """Get hash values from cache"""
         try:
-            hash_data = self.redis_client.hgetall(key)
+            hash_data = await self.redis_client.hgetall(key)
             result = {}
             for k, v in hash_data.items():
                 try:
@@ -651,41 +663,16 @@ class TrackingUtils:
     @staticmethod
     def parse_user_agent(user_agent: str) -> Dict[str, Any]:
         """Parse user agent string for bot detection"""
-        bot_patterns = {
-            'openai': ['GPTBot', 'ChatGPT-User', 'OpenAI', 'OpenAI-GPT'],
-            'anthropic': ['Claude-Web', 'anthropic-ai', 'ClaudeBot'],
-            'google': ['Google-Extended', 'Bard-Google', 'Gemini', 'GoogleOther'],
-            'perplexity': ['PerplexityBot', 'Perplexity-UA'],
-            'microsoft': ['BingChat', 'BingPreview', 'msnbot-UDiscovery'],
-            'you': ['YouBot'],
-            'cohere': ['CohereBot'],
-            'commoncrawl': ['CCBot']
-        }
-        
-        user_agent_lower = user_agent.lower()
-        
-        for platform, patterns in bot_patterns.items():
-            for pattern in patterns:
-                if pattern.lower() in user_agent_lower:
-                    return {
-                        'is_bot': True,
-                        'platform': platform,
-                        'bot_name': pattern,
-                        'confidence': 0.9,
-                        'user_agent': user_agent
-                    }
-        
-        # Check for suspicious patterns
-        suspicious_patterns = ['bot', 'crawler', 'spider', 'scraper', 'ai', 'llm']
-        for pattern in suspicious_patterns:
-            if pattern in user_agent_lower and 'googlebot' not in user_agent_lower:
-                return {
-                    'is_bot': True,
-                    'platform': 'unknown',
-                    'bot_name': 'Unknown-AI-Bot',
-                    'confidence': 0.5,
-                    'user_agent': user_agent
-                }
+        match = identify_bot(user_agent or '')
+        if match:
+            bot_pattern, confidence = match
+            return {
+                'is_bot': True,
+                'platform': bot_pattern.platform,
+                'bot_name': bot_pattern.name,
+                'confidence': confidence,
+                'user_agent': user_agent
+            }
         
         return {
             'is_bot': False,
@@ -0,0 +1,226 @@
+"""
+Columnar Bot Visit Storage
+Stores parsed bot visits as typed arrays with dictionary-encoded strings instead of one
+dataclass per hit, and computes per-platform statistics with vectorized group-bys
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+MISSING = -1
+
+class StringTable:
+    """Interns strings to dense integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def intern_optional(self, value: Optional[str]) -> int:
+        return MISSING if value is None else self.intern(value)
+
+    def lookup(self, code: int) -> Optional[str]:
+        return None if code == MISSING else self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+# Column name -> array typecode; string columns hold codes into a StringTable of the same name
+NUMERIC_COLUMNS = {
+    'timestamp': 'q',       # microseconds since epoch (naive UTC)
+    'status_code': 'h',     # int16
+    'response_time': 'f',   # float32
+    'bytes_sent': 'q',
+    'brand_mentioned': 'b',  # int8 flag
+}
+STRING_COLUMNS = [
+    'bot_name', 'ip_address', 'user_agent', 'path', 'referer', 'country', 'city', 'platform', 'content_type'
+]
+
+class BotVisitColumns:
+    """
+    Append-only columnar buffer of bot visits.
+    Rows come back as dicts keyed by BotVisit field names.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+        self.tables: Dict[str, StringTable] = {name: StringTable() for name in STRING_COLUMNS}
+        for name in STRING_COLUMNS:
+            self.columns[name] = array('i')
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def append(self, timestamp: datetime, bot_name: str, ip_address: str, user_agent: str, path: str,
+               status_code: int, response_time: float, bytes_sent: int, referer: Optional[str],
+               country: Optional[str], city: Optional[str], platform: str,
+               brand_mentioned: bool = False, content_type: Optional[str] = None):
+        """Append one visit (same fields as log_analyzer.BotVisit)"""
+        columns, tables = self.columns, self.tables
+        delta = timestamp - EPOCH
+        columns['timestamp'].append((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+        # Malformed status fields (outside int16) are recorded as 0
+        columns['status_code'].append(status_code if -32768 <= status_code <= 32767 else 0)
+        columns['response_time'].append(response_time)
+        columns['bytes_sent'].append(bytes_sent)
+        columns['brand_mentioned'].append(1 if brand_mentioned else 0)
+        columns['bot_name'].append(tables['bot_name'].intern(bot_name))
+        columns['ip_address'].append(tables['ip_address'].intern(ip_address))
+        columns['user_agent'].append(tables['user_agent'].intern(user_agent))
+        columns['path'].append(tables['path'].intern(path))
+        columns['referer'].append(tables['referer'].intern_optional(referer))
+        columns['country'].append(tables['country'].intern_optional(country))
+        columns['city'].append(tables['city'].intern_optional(city))
+        columns['content_type'].append(tables['content_type'].intern_optional(content_type))
+        columns['platform'].append(tables['platform'].intern(platform))
+
+    def set_locations(self, locations: Dict[str, Tuple[Optional[str], Optional[str]]]):
+        """Fill in geolocation for every row from (country, city) keyed by IP address"""
+        ips = self.tables['ip_address'].values
+        ip_codes = self.array('ip_address')
+        for name, position in (('country', 0), ('city', 1)):
+            table = self.tables[name]
+            mapping = np.array(
+                [table.intern_optional(locations.get(ip, (None, None))[position]) for ip in ips], dtype=np.int32
+            )
+            column = array('i')
+            column.frombytes(mapping[ip_codes].astype(np.int32).tobytes())
+            self.columns[name] = column
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """One visit as a dict of BotVisit fields"""
+        columns, tables = self.columns, self.tables
+        row = {
+            'timestamp': EPOCH + timedelta(microseconds=columns['timestamp'][index]),
+            'status_code': int(columns['status_code'][index]),
+            'response_time': float(columns['response_time'][index]),
+            'bytes_sent': int(columns['bytes_sent'][index]),
+            'brand_mentioned': bool(columns['brand_mentioned'][index]),
+        }
+        for name in STRING_COLUMNS:
+            row[name] = tables[name].lookup(columns[name][index])
+        return row
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """The last `count` visits as rows, oldest first"""
+        return [self.row(index) for index in range(max(0, len(self) - count), len(self))]
+
+    def extend(self, other: 'BotVisitColumns'):
+        """Append another buffer's rows, re-encoding its string codes into this buffer's tables"""
+        for name in NUMERIC_COLUMNS:
+            self.columns[name].extend(other.columns[name])
+        for name in STRING_COLUMNS:
+            table = self.tables[name]
+            # Last slot maps MISSING (-1) to itself
+            mapping = np.array([table.intern(value) for value in other.tables[name].values] + [MISSING], dtype=np.int32)
+            codes = self.array(name, source=other)
+            self.columns[name].frombytes(mapping[codes].astype(np.int32).tobytes())
+
+    def array(self, name: str, source: Optional['BotVisitColumns'] = None) -> np.ndarray:
+        """Zero-copy numpy view of a column"""
+        column = (source or self).columns[name]
+        if len(column) == 0:
+            return np.empty(0, dtype=np.dtype(column.typecode))
+        return np.frombuffer(column, dtype=np.dtype(column.typecode))
+
+    def unique_count(self, name: str) -> int:
+        """Distinct non-missing values in a string column"""
+        codes = self.array(name)
+        return int(np.unique(codes[codes != MISSING]).size)
+
+    def group_counts(self, key: str, value: str, mask: Optional[np.ndarray] = None) -> Dict[str, Dict[Any, int]]:
+        """
+        Count rows per (key string, value) pair, e.g. status codes per platform.
+        String value columns are decoded and missing values dropped.
+        """
+        keys = self.array(key)
+        values = self.array(value)
+        if mask is not None:
+            keys, values = keys[mask], values[mask]
+        if value in self.tables:
+            present = values != MISSING
+            keys, values = keys[present], values[present]
+
+        grouped: Dict[str, Dict[Any, int]] = {}
+        if keys.size == 0:
+            return grouped
+
+        pairs, counts = np.unique(np.stack([keys.astype(np.int64), values.astype(np.int64)]), axis=1, return_counts=True)
+        for key_code, value_code, count in zip(pairs[0].tolist(), pairs[1].tolist(), counts.tolist()):
+            decoded = self.tables[value].lookup(value_code) if value in self.tables else value_code
+            grouped.setdefault(self.tables[key].lookup(key_code), {})[decoded] = count
+        return grouped
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the column arrays (excluding string tables)"""
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+def _add_counts(target: Dict[str, Dict[Any, int]], source: Dict[str, Dict[Any, int]]):
+    for key, counts in source.items():
+        bucket = target.setdefault(key, {})
+        for value, count in counts.items():
+            bucket[value] = bucket.get(value, 0) + count
+
+class VisitSummary:
+    """
+    Mergeable per-platform counters over visits: everything the analysis results need from the
+    rows, so a long job can fold its visit columns away instead of carrying every row
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.ip_addresses: set = set()
+        self.status_codes: Dict[str, Dict[int, int]] = {}
+        self.countries: Dict[str, Dict[str, int]] = {}
+        # platform -> [sum, min, max, count] over visits with a response time
+        self.response_times: Dict[str, List[float]] = {}
+
+    @classmethod
+    def from_columns(cls, visits: BotVisitColumns) -> 'VisitSummary':
+        summary = cls()
+        summary.count = len(visits)
+        if not summary.count:
+            return summary
+        ip_codes = visits.array('ip_address')
+        ip_table = visits.tables['ip_address']
+        summary.ip_addresses = {ip_table.values[code] for code in np.unique(ip_codes[ip_codes != MISSING]).tolist()}
+        summary.status_codes = visits.group_counts('platform', 'status_code')
+        summary.countries = visits.group_counts('platform', 'country')
+
+        response_times = visits.array('response_time')
+        timed = response_times > 0
+        platforms = visits.array('platform')[timed]
+        response_times = response_times[timed].astype(np.float64)
+        for code in np.unique(platforms).tolist():
+            times = response_times[platforms == code]
+            summary.response_times[visits.tables['platform'].lookup(code)] = [
+                float(times.sum()), float(times.min()), float(times.max()), int(times.size)
+            ]
+        return summary
+
+    def merge(self, other: 'VisitSummary'):
+        self.count += other.count
+        self.ip_addresses |= other.ip_addresses
+        _add_counts(self.status_codes, other.status_codes)
+        _add_counts(self.countries, other.countries)
+        for platform, (total, low, high, count) in other.response_times.items():
+            mine = self.response_times.get(platform)
+            if mine is None:
+                self.response_times[platform] = [total, low, high, count]
+            else:
+                mine[0] += total
+                mine[1] = min(mine[1], low)
+                mine[2] = max(mine[2], high)
+                mine[3] += count
@@ -0,0 +1,232 @@
+"""
+Visit Retention
+Tiered storage for raw visit detail. Redis keeps only a capped window of the newest visits per
+sorted set (ZREMRANGEBYRANK after each batch) next to the compact counters and rollups; the full
+detail is spilled in batches to compressed segment files, which are pruned by age and total size.
+A memory budget trims the recent windows further when they outgrow it, and a report attributes
+Redis bytes to brands.
+"""
+
+import gzip
+import json
+import asyncio
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import structlog
+
+from log_sources import open_decompressed
+from redis_pool import execute_pipelined, read_pipelined
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = structlog.get_logger()
+
+# Newest visits kept per recent-window sorted set
+RECENT_WINDOW_SIZE = int(os.getenv('REDIS_RECENT_VISITS', 5000))
+# Bytes the recent windows may use in total before enforce_memory_budget trims them
+REDIS_MEMORY_BUDGET_BYTES = int(os.getenv('REDIS_VISIT_MEMORY_BUDGET', 256 * 1024 * 1024))
+
+VISIT_SPILL_DIR = os.getenv('VISIT_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'backendsight-visit-segments'))
+SPILL_SEGMENT_BYTES = int(os.getenv('VISIT_SPILL_SEGMENT_BYTES', 64 * 1024 * 1024))
+# Segments older than this many days, and the oldest beyond the byte limit, are deleted by prune
+SPILL_MAX_AGE_DAYS = int(os.getenv('VISIT_SPILL_MAX_AGE_DAYS', 30))
+SPILL_MAX_BYTES = int(os.getenv('VISIT_SPILL_MAX_BYTES', 10 * 1024 * 1024 * 1024))
+
+RECENT_WINDOW_PATTERNS = ('llm_bot_visit:*', 'bot_tracking:*')
+
+# Key prefix -> position of the brand in the ':'-separated key; anything else is shared
+BRAND_KEY_PREFIXES = {
+    'llm_bot_visit': 1,
+    'brand_citation': 1,
+    'bot_rollup': 2,
+}
+SHARED = '_shared'
+
+def cap_command(key: str, size: int = RECENT_WINDOW_SIZE) -> Tuple[str, tuple]:
+    """Keep the newest `size` members of a timestamp-scored sorted set"""
+    return ('zremrangebyrank', (key, 0, -(size + 1)))
+
+def key_brand(key: str) -> str:
+    """Brand a Redis key belongs to, or SHARED for platform-wide keys"""
+    parts = key.split(':')
+    position = BRAND_KEY_PREFIXES.get(parts[0])
+    if position is None or len(parts) <= position:
+        return SHARED
+    return parts[position]
+
+class SegmentSpill:
+    """
+    Appends batches of visit records as compressed JSON lines to per-stream segment files,
+    {directory}/{stream}/{YYYYMMDD}-{n:05d}.jsonl.zst (or .gz without zstandard). Each batch is
+    one complete frame/member, so a segment stays readable if the process dies mid-write.
+    `prune` keeps the directory within `max_age_days` and `max_bytes`.
+    """
+
+    def __init__(self, directory: str = VISIT_SPILL_DIR, segment_bytes: int = SPILL_SEGMENT_BYTES,
+                 max_age_days: int = SPILL_MAX_AGE_DAYS, max_bytes: int = SPILL_MAX_BYTES):
+        self.directory = directory
+        self.segment_bytes = max(1, segment_bytes)
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.extension = '.jsonl.zst' if zstandard is not None else '.jsonl.gz'
+        self._lock = threading.Lock()
+        self.stats = {'records': 0, 'bytes': 0, 'segments': 0, 'pruned': 0}
+
+    def write(self, stream: str, records: Iterable[Dict[str, Any]]) -> Optional[str]:
+        """Spill one batch; returns the segment written to (None for an empty batch)"""
+        payload = ''.join(json.dumps(record, default=str) + '\n' for record in records).encode()
+        if not payload:
+            return None
+        frame = self._compress(payload)
+
+        with self._lock:
+            path = self._current_segment(stream, len(frame))
+            with open(path, 'ab') as f:
+                f.write(frame)
+            self.stats['records'] += payload.count(b'\n')
+            self.stats['bytes'] += len(frame)
+        return path
+
+    def read(self, stream: str, day: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Records spilled for a stream, oldest segment first (optionally one YYYYMMDD day)"""
+        stream_dir = os.path.join(self.directory, stream)
+        if not os.path.isdir(stream_dir):
+            return
+        for name in sorted(os.listdir(stream_dir)):
+            if day and not name.startswith(day):
+                continue
+            with open(os.path.join(stream_dir, name), 'rb') as raw:
+                for line in open_decompressed(raw):
+                    if line.strip():
+                        yield json.loads(line)
+
+    def disk_usage(self) -> Dict[str, int]:
+        """Bytes of segment files on disk per stream"""
+        usage: Dict[str, int] = defaultdict(int)
+        for stream, _, size in self._segments():
+            usage[stream] += size
+        return dict(usage)
+
+    def prune(self, now: Optional[datetime] = None) -> List[str]:
+        """Delete segments older than max_age_days, then the oldest until the rest fit in max_bytes"""
+        cutoff = ((now or datetime.utcnow()) - timedelta(days=self.max_age_days)).strftime('%Y%m%d')
+        with self._lock:
+            segments = self._segments()
+            total = sum(size for _, _, size in segments)
+            removed = []
+            for stream, path, size in segments:
+                if os.path.basename(path)[:8] >= cutoff and total <= self.max_bytes:
+                    break
+                os.unlink(path)
+                total -= size
+                removed.append(path)
+            self.stats['pruned'] += len(removed)
+
+        if removed:
+            logger.info("Spill segments pruned", segments=len(removed), remaining_bytes=total)
+        return removed
+
+    def _segments(self) -> List[Tuple[str, str, int]]:
+        """(stream, path, size) of every segment, oldest first across streams"""
+        segments = []
+        if not os.path.isdir(self.directory):
+            return segments
+        for stream in os.listdir(self.directory):
+            stream_dir = os.path.join(self.directory, stream)
+            if os.path.isdir(stream_dir):
+                for name in os.listdir(stream_dir):
+                    path = os.path.join(stream_dir, name)
+                    segments.append((name, stream, path, os.path.getsize(path)))
+        return [(stream, path, size) for _, stream, path, size in sorted(segments)]
+
+    def _compress(self, payload: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compress(payload)
+        return gzip.compress(payload, compresslevel=6)
+
+    def _current_segment(self, stream: str, incoming: int) -> str:
+        stream_dir = os.path.join(self.directory, stream)
+        os.makedirs(stream_dir, exist_ok=True)
+        day = datetime.utcnow().strftime('%Y%m%d')
+        existing = sorted(name for name in os.listdir(stream_dir) if name.startswith(day))
+
+        if existing:
+            path = os.path.join(stream_dir, existing[-1])
+            if os.path.getsize(path) + incoming <= self.segment_bytes:
+                return path
+        self.stats['segments'] += 1
+        # Numbered after the newest rather than by count, since prune may have removed older ones
+        index = int(existing[-1][9:14]) + 1 if existing else 0
+        return os.path.join(stream_dir, f"{day}-{index:05d}{self.extension}")
+
+# Process-wide spill shared by the log analyzer, client tracker and beacon ingest
+visit_spill = SegmentSpill()
+
+async def _scan_keys(client, patterns: Iterable[str]) -> List[str]:
+    keys = []
+    for pattern in patterns:
+        async for key in client.scan_iter(match=pattern, count=1000):
+            keys.append(key.decode() if isinstance(key, bytes) else key)
+    return keys
+
+async def redis_memory_report(client, patterns: Iterable[str] = ('*',),
+                              spill: Optional[SegmentSpill] = visit_spill) -> Dict[str, Any]:
+    """
+    Redis bytes per brand (MEMORY USAGE of every matching key, pipelined), with platform-wide
+    keys under SHARED and the recent visit windows totalled separately, plus the spill segments'
+    bytes on disk. Scans the keyspace, so it is meant for admin reports rather than request paths.
+    """
+    keys = await _scan_keys(client, patterns)
+    usage = await read_pipelined(client, 'memory_usage', keys)
+
+    brands: Dict[str, int] = defaultdict(int)
+    recent_window_bytes = 0
+    for key, size in zip(keys, usage):
+        size = size or 0
+        brands[key_brand(key)] += size
+        if key.startswith(tuple(pattern.rstrip('*') for pattern in RECENT_WINDOW_PATTERNS)):
+            recent_window_bytes += size
+
+    spill_usage = await asyncio.get_running_loop().run_in_executor(None, spill.disk_usage) if spill else {}
+    return {
+        'brands': dict(sorted(brands.items(), key=lambda item: item[1], reverse=True)),
+        'total_bytes': sum(brands.values()),
+        'recent_window_bytes': recent_window_bytes,
+        'budget_bytes': REDIS_MEMORY_BUDGET_BYTES,
+        'keys': len(keys),
+        'spill_bytes': spill_usage,
+        'spill_total_bytes': sum(spill_usage.values()),
+        'spill_limit_bytes': spill.max_bytes if spill is not None else None,
+    }
+
+async def enforce_memory_budget(client, budget: int = REDIS_MEMORY_BUDGET_BYTES) -> Dict[str, int]:
+    """
+    Trim every recent-window sorted set by the same fraction when their combined size is over
+    `budget`, keeping each one's newest members. Older detail is already in the spill segments.
+    """
+    keys = await _scan_keys(client, RECENT_WINDOW_PATTERNS)
+    if not keys:
+        return {'used_bytes': 0, 'trimmed': 0}
+
+    usage = await read_pipelined(client, 'memory_usage', keys)
+    used = sum(size or 0 for size in usage)
+    if used <= budget:
+        return {'used_bytes': used, 'trimmed': 0}
+
+    cards = await read_pipelined(client, 'zcard', keys)
+    keep_ratio = budget / used
+    trimmed = sum(await execute_pipelined(client, [
+        cap_command(key, int((card or 0) * keep_ratio)) for key, card in zip(keys, cards)
+    ]))
+
+    logger.warning("Redis visit windows over budget; trimmed", used_bytes=used, budget_bytes=budget,
+                   trimmed=trimmed, keys=len(keys))
+    return {'used_bytes': used, 'trimmed': trimmed}
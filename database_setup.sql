@@ -197,8 +197,10 @@ CREATE INDEX idx_metrics_analysis ON metrics_history(analysis_id);
 -- =====================================================
 -- BOT VISITS TABLE
 -- =====================================================
+-- Range-partitioned by month on timestamp; partitions are created ahead of time and retired
+-- whole by backend/partition_manager.py
 CREATE TABLE bot_visits (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     brand_id UUID NOT NULL REFERENCES brands(id) ON DELETE CASCADE,
     
     -- Bot information
@@ -207,7 +209,7 @@ CREATE TABLE bot_visits (
     user_agent TEXT,
     
     -- Visit details
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     ip_address VARCHAR(45),
     path VARCHAR(500) NOT NULL,
     status_code INTEGER NOT NULL,
@@ -215,19 +217,27 @@ CREATE TABLE bot_visits (
     
     -- Analysis results
     brand_mentioned BOOLEAN DEFAULT FALSE,
-    content_type VARCHAR(50)
-);
+    content_type VARCHAR(50),
+    
+    -- Bulk-load source (server_log_uploads FK added after that table)
+    upload_id UUID,
+    upload_segment BIGINT,
+    
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
 
 -- Create indexes for bot_visits table
 CREATE INDEX idx_bot_visits_brand_timestamp ON bot_visits(brand_id, timestamp);
 CREATE INDEX idx_bot_visits_bot_platform ON bot_visits(bot_name, platform);
 CREATE INDEX idx_bot_visits_timestamp ON bot_visits(timestamp);
+CREATE INDEX idx_bot_visits_upload_segment ON bot_visits(upload_id, upload_segment);
 
 -- =====================================================
 -- TRACKING EVENTS TABLE
 -- =====================================================
+-- Range-partitioned by month on timestamp, like bot_visits
 CREATE TABLE tracking_events (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     brand_id UUID NOT NULL REFERENCES brands(id) ON DELETE CASCADE,
     
     -- Event details
@@ -249,14 +259,34 @@ CREATE TABLE tracking_events (
     
     -- Event metadata
     event_metadata JSONB,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
 
 -- Create indexes for tracking_events table
 CREATE INDEX idx_tracking_events_brand_timestamp ON tracking_events(brand_id, timestamp);
 CREATE INDEX idx_tracking_events_session ON tracking_events(session_id);
 CREATE INDEX idx_tracking_events_type ON tracking_events(event_type);
 
+-- Partitions for the current month and the next three; the API keeps creating them from there
+DO $$
+DECLARE
+    partitioned TEXT;
+    month DATE;
+BEGIN
+    FOREACH partitioned IN ARRAY ARRAY['bot_visits', 'tracking_events'] LOOP
+        FOR i IN 0..3 LOOP
+            month := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partitioned || '_p' || to_char(month, 'YYYYMM'), partitioned,
+                month, (month + INTERVAL '1 month')::DATE
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
 -- =====================================================
 -- API USAGE TABLE
 -- =====================================================
@@ -434,6 +464,7 @@ CREATE TABLE server_log_uploads (
     filename VARCHAR(255) NOT NULL,
     file_size_bytes INTEGER NOT NULL,
     file_format VARCHAR(50) NOT NULL,
+    format_string TEXT,
     
     -- Processing status
     status VARCHAR(50) DEFAULT 'uploaded',
@@ -441,6 +472,16 @@ CREATE TABLE server_log_uploads (
     processing_completed_at TIMESTAMP,
     error_message TEXT,
     
+    -- Resumable processing
+    file_path VARCHAR(1024),
+    bytes_processed BIGINT DEFAULT 0,
+    lines_processed BIGINT DEFAULT 0,
+    lines_per_second FLOAT,
+    eta_seconds FLOAT,
+    last_checkpoint_at TIMESTAMP,
+    worker_id VARCHAR(255),
+    heartbeat_at TIMESTAMP,
+    
     -- Analysis results
     total_requests INTEGER,
     bot_requests INTEGER,
@@ -455,6 +496,9 @@ CREATE TABLE server_log_uploads (
 CREATE INDEX idx_log_uploads_user_date ON server_log_uploads(user_id, created_at);
 CREATE INDEX idx_log_uploads_status ON server_log_uploads(status);
 
+ALTER TABLE bot_visits ADD CONSTRAINT fk_bot_visits_upload
+    FOREIGN KEY (upload_id) REFERENCES server_log_uploads(id) ON DELETE CASCADE;
+
 -- =====================================================
 -- PLATFORM API KEYS TABLE
 -- =====================================================
@@ -8,73 +8,43 @@ import os
 import sys
 import argparse
 import json
-import gzip
 from datetime import datetime, timedelta
 from collections import defaultdict
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 import csv
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 
-# Bot patterns for detection
-BOT_PATTERNS = {
-    'openai': ['GPTBot', 'ChatGPT-User', 'OpenAI-GPT'],
-    'anthropic': ['Claude-Web', 'anthropic-ai', 'ClaudeBot'],
-    'google': ['Google-Extended', 'Bard-Google', 'Gemini-Google'],
-    'perplexity': ['PerplexityBot'],
-    'microsoft': ['BingChat', 'BingPreview'],
-    'you': ['YouBot'],
-    'cohere': ['CohereBot'],
-    'commoncrawl': ['CCBot']
-}
-
-# Log format patterns
-LOG_PATTERNS = {
-    'nginx': re.compile(
-        r'(?P<ip>\d+\.\d+\.\d+\.\d+) - (?P<user>\S+) \[(?P<timestamp>[^\]]+)\] '
-        r'"(?P<method>\w+) (?P<path>[^ ]+) (?P<protocol>[^"]+)" '
-        r'(?P<status>\d+) (?P<bytes>\d+) "(?P<referer>[^"]*)" '
-        r'"(?P<user_agent>[^"]*)"'
-    ),
-    'apache': re.compile(
-        r'(?P<ip>\S+) \S+ \S+ \[(?P<timestamp>[^\]]+)\] '
-        r'"(?P<method>\w+) (?P<path>[^ ]+) (?P<protocol>[^"]+)" '
-        r'(?P<status>\d+) (?P<bytes>\S+) "(?P<referer>[^"]*)" '
-        r'"(?P<user_agent>[^"]*)"'
-    )
-}
+# Share bot signatures with the backend (stdlib-only module)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from bot_signatures import identify_bot, get_signature_matcher
+from log_timestamps import PARSERS as TIMESTAMP_PARSERS
+from log_formats import get_log_parser, detect_file_format, log_format_names
+from log_sources import LogLineReader, detect_compression
 
 def detect_bot(user_agent: str) -> Tuple[bool, str, str]:
     """Detect if user agent is an AI bot"""
-    user_agent_lower = user_agent.lower()
-    
-    for platform, patterns in BOT_PATTERNS.items():
-        for pattern in patterns:
-            if pattern.lower() in user_agent_lower:
-                return True, platform, pattern
+    match = identify_bot(user_agent, allow_generic=False)
+    if match:
+        bot_pattern, _ = match
+        return True, bot_pattern.platform, bot_pattern.name
     
     return False, None, None
 
 def parse_log_line(line: str, log_format: str) -> Dict:
-    """Parse a single log line"""
-    pattern = LOG_PATTERNS.get(log_format)
-    if not pattern:
+    """Parse a single log line (registered format name or nginx/Apache format string)"""
+    try:
+        return get_log_parser(log_format).parse_dict(line)
+    except ValueError:
         return None
-    
-    match = pattern.match(line.strip())
-    if match:
-        return match.groupdict()
-    
-    return None
 
-def parse_timestamp(timestamp_str: str) -> datetime:
-    """Parse log timestamp"""
-    # Common log timestamp format: 10/Oct/2023:13:55:36 +0000
+def parse_timestamp(timestamp_str: str, log_format: str = 'nginx') -> datetime:
+    """Parse log timestamp (naive UTC; None if unparseable)"""
     try:
-        # Remove timezone for simplicity
-        timestamp_str = timestamp_str.split()[0]
-        return datetime.strptime(timestamp_str, '%d/%b/%Y:%H:%M:%S')
-    except:
-        return datetime.now()
+        return TIMESTAMP_PARSERS[get_log_parser(log_format).timestamp_format](timestamp_str.strip())
+    except (ValueError, IndexError):
+        return None
 
 def analyze_content_type(path: str) -> str:
     """Determine content type from path"""
@@ -99,9 +69,12 @@ def analyze_content_type(path: str) -> str:
     else:
         return 'other'
 
-def analyze_logs(log_file: str, log_format: str, brand_name: str = None) -> Dict:
-    """Analyze log file for bot activity"""
-    stats = {
+SCAN_WINDOW_BYTES = 64 * 1024 * 1024
+NEWLINE = re.compile(b'\n')
+
+def new_stats() -> Dict:
+    """Empty statistics accumulator"""
+    return {
         'total_requests': 0,
         'bot_requests': 0,
         'platforms': defaultdict(int),
@@ -114,58 +87,158 @@ def analyze_logs(log_file: str, log_format: str, brand_name: str = None) -> Dict
         'brand_mentions': 0,
         'errors': 0
     }
+
+def merge_stats(stats: Dict, other: Dict):
+    """Add another accumulator's counts into stats"""
+    for key, value in other.items():
+        if isinstance(value, dict):
+            for item, count in value.items():
+                stats[key][item] += count
+        else:
+            stats[key] += value
+
+def record_candidate(stats: Dict, line: str, log_format: str, brand_name: str = None):
+    """Account for a line that contains a bot signature"""
+    # Parse log line
+    parsed = parse_log_line(line, log_format)
+    if not parsed:
+        stats['errors'] += 1
+        return
     
-    # Open file (handle gzip if needed)
-    if log_file.endswith('.gz'):
-        open_func = gzip.open
-        mode = 'rt'
-    else:
-        open_func = open
-        mode = 'r'
+    # Check if it's a bot
+    user_agent = parsed.get('user_agent', '')
+    is_bot, platform, bot_name = detect_bot(user_agent)
+    if not is_bot:
+        return
     
-    with open_func(log_file, mode) as f:
-        for line_num, line in enumerate(f, 1):
-            stats['total_requests'] += 1
-            
-            # Parse log line
-            parsed = parse_log_line(line, log_format)
-            if not parsed:
-                stats['errors'] += 1
-                continue
-            
-            # Check if it's a bot
-            user_agent = parsed.get('user_agent', '')
-            is_bot, platform, bot_name = detect_bot(user_agent)
-            
-            if is_bot:
-                stats['bot_requests'] += 1
-                stats['platforms'][platform] += 1
-                stats['bots'][bot_name] += 1
-                
-                # Status code
-                status = int(parsed.get('status', 0))
-                stats['status_codes'][status] += 1
-                
-                # Content type
-                path = parsed.get('path', '')
-                content_type = analyze_content_type(path)
-                stats['content_types'][content_type] += 1
-                
-                # Path tracking
-                stats['top_paths'][path] += 1
-                
-                # Time distribution
-                timestamp = parse_timestamp(parsed['timestamp'])
-                stats['hourly_distribution'][timestamp.hour] += 1
-                stats['daily_distribution'][timestamp.date().isoformat()] += 1
-                
-                # Brand mentions
-                if brand_name and brand_name.lower() in path.lower():
-                    stats['brand_mentions'] += 1
+    stats['bot_requests'] += 1
+    stats['platforms'][platform] += 1
+    stats['bots'][bot_name] += 1
+    
+    # Status code
+    status = int(parsed.get('status', 0))
+    stats['status_codes'][status] += 1
+    
+    # Content type
+    path = parsed.get('path', '')
+    content_type = analyze_content_type(path)
+    stats['content_types'][content_type] += 1
+    
+    # Path tracking
+    stats['top_paths'][path] += 1
+    
+    # Time distribution
+    timestamp = parse_timestamp(parsed['timestamp'], log_format)
+    if timestamp:
+        stats['hourly_distribution'][timestamp.hour] += 1
+        stats['daily_distribution'][timestamp.date().isoformat()] += 1
+    
+    # Brand mentions
+    if brand_name and brand_name.lower() in path.lower():
+        stats['brand_mentions'] += 1
+
+def anchor_pattern(anchors: List[bytes]) -> re.Pattern:
+    """Case-insensitive bytes regex matching any of the (lowercase) prefilter anchors"""
+    return re.compile(b'|'.join(re.escape(anchor) for anchor in anchors), re.IGNORECASE)
+
+def candidate_line_spans(mm: mmap.mmap, pattern: re.Pattern, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """(start, end) of every line in mm[start:end] matching `pattern`, found without copying the range"""
+    position = start
+    while position < end:
+        match = pattern.search(mm, position, end)
+        if match is None:
+            return
+        newline = mm.rfind(b'\n', start, match.start())
+        line_start = start if newline == -1 else newline + 1
+        line_end = mm.find(b'\n', match.end(), end)
+        line_end = end if line_end == -1 else line_end
+        yield line_start, line_end
+        # One hit per line is enough
+        position = line_end + 1
+
+def scan_log_slice(log_file: str, start: int, end: int, log_format: str, brand_name: str = None) -> Dict:
+    """
+    Scan [start, end) of a plain log through mmap without decoding it; only lines containing a
+    bot signature (case-insensitive bytes search) are decoded and regex-parsed. Runs in a worker process.
+    """
+    stats = new_stats()
+    pattern = anchor_pattern(get_signature_matcher().prefilter_anchors)
+    
+    with open(log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = start
+        while position < end:
+            # Windows end on a line boundary so no line is split between them
+            window_end = min(position + SCAN_WINDOW_BYTES, end)
+            if window_end < end:
+                newline = mm.find(b'\n', window_end, end)
+                window_end = end if newline == -1 else newline + 1
             
-            # Progress indicator
-            if line_num % 10000 == 0:
-                print(f"Processed {line_num:,} lines...", end='\r')
+            # Searched in place: only the matching lines are copied out of the map
+            stats['total_requests'] += len(NEWLINE.findall(mm, position, window_end))
+            if mm[window_end - 1] != ord('\n'):
+                stats['total_requests'] += 1
+            for line_start, line_end in candidate_line_spans(mm, pattern, position, window_end):
+                line = mm[line_start:line_end].decode('utf-8', errors='replace')
+                record_candidate(stats, line, log_format, brand_name)
+            position = window_end
+    
+    return stats
+
+def slice_ranges(log_file: str, slices: int) -> List[Tuple[int, int]]:
+    """Split a file into up to `slices` byte ranges that end on line boundaries"""
+    size = os.path.getsize(log_file)
+    if size == 0:
+        return []
+    
+    boundaries = [0]
+    with open(log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for index in range(1, max(1, slices)):
+            newline = mm.find(b'\n', max(size * index // slices, boundaries[-1]))
+            if newline == -1:
+                break
+            boundaries.append(newline + 1)
+    boundaries.append(size)
+    
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def analyze_logs(log_file: str, log_format: str, brand_name: str = None, workers: int = 1) -> Dict:
+    """
+    Analyze log file for bot activity
+    Plain logs are scanned through mmap slices across `workers` processes. Compressed logs
+    are streamed; both only parse lines that contain a bot signature, so 'errors' counts
+    candidate lines that failed to parse.
+    """
+    stats = new_stats()
+    
+    if detect_compression(log_file):
+        # gzip, zstd or a tar bundle of rotated logs; decompressed in a reader thread
+        anchors = get_signature_matcher().prefilter_anchors
+        with LogLineReader(log_file) as reader:
+            while True:
+                item = reader.next_batch()
+                if item is None:
+                    break
+                lines = item[0]
+                stats['total_requests'] += len(lines)
+                for line in lines:
+                    lowered = line.lower()
+                    if any(anchor in lowered for anchor in anchors):
+                        record_candidate(stats, line.decode('utf-8', errors='replace'), log_format, brand_name)
+                print(f"Processed {stats['total_requests']:,} lines...", end='\r')
+    else:
+        ranges = slice_ranges(log_file, workers)
+        if workers > 1 and len(ranges) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(scan_log_slice, log_file, start, end, log_format, brand_name)
+                    for start, end in ranges
+                ]
+                for index, future in enumerate(futures, 1):
+                    merge_stats(stats, future.result())
+                    print(f"Scanned {index}/{len(ranges)} slices...", end='\r')
+        else:
+            for start, end in ranges:
+                merge_stats(stats, scan_log_slice(log_file, start, end, log_format, brand_name))
     
     print(f"Processed {stats['total_requests']:,} total lines")
     
@@ -262,13 +335,52 @@ def generate_report(stats: Dict, output_format: str = 'text') -> str:
         
         return '\n'.join(report)
 
+def follow_logs(log_path: str, log_format: str, brand_name: str, redis_url: str,
+                state_file: str = None, poll_interval: float = 1.0):
+    """
+    Tail a live log or log directory and push bot visits into Redis like uploads do
+    Needs the backend dependencies (redis, geoip2, ua-parser), unlike the rest of this script
+    """
+    import asyncio
+    from log_analyzer import ServerLogAnalyzer
+    from redis_pool import get_redis, close_redis_pools
+    
+    async def run():
+        analyzer = ServerLogAnalyzer(get_redis(redis_url), os.getenv('GEOIP_PATH'))
+        try:
+            await follow(analyzer)
+        finally:
+            await close_redis_pools()
+    
+    async def follow(analyzer):
+        total_lines = total_bots = 0
+        async for batch in analyzer.follow_log(
+            log_path, brand_name, log_format, poll_interval=poll_interval, state_path=state_file
+        ):
+            total_lines += batch.total_visits
+            total_bots += len(batch.visits)
+            print(f"[{datetime.now():%H:%M:%S}] +{len(batch.visits):,} bot visits "
+                  f"({total_bots:,} of {total_lines:,} lines so far)")
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nStopped following")
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze server logs for AI bot activity')
-    parser.add_argument('log_file', help='Path to log file (can be .gz)')
-    parser.add_argument('--format', choices=['nginx', 'apache'], default='nginx', help='Log format')
+    parser.add_argument('log_file', help='Path to log file (plain, .gz, .zst or a tar bundle of rotated logs), '
+                                         'or a log directory with --follow')
+    parser.add_argument('--format', default='nginx',
+                        help=f"Log format: {', '.join(log_format_names())}, auto, or an nginx/Apache format string")
     parser.add_argument('--brand', help='Brand name to track mentions')
     parser.add_argument('--output', choices=['text', 'json', 'csv'], default='text', help='Output format')
     parser.add_argument('--save', help='Save report to file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes to scan plain logs with')
+    parser.add_argument('--follow', action='store_true', help='Tail the log (or directory) and push bot visits to Redis')
+    parser.add_argument('--redis-url', default=os.getenv('REDIS_URL', 'redis://localhost:6379'), help='Redis for --follow')
+    parser.add_argument('--state-file', help='Where --follow keeps its positions so restarts resume')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between --follow polls')
     
     args = parser.parse_args()
     
@@ -277,13 +389,32 @@ def main():
         print(f"Error: Log file not found: {args.log_file}")
         sys.exit(1)
     
+    if args.format == 'auto':
+        args.format = detect_file_format(args.log_file) if os.path.isfile(args.log_file) else None
+        if not args.format:
+            print("Error: Could not detect the log format; pass --format")
+            sys.exit(1)
+    try:
+        get_log_parser(args.format)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if args.follow:
+        if not args.brand:
+            print("Error: --follow requires --brand")
+            sys.exit(1)
+        print(f"Following {args.log_file} for {args.brand} (Ctrl-C to stop)...")
+        follow_logs(args.log_file, args.format, args.brand, args.redis_url, args.state_file, args.poll_interval)
+        return
+    
     print(f"Analyzing {args.log_file}...")
     print(f"Log format: {args.format}")
     if args.brand:
         print(f"Tracking brand: {args.brand}")
     
     # Analyze logs
-    stats = analyze_logs(args.log_file, args.format, args.brand)
+    stats = analyze_logs(args.log_file, args.format, args.brand, args.workers)
     
     # Generate report
     report = generate_report(stats, args.output)
@@ -1,9 +1,13 @@
 /**
- * LLM Bot Tracking Script v1.0
+ * LLM Bot Tracking Script v2.0
  * Copyright (c) 2024 AI Optimization Engine
  * 
  * This script tracks LLM/AI bot visits to provide real citation data
  * Include this on your website to enable real-time bot tracking
+ *
+ * Events are queued per session and sent as one compact batch per flush
+ * (protocol v2): session fields once, repeated strings as indexes into a
+ * per-batch string table, gzipped when the browser supports CompressionStream
  */
 
 (function(window, document) {
@@ -13,9 +17,18 @@
     const config = {
         apiEndpoint: 'https://your-api-domain.com/api/track-bot',
         apiKey: 'YOUR_API_KEY', // Optional: Add if you implement API key authentication
-        version: '1.0.0',
+        brandId: null, // Optional: brand UUID the site belongs to
+        version: '2.0.0',
+        batchSize: 50, // Flush once this many events are queued
+        flushInterval: 5000, // ms after the first queued event before a flush
+        compress: true, // gzip batches when CompressionStream is available
         debug: false // Set to true for console logging
     };
+    Object.assign(config, window.LLM_TRACKER_CONFIG || {});
+    
+    // Batch protocol: event type codes and session fields (see backend/beacon_protocol.py)
+    const PROTOCOL_VERSION = 2;
+    const EVENT_CODES = { pageview: 0, engagement: 1, session_end: 2, custom: 3 };
     
     // LLM Bot detection patterns
     const llmBotPatterns = [
@@ -63,6 +76,15 @@
             botInfo: null
         },
         
+        // Pending batch: events, string table and the time offsets are relative to
+        batch: {
+            events: [],
+            strings: [],
+            index: new Map(),
+            startTime: 0,
+            timer: null
+        },
+        
         // Initialize tracking
         init: function() {
             try {
@@ -131,41 +153,20 @@
             
             this.session.pageViews++;
             
-            const data = {
-                event_type: 'pageview',
-                session_id: this.session.id,
-                timestamp: new Date().toISOString(),
-                bot_name: this.session.botInfo.name,
-                platform: this.session.botInfo.platform,
-                user_agent: this.session.botInfo.userAgent,
-                page_url: window.location.href,
-                page_title: document.title,
-                referrer: document.referrer,
-                
-                // Page metadata
-                meta_description: this.getMetaDescription(),
-                meta_keywords: this.getMetaKeywords(),
-                
-                // Performance metrics
-                page_load_time: this.getPageLoadTime(),
-                
-                // Content metrics
-                content_length: document.body ? document.body.innerText.length : 0,
-                word_count: this.getWordCount(),
+            this.queueEvent('pageview', {
+                u: this.ref(window.location.href),
+                ti: this.ref(document.title),
+                r: this.ref(document.referrer),
+                md: this.ref(this.getMetaDescription()),
                 
-                // Structured data
-                structured_data: this.getStructuredData(),
+                // Performance and content metrics
+                lt: this.getPageLoadTime(),
+                cl: document.body ? document.body.innerText.length : 0,
+                wc: this.getWordCount(),
                 
-                // Technical details
-                viewport_size: window.innerWidth + 'x' + window.innerHeight,
-                screen_resolution: screen.width + 'x' + screen.height,
-                
-                // Custom tracking
-                tracking_version: config.version
-            };
-            
-            // Send tracking data
-            this.sendTrackingData(data);
+                // Brands from structured data, rather than whole JSON-LD blocks
+                br: this.getStructuredBrands().map(brand => this.ref(brand))
+            });
         },
         
         // Set up engagement tracking
@@ -194,11 +195,11 @@
                 scrollTimeout = setTimeout(scrollHandler, 100);
             });
             
-            // Track time on page and send engagement data periodically
+            // Queue engagement data periodically; it goes out with the next batch
             this.engagementInterval = setInterval(() => {
-                this.sendEngagementData({
-                    time_on_page: Math.round((Date.now() - this.session.startTime) / 1000),
-                    max_scroll_depth: maxScrollDepth
+                this.queueEvent('engagement', {
+                    top: Math.round((Date.now() - this.session.startTime) / 1000),
+                    sd: maxScrollDepth
                 });
             }, 30000); // Every 30 seconds
         },
@@ -208,29 +209,17 @@
             if (!this.session.isBot) return;
             
             const sendFinalData = () => {
-                // Calculate final metrics
-                const timeOnPage = Math.round((Date.now() - this.session.startTime) / 1000);
-                
-                // Send final engagement data
-                const data = {
-                    event_type: 'session_end',
-                    session_id: this.session.id,
-                    time_on_page: timeOnPage,
-                    page_views: this.session.pageViews,
-                    timestamp: new Date().toISOString()
-                };
+                // Queue final engagement data and flush the whole session batch
+                this.queueEvent('session_end', {
+                    top: Math.round((Date.now() - this.session.startTime) / 1000),
+                    pv: this.session.pageViews
+                }, false);
                 
-                // Use sendBeacon for reliability
-                if (navigator.sendBeacon) {
-                    navigator.sendBeacon(
-                        config.apiEndpoint + '/engagement',
-                        JSON.stringify(data)
-                    );
-                }
+                // The page may be gone before an async gzip finishes, so send uncompressed
+                this.flush(true);
             };
             
-            // Multiple event listeners for better coverage
-            window.addEventListener('beforeunload', sendFinalData);
+            // pagehide covers unload without blocking the back/forward cache
             window.addEventListener('pagehide', sendFinalData);
             document.addEventListener('visibilitychange', function() {
                 if (document.visibilityState === 'hidden') {
@@ -239,42 +228,93 @@
             });
         },
         
-        // Send tracking data to server
-        sendTrackingData: function(data) {
+        // Index of a string in the batch string table, adding it on first use
+        ref: function(value) {
+            const batch = this.batch;
+            value = value || '';
+            if (!batch.index.has(value)) {
+                batch.index.set(value, batch.strings.length);
+                batch.strings.push(value);
+            }
+            return batch.index.get(value);
+        },
+        
+        // Queue an event as [type code, ms since batch start, fields]
+        queueEvent: function(eventType, fields, scheduleFlush) {
+            const batch = this.batch;
+            if (!batch.events.length) {
+                batch.startTime = Date.now();
+            }
+            batch.events.push([EVENT_CODES[eventType], Date.now() - batch.startTime, fields]);
+            
+            if (batch.events.length >= config.batchSize) {
+                this.flush(false);
+            } else if (scheduleFlush !== false && !batch.timer) {
+                batch.timer = setTimeout(() => this.flush(false), config.flushInterval);
+            }
+        },
+        
+        // Send the pending batch as one request
+        flush: function(sync) {
+            const batch = this.batch;
+            if (batch.timer) {
+                clearTimeout(batch.timer);
+                batch.timer = null;
+            }
+            if (!batch.events.length) return;
+            
+            const payload = {
+                v: PROTOCOL_VERSION,
+                sid: this.session.id,
+                t0: batch.startTime,
+                c: {
+                    bn: this.session.botInfo.name,
+                    p: this.session.botInfo.platform,
+                    ua: this.session.botInfo.userAgent
+                },
+                k: batch.strings,
+                e: batch.events
+            };
+            if (config.brandId) {
+                payload.c.b = config.brandId;
+            }
             if (config.apiKey) {
-                data.api_key = config.apiKey;
+                payload.api_key = config.apiKey;
             }
+            this.batch = { events: [], strings: [], index: new Map(), startTime: 0, timer: null };
             
-            // Use beacon API if available for better reliability
-            if (navigator.sendBeacon) {
-                navigator.sendBeacon(config.apiEndpoint, JSON.stringify(data));
+            const body = JSON.stringify(payload);
+            if (!sync && config.compress && window.CompressionStream) {
+                // The server recognises gzip by its magic bytes; sendBeacon can't set headers
+                const stream = new Blob([body]).stream().pipeThrough(new CompressionStream('gzip'));
+                new Response(stream).blob()
+                    .then(gzipped => this.sendTrackingData(gzipped))
+                    .catch(() => this.sendTrackingData(body));
             } else {
-                // Fallback to fetch
-                fetch(config.apiEndpoint, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(data),
-                    keepalive: true
-                }).catch(error => {
-                    if (config.debug) {
-                        console.error('Failed to send tracking data:', error);
-                    }
-                });
+                this.sendTrackingData(body);
             }
         },
         
-        // Send engagement data
-        sendEngagementData: function(engagementData) {
-            const data = Object.assign({
-                event_type: 'engagement',
-                session_id: this.session.id,
-                platform: this.session.botInfo.platform,
-                timestamp: new Date().toISOString()
-            }, engagementData);
+        // Send a batch body to the server
+        sendTrackingData: function(body) {
+            // Use beacon API if available for better reliability
+            if (navigator.sendBeacon && navigator.sendBeacon(config.apiEndpoint, body)) {
+                return;
+            }
             
-            this.sendTrackingData(data);
+            // Fallback to fetch (also when the beacon queue is full)
+            fetch(config.apiEndpoint, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'text/plain'
+                },
+                body: body,
+                keepalive: true
+            }).catch(error => {
+                if (config.debug) {
+                    console.error('Failed to send tracking data:', error);
+                }
+            });
         },
         
         // Utility functions
@@ -283,11 +323,6 @@
             return meta ? meta.content : '';
         },
         
-        getMetaKeywords: function() {
-            const meta = document.querySelector('meta[name="keywords"]');
-            return meta ? meta.content : '';
-        },
-        
         getPageLoadTime: function() {
             if (window.performance && window.performance.timing) {
                 const timing = window.performance.timing;
@@ -318,20 +353,34 @@
             return structuredData;
         },
         
+        getStructuredBrands: function() {
+            const brands = new Set();
+            const collect = item => {
+                if (Array.isArray(item)) {
+                    item.forEach(collect);
+                    return;
+                }
+                if (!item || typeof item !== 'object') return;
+                Object.keys(item).forEach(key => {
+                    const value = item[key];
+                    if (key.toLowerCase().indexOf('brand') !== -1) {
+                        if (typeof value === 'string') brands.add(value);
+                        else if (value && typeof value.name === 'string') brands.add(value.name);
+                    }
+                });
+            };
+            this.getStructuredData().forEach(collect);
+            return Array.from(brands);
+        },
+        
         // Public API for manual tracking
         trackEvent: function(eventName, eventData) {
             if (!this.session.isBot) return;
             
-            const data = {
-                event_type: 'custom',
-                event_name: eventName,
-                event_data: eventData,
-                session_id: this.session.id,
-                platform: this.session.botInfo.platform,
-                timestamp: new Date().toISOString()
-            };
-            
-            this.sendTrackingData(data);
+            this.queueEvent('custom', {
+                n: this.ref(eventName),
+                ed: eventData || {}
+            });
         }
     };
     